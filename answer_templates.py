@@ -0,0 +1,220 @@
+"""
+Answer Templates Module for Project Samarth
+Handlers describe an answer as structured blocks (headings, fields, tables
+of column arrays); this module renders them to Markdown, plain text or JSON.
+Row templates are compiled once and format whole columns at a time, and
+each rendering is cached per format and locale
+"""
+
+import json
+import re
+import string
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from json_types import to_jsonable
+
+FORMATS = ('markdown', 'text', 'json')
+DEFAULT_FORMAT = 'markdown'
+# 'en' groups thousands as 1,234,567; 'en-IN' as 12,34,567 (lakh/crore)
+LOCALES = ('en', 'en-IN')
+DEFAULT_LOCALE = 'en'
+
+_GROUPED = re.compile(r'(?<![\d.])(\d{1,3}(?:,\d{3})+)')
+
+
+def _indian_grouping(match) -> str:
+    digits = match.group(1).replace(',', '')
+    head, tail = digits[:-3], digits[-3:]
+    groups = []
+    while len(head) > 2:
+        groups.insert(0, head[-2:])
+        head = head[:-2]
+    if head:
+        groups.insert(0, head)
+    return ','.join(groups + [tail])
+
+
+def localize(text: str, locale: str) -> str:
+    """Regroup digits that were formatted with ',' for the locale"""
+    if locale == 'en-IN' and ',' in text:
+        return _GROUPED.sub(_indian_grouping, text)
+    return text
+
+
+def format_values(values: Sequence, pattern: str, na_rep: str = 'n/a') -> np.ndarray:
+    """Format a whole column through one pattern such as '{:.2f} mm'
+
+    Missing values become `na_rep` (use '' to drop an optional phrase).
+    """
+    values = np.asarray(values, dtype=object)
+    missing = pd.isna(values)
+    fmt = pattern.format
+    return np.array([na_rep if m else fmt(v) for v, m in zip(values, missing)], dtype=object)
+
+
+class RowTemplate:
+    """Compiled row pattern, e.g. '  {District}: {Production:.0f} tonnes ({Year})'
+
+    Fields name columns; each field is formatted for all rows in one pass
+    and rows are joined from the formatted columns.
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        self.parts: List[Tuple[str, Optional[str], str]] = []
+        for literal, field, spec, conversion in string.Formatter().parse(text):
+            self.parts.append((literal, field, f"{{:{spec}}}" if spec else "{}"))
+
+    @property
+    def fields(self) -> List[str]:
+        return [field for _, field, _ in self.parts if field is not None]
+
+    def render(self, columns: Dict[str, Sequence], na_rep: str = 'n/a') -> List[str]:
+        length = len(next(iter(columns.values()))) if columns else 0
+        pieces = []
+        for literal, field, pattern in self.parts:
+            if literal:
+                pieces.append([literal] * length)
+            if field is not None:
+                pieces.append(format_values(columns[field], pattern, na_rep))
+        return [''.join(row) for row in zip(*pieces)] if pieces else [''] * length
+
+
+@lru_cache(maxsize=256)
+def compile_template(text: str) -> RowTemplate:
+    """Cached RowTemplate, so handlers can build template text per call cheaply"""
+    return RowTemplate(text)
+
+
+class Answer:
+    """Structured answer built by a handler and rendered on demand
+
+    Blocks are kept as data, not strings: tables hold their column arrays
+    and a template, so nothing is formatted until a format is requested.
+    """
+
+    def __init__(self, title: Optional[str] = None):
+        self.blocks: List[Dict[str, Any]] = []
+        self._rendered: Dict[Tuple[str, str], str] = {}
+        if title:
+            self.heading(title)
+
+    def _add(self, kind: str, **block) -> "Answer":
+        block['type'] = kind
+        self.blocks.append(block)
+        self._rendered.clear()
+        return self
+
+    def heading(self, text: str) -> "Answer":
+        return self._add('heading', text=text)
+
+    def line(self, text: str) -> "Answer":
+        return self._add('line', text=text)
+
+    def labelled(self, label: str, text: str) -> "Answer":
+        """Inline label and value: '**Period:** 1995-2024'"""
+        return self._add('labelled', label=label, text=text)
+
+    def fields(self, items: Iterable[Tuple[str, Any]]) -> "Answer":
+        """Bulleted 'label: value' lines"""
+        return self._add('fields', items=[(str(label), str(value)) for label, value in items])
+
+    def table(self, template: str, columns: Dict[str, Any], na_rep: str = 'n/a', name: str = '') -> "Answer":
+        """One line per row from a row template over named column arrays"""
+        columns = {key: np.asarray(values) for key, values in columns.items()}
+        return self._add('table', template=template, columns=columns, na_rep=na_rep, name=name)
+
+    def note(self, text: str) -> "Answer":
+        return self._add('note', text=text)
+
+    def source(self, text: str) -> "Answer":
+        return self._add('source', text=text)
+
+    def gap(self) -> "Answer":
+        return self._add('gap')
+
+    def render(self, fmt: str = DEFAULT_FORMAT, locale: str = DEFAULT_LOCALE) -> str:
+        key = (fmt, locale)
+        if key not in self._rendered:
+            if fmt not in RENDERERS:
+                raise ValueError(f"Unknown answer format {fmt!r}; expected one of {FORMATS}")
+            self._rendered[key] = RENDERERS[fmt](self, locale)
+        return self._rendered[key]
+
+    def to_dict(self) -> Dict[str, Any]:
+        blocks = []
+        for block in self.blocks:
+            block = dict(block)
+            if block['type'] == 'table':
+                block['columns'] = to_jsonable(block['columns'])
+            blocks.append(block)
+        return {'blocks': blocks}
+
+    def __str__(self) -> str:
+        return self.render()
+
+    def __getstate__(self):
+        # Renderings are cheap to redo and are not shipped between processes
+        return {'blocks': self.blocks, '_rendered': {}}
+
+
+def _table_lines(block: Dict, locale: str) -> List[str]:
+    rows = compile_template(block['template']).render(block['columns'], block['na_rep'])
+    return [localize(row, locale) for row in rows] if locale != DEFAULT_LOCALE else rows
+
+
+def _render_lines(answer: Answer, locale: str, markdown: bool) -> str:
+    lines = []
+    for block in answer.blocks:
+        kind = block['type']
+        if kind == 'heading':
+            lines.append(f"**{block['text']}**" if markdown else block['text'])
+        elif kind == 'line':
+            lines.append(block['text'])
+        elif kind == 'labelled':
+            label = f"**{block['label']}**" if markdown else block['label']
+            lines.append(f"{label} {block['text']}")
+        elif kind == 'fields':
+            lines.extend(f"- {label}: {value}" for label, value in block['items'])
+        elif kind == 'table':
+            lines.extend(compile_template(block['template']).render(block['columns'], block['na_rep']))
+        elif kind == 'note':
+            lines.append(f"_{block['text']}_" if markdown else block['text'])
+        elif kind == 'source':
+            lines.append(f"*{block['text']}*" if markdown else block['text'])
+        elif kind == 'gap':
+            lines.append("")
+    return localize("\n".join(lines), locale) if locale != DEFAULT_LOCALE else "\n".join(lines)
+
+
+def render_markdown(answer: Answer, locale: str = DEFAULT_LOCALE) -> str:
+    return _render_lines(answer, locale, markdown=True)
+
+
+def render_text(answer: Answer, locale: str = DEFAULT_LOCALE) -> str:
+    return _render_lines(answer, locale, markdown=False)
+
+
+def render_json(answer: Answer, locale: str = DEFAULT_LOCALE) -> str:
+    """Blocks with table rows pre-rendered alongside their raw columns"""
+    document = answer.to_dict()
+    for block, source in zip(document['blocks'], answer.blocks):
+        if block['type'] == 'table':
+            block['rows'] = _table_lines(source, locale)
+    document['locale'] = locale
+    return json.dumps(document, ensure_ascii=False)
+
+
+RENDERERS = {'markdown': render_markdown, 'text': render_text, 'json': render_json}
+
+
+def render_result(result: Dict[str, Any], fmt: str = DEFAULT_FORMAT, locale: str = DEFAULT_LOCALE) -> Dict[str, Any]:
+    """Replace an Answer in result['answer'] with its rendering (plain strings pass through)"""
+    answer = result.get('answer')
+    if isinstance(answer, Answer):
+        result['answer'] = answer.render(fmt, locale)
+    return result
@@ -4,12 +4,18 @@ Streamlit Frontend Application - Optimized Version
 """
 
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
+from settings import load_env
+
+# Settings kept in .env must be in the environment before the modules below read them
+load_env()
+
 from data_collector import DataCollector
-from query_engine import QueryEngine
-from datetime import datetime
+from dataset_catalog import DatasetCatalog
+from backend_client import BackendClient
+from engine_snapshot import warm_start
+from chat_history import ChatHistory
+from chart_payloads import PALETTE, build_charts
+import metrics
 import os
 
 # Page configuration
@@ -54,152 +60,196 @@ st.markdown("""
 for key, default in {
     'data_loaded': False,
     'query_engine': None,
-    'chat_history': [],
+    'chat_history': None,
     'current_question': "",
     'data': None
 }.items():
     if key not in st.session_state:
         st.session_state[key] = default
+if st.session_state.chat_history is None:
+    st.session_state.chat_history = ChatHistory()
+
+
+@st.cache_resource
+def start_metrics_exporters():
+    """Start the Prometheus exporter / file dumper once per process"""
+    return metrics.start_from_env()
+
+
+start_metrics_exporters()
 
 
 @st.cache_resource
 def load_data():
-    """Load and cache data"""
+    """Open the dataset catalog (metadata only; partitions load per question)"""
     try:
-        collector = DataCollector()
-        return collector.get_all_data()
+        return DatasetCatalog(DataCollector())
     except Exception as e:
         st.error(f"Error loading data: {e}")
         return None
 
 
 @st.cache_resource
-def get_query_engine(api_key, data):
+def get_query_engine(api_key, _catalog):
     """Cache the QueryEngine to speed up responses"""
     try:
-        return QueryEngine(api_key, data)
+        # Restored from a snapshot under SAMARTH_SNAPSHOT_DIR when one matches the data
+        engine = warm_start(api_key, _catalog)
+        if POOL_WORKERS:
+            engine.enable_process_pool(int(POOL_WORKERS))
+        return engine
     except Exception as e:
         st.error(f"Error initializing query engine: {e}")
         return None
 
 
-def render_visualizations(data):
-    """Render dynamic charts based on the returned data"""
-    if not data:
-        return
+@st.cache_resource
+def get_backend_client(base_url):
+    """Connect to a standalone query service instead of running the engine here"""
+    try:
+        client = BackendClient(base_url)
+        client.health()
+        return client
+    except Exception as e:
+        st.error(f"Error connecting to query service: {e}")
+        return None
 
-    # District-level analysis
-    if 'highest_district' in data:
-        st.markdown("### 📍 District Analysis")
-        district_data = data['highest_district']
-
-        col1, col2, col3 = st.columns(3)
-        with col1:
-            st.metric("District", district_data.get('District', 'N/A'))
-        with col2:
-            st.metric("Production", f"{district_data.get('Production', 0):.0f} tonnes")
-        with col3:
-            st.metric("Year", district_data.get('Year', 'N/A'))
-
-        if 'top_districts' in data and data['top_districts']:
-            top_df = pd.DataFrame(data['top_districts'])
-            if not top_df.empty and 'District' in top_df.columns:
-                fig = px.bar(
-                    top_df,
-                    x='District',
-                    y='Production',
-                    title='Top Districts by Production',
-                    color='Production',
-                    color_continuous_scale='Greens'
-                )
-                fig.update_layout(xaxis_title="District", yaxis_title="Production (tonnes)")
-                st.plotly_chart(fig, use_container_width=True)
-
-    # Rainfall & crops
-    elif 'rainfall' in data and 'crops' in data:
-        col1, col2 = st.columns(2)
-
-        with col1:
-            st.markdown("### 📈 Average Rainfall")
-            rf_data = data['rainfall']
-            if rf_data:
-                fig = go.Figure(data=[go.Bar(
-                    x=list(rf_data.keys()),
-                    y=list(rf_data.values()),
-                    marker_color=['#4CAF50', '#2196F3', '#FF9800'],
-                    text=[f"{v:.1f} mm" for v in rf_data.values()],
-                    textposition='outside'
-                )])
-                fig.update_layout(
-                    title="Average Annual Rainfall",
-                    xaxis_title="State",
-                    yaxis_title="Rainfall (mm)",
-                    showlegend=False
-                )
-                st.plotly_chart(fig, use_container_width=True)
-
-        with col2:
-            st.markdown("### 🌾 Top Crops Production")
-            crop_data = data['crops']
-            if crop_data:
-                states = list(crop_data.keys())
-                fig = go.Figure()
-                colors = ['#66BB6A', '#42A5F5', '#FFA726']
-                for idx, state in enumerate(states[:2]):
-                    state_crops = crop_data[state]
-                    fig.add_trace(go.Bar(
-                        name=state,
-                        x=list(state_crops.keys()),
-                        y=list(state_crops.values()),
-                        marker_color=colors[idx]
-                    ))
-                fig.update_layout(
-                    title=f"Crop Production Comparison",
-                    xaxis_title="Crop",
-                    yaxis_title="Production (tonnes)",
-                    barmode='group'
-                )
-                st.plotly_chart(fig, use_container_width=True)
-
-    # Crop production trend
-    elif 'crop_trend' in data:
-        crop_trend = pd.Series(data['crop_trend'])
-        rain_trend = pd.Series(data.get('rainfall_trend', {}))
-        fig = go.Figure()
 
-        fig.add_trace(go.Scatter(
-            x=crop_trend.index,
-            y=crop_trend.values,
-            name='Production',
-            line=dict(color='#4CAF50', width=3),
-            mode='lines+markers'
-        ))
+# Set to run the UI as a thin client of service.py (e.g. http://localhost:8000)
+BACKEND_URL = os.getenv("SAMARTH_BACKEND_URL")
+# Set to a worker count to run query handlers in separate processes
+POOL_WORKERS = os.getenv("SAMARTH_POOL_WORKERS")
+
+
+# Answers rendered with charts on every rerun; older ones only when opened
+RENDER_RECENT = 3
+# Earlier questions listed per page
+HISTORY_PAGE_SIZE = 20
 
-        if not rain_trend.empty:
+
+@st.cache_resource(max_entries=256)
+def build_figure(result_id, index, _chart):
+    """Plotly figure for one chart spec, built once per (result, chart)"""
+    return figure_from_chart(_chart)
+
+
+def figure_from_chart(chart):
+    # Plotly loads on the first chart, not when the page script starts
+    import plotly.graph_objects as go
+    if chart['kind'] == 'line':
+        fig = go.Figure()
+        for series in chart['series']:
             fig.add_trace(go.Scatter(
-                x=rain_trend.index,
-                y=rain_trend.values,
-                name='Rainfall',
-                yaxis='y2',
-                line=dict(color='#2196F3', width=3),
-                mode='lines+markers'
+                x=series['x'],
+                y=series['y'],
+                name=series['name'],
+                yaxis='y2' if series.get('axis') == 'y2' else 'y',
+                line=dict(color=series.get('color'), width=3, dash=series.get('dash')),
+                mode='lines+markers' if len(series['x']) <= 60 else 'lines'
             ))
-            fig.update_layout(
-                title='Production & Rainfall Trend',
-                xaxis_title='Year',
-                yaxis_title='Production (tonnes)',
-                yaxis2=dict(
-                    title='Rainfall (mm)',
-                    overlaying='y',
-                    side='right'
-                )
-            )
-        st.plotly_chart(fig, use_container_width=True)
-
-        if 'correlation' in data:
-            corr = data['correlation']
-            st.metric("Correlation Coefficient", f"{corr:.3f}",
-                      help="Correlation between production and rainfall")
+        layout = dict(title=chart['title'], xaxis_title=chart['x_title'], yaxis_title=chart['y_title'])
+        if any(series.get('axis') == 'y2' for series in chart['series']):
+            layout['yaxis2'] = dict(title=chart['y2_title'], overlaying='y', side='right')
+        fig.update_layout(**layout)
+        return fig
+
+    fig = go.Figure()
+    for series in chart['series']:
+        if chart.get('gradient'):
+            marker = dict(color=series['y'], colorscale='Greens', showscale=True)
+        elif chart.get('color_by_x'):
+            marker = dict(color=[PALETTE[i % len(PALETTE)] for i in range(len(chart['x']))])
+        else:
+            marker = dict(color=series.get('color'))
+        fig.add_trace(go.Bar(
+            name=series['name'],
+            x=chart['x'],
+            y=series['y'],
+            marker=marker,
+            text=chart.get('labels'),
+            textposition='outside' if chart.get('labels') else None
+        ))
+    fig.update_layout(
+        title=chart['title'],
+        xaxis_title=chart['x_title'],
+        yaxis_title=chart['y_title'],
+        barmode='group',
+        showlegend=len(chart['series']) > 1
+    )
+    return fig
+
+
+def render_chart(chart, result_id, index):
+    if chart.get('heading'):
+        st.markdown(f"### {chart['heading']}")
+    if chart['kind'] == 'metrics':
+        if chart.get('title'):
+            st.markdown(f"### {chart['title']}")
+        for col, item in zip(st.columns(len(chart['items'])), chart['items']):
+            with col:
+                st.metric(item[0], item[1], help=item[2] if len(item) > 2 else None)
+        return
+    fig = build_figure(result_id, index, chart) if result_id else figure_from_chart(chart)
+    st.plotly_chart(fig, use_container_width=True)
+
+
+def render_visualizations(charts, result_id=None):
+    """Draw precomputed chart specs; charts with a heading sit side by side"""
+    side_by_side = [i for i, chart in enumerate(charts) if chart.get('heading')]
+    if side_by_side:
+        for col, i in zip(st.columns(len(side_by_side)), side_by_side):
+            with col:
+                render_chart(charts[i], result_id, i)
+    for i, chart in enumerate(charts):
+        if i not in side_by_side:
+            render_chart(chart, result_id, i)
+
+
+def render_result_pages(cursor, key):
+    """Page through a result kept on the server; rows are fetched only while open"""
+    source = st.session_state.query_engine
+    if source is None or not st.checkbox(f"📋 {cursor['title']}: all {cursor['total']:,} rows",
+                                         key=f"cursor_open_{key}"):
+        return
+    pages = max(1, -(-cursor['total'] // cursor['page_size']))
+    page = st.number_input("Page", min_value=1, max_value=pages, value=1, key=f"cursor_page_{key}")
+    try:
+        result = source.fetch_page(cursor['id'], int(page))
+    except KeyError:
+        st.warning("⚠️ This result has expired. Ask the question again to page through it.")
+        return
+    st.dataframe(result['rows'], use_container_width=True, hide_index=True)
+    st.caption(f"Page {result['page']} of {result['pages']}")
+
+    # Export is built only on request; download_button needs the whole file
+    if st.button("⬇️ Prepare CSV export", key=f"cursor_csv_{key}"):
+        try:
+            csv = b''.join(source.export_result(cursor['id'], 'csv'))
+        except KeyError:
+            st.warning("⚠️ This result has expired. Ask the question again to export it.")
+            return
+        st.download_button("💾 Download CSV", data=csv, file_name=f"{cursor['title']}.csv",
+                           mime="text/csv", key=f"cursor_download_{key}")
+
+
+def render_entry(chat):
+    """Answer, charts and sources of one chat history entry"""
+    st.caption(f"⏰ {chat['timestamp'].replace('T', ' ')}")
+    st.markdown("### 📄 Answer")
+    st.markdown(chat.get('answer') or 'No answer generated')
+    # Results from before chart payloads existed are converted here
+    charts = chat.get('charts') or build_charts(chat.get('data') or {})
+    if charts:
+        st.markdown("### 📊 Data Insights")
+        render_visualizations(charts, chat.get('result_id'))
+    cursor = (chat.get('data') or {}).get('cursor')
+    if cursor and cursor['total'] > len(chat['data'].get('top_districts') or []):
+        render_result_pages(cursor, chat['id'])
+    if chat.get('sources'):
+        st.markdown("### 📚 Sources")
+        for s in chat['sources']:
+            st.markdown(f"- {s}")
+    st.markdown('<div class="source-tag">✅ Data sourced from data.gov.in</div>', unsafe_allow_html=True)
 
 
 def main():
@@ -210,41 +260,54 @@ def main():
     with st.sidebar:
         st.header("⚙️ Configuration")
 
-        api_key = st.text_input(
-            "Google Gemini API Key",
-            type="password",
-            help="Get your API key from https://aistudio.google.com/app/apikey"
-        )
-
-        if not api_key:
-            st.warning("Please enter your Gemini API key to continue")
-            st.info("📌 Get free API key: [Google AI Studio](https://aistudio.google.com/app/apikey)")
+        if BACKEND_URL:
+            # Thin-client mode: the query service holds the data and the API key
+            st.caption(f"🔗 Query service: {BACKEND_URL}")
+            if not st.session_state.data_loaded:
+                client = get_backend_client(BACKEND_URL)
+                if client:
+                    st.session_state.data = client
+                    st.session_state.query_engine = client
+                    st.session_state.data_loaded = True
         else:
-            if st.button("🔄 Load Data", use_container_width=True):
-                with st.spinner("Loading datasets..."):
-                    data = load_data()
-                    if data:
-                        st.session_state.data = data
-                        engine = get_query_engine(api_key, data)
-                        if engine:
-                            st.session_state.query_engine = engine
-                            st.session_state.data_loaded = True
-                            st.success("✅ Data loaded successfully!")
+            api_key = st.text_input(
+                "Google Gemini API Key",
+                type="password",
+                help="Get your API key from https://aistudio.google.com/app/apikey"
+            )
+
+            if not api_key:
+                st.warning("Please enter your Gemini API key to continue")
+                st.info("📌 Get free API key: [Google AI Studio](https://aistudio.google.com/app/apikey)")
+            else:
+                if st.button("🔄 Load Data", use_container_width=True):
+                    with st.spinner("Loading datasets..."):
+                        data = load_data()
+                        if data:
+                            st.session_state.data = data
+                            engine = get_query_engine(api_key, data)
+                            if engine:
+                                st.session_state.query_engine = engine
+                                st.session_state.data_loaded = True
+                                st.success("✅ Data loaded successfully!")
+                            else:
+                                st.error("❌ Failed to initialize query engine")
                         else:
-                            st.error("❌ Failed to initialize query engine")
-                    else:
-                        st.error("❌ Failed to load data")
+                            st.error("❌ Failed to load data")
 
         st.divider()
 
         if st.session_state.data_loaded:
-            data = st.session_state.data
+            # Served from catalog metadata; no dataset is scanned on rerun
+            crop_stats = st.session_state.data.stats('crop_production')
+            rain_stats = st.session_state.data.stats('rainfall')
             st.subheader("📊 Data Statistics")
-            st.metric("Crop Records", len(data['crop_production']))
-            st.metric("Rainfall Records", len(data['rainfall']))
-            st.metric("States", data['crop_production']['State'].nunique())
-            st.metric("Crops", data['crop_production']['Crop'].nunique())
-            st.metric("Years", f"{data['crop_production']['Year'].min()}-{data['crop_production']['Year'].max()}")
+            st.metric("Crop Records", crop_stats['rows'])
+            st.metric("Rainfall Records", rain_stats['rows'])
+            st.metric("States", crop_stats['distinct'].get('State', 0))
+            st.metric("Crops", crop_stats['distinct'].get('Crop', 0))
+            if 'years' in crop_stats:
+                st.metric("Years", f"{crop_stats['years'][0]}-{crop_stats['years'][1]}")
 
         st.divider()
 
@@ -282,7 +345,7 @@ def main():
         clear_button = st.button("🗑️ Clear History", use_container_width=True)
 
     if clear_button:
-        st.session_state.chat_history = []
+        st.session_state.chat_history.clear()
         st.session_state.current_question = ""
 
     if ask_button and question:
@@ -291,30 +354,33 @@ def main():
         else:
             with st.spinner("🔎 Processing your question..."):
                 result = st.session_state.query_engine.answer_question(question)
-                st.session_state.chat_history.append({
-                    "question": question,
-                    "result": result,
-                    "timestamp": datetime.now()
-                })
+                st.session_state.chat_history.append(question, result)
                 st.session_state.current_question = ""
 
-    # Display query results
-    if st.session_state.chat_history:
+    # Display query results: expander bodies run on every rerun even when
+    # collapsed, so only the newest few build charts; earlier questions are
+    # listed and read back from the history file when opened
+    history = st.session_state.chat_history
+    if len(history):
         st.divider()
         st.subheader("📝 Query Results")
-        for i, chat in enumerate(reversed(st.session_state.chat_history)):
-            with st.expander(f"Q: {chat['question'][:100]}...", expanded=(i == 0)):
-                st.caption(f"⏰ {chat['timestamp'].strftime('%Y-%m-%d %H:%M:%S')}")
-                st.markdown("### 📄 Answer")
-                st.markdown(chat['result'].get('answer', 'No answer generated'))
-                if chat['result'].get('data'):
-                    st.markdown("### 📊 Data Insights")
-                    render_visualizations(chat['result']['data'])
-                if chat['result'].get('sources'):
-                    st.markdown("### 📚 Sources")
-                    for s in chat['result']['sources']:
-                        st.markdown(f"- {s}")
-                st.markdown('<div class="source-tag">✅ Data sourced from data.gov.in</div>', unsafe_allow_html=True)
+        headers = history.headers()
+        for i, header in enumerate(headers[:RENDER_RECENT]):
+            with st.expander(f"Q: {header['question'][:100]}...", expanded=(i == 0)):
+                render_entry(history.get(header['id']))
+
+        earlier = headers[RENDER_RECENT:]
+        if earlier:
+            st.markdown(f"#### 🕘 Earlier Questions ({len(earlier)})")
+            pages = (len(earlier) - 1) // HISTORY_PAGE_SIZE + 1
+            page = st.number_input("Page", min_value=1, max_value=pages, value=1,
+                                   key="history_page") if pages > 1 else 1
+            start = (page - 1) * HISTORY_PAGE_SIZE
+            for header in earlier[start:start + HISTORY_PAGE_SIZE]:
+                label = f"{header['timestamp'].replace('T', ' ')} — {header['question'][:100]}"
+                if st.checkbox(label, key=f"history_open_{header['id']}"):
+                    render_entry(history.get(header['id']))
+                    st.divider()
 
     # 🌾 Sample Questions on Main Screen (instant copy to text area)
     st.divider()
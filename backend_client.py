@@ -0,0 +1,78 @@
+"""
+Backend Client Module for Project Samarth
+Thin HTTP client for the query service (service.py), with the same
+answer_question interface as QueryEngine and catalog-style stats()
+"""
+
+from typing import Any, Dict, Iterator, Optional
+
+import requests
+
+
+class BackendError(RuntimeError):
+    """Raised when the query service cannot be reached"""
+
+
+class CursorExpiredError(KeyError):
+    """The service no longer holds the requested result"""
+
+
+class BackendClient:
+    def __init__(self, base_url: str, timeout: float = 150.0):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+        self._stats = None
+
+    def health(self) -> Dict[str, Any]:
+        try:
+            response = self.session.get(f"{self.base_url}/healthz", timeout=5)
+            response.raise_for_status()
+            return response.json()
+        except requests.RequestException as e:
+            raise BackendError(f"Query service at {self.base_url} is unreachable: {e}")
+
+    def stats(self, name: str) -> Dict[str, Any]:
+        """Dataset statistics, fetched once per client"""
+        if self._stats is None:
+            response = self.session.get(f"{self.base_url}/stats", timeout=self.timeout)
+            response.raise_for_status()
+            self._stats = response.json()
+        return self._stats.get(name, {'rows': 0, 'distinct': {}})
+
+    def answer_question(self, question: str) -> Dict[str, Any]:
+        """POST the question; failures come back as answer text like engine errors do"""
+        try:
+            response = self.session.post(f"{self.base_url}/answer", json={"question": question},
+                                         timeout=self.timeout)
+        except requests.RequestException as e:
+            return {"answer": f"❌ Query service unavailable: {e}", "data": {}, "sources": []}
+
+        if response.status_code == 503:
+            return {"answer": "⚠️ The query service is busy. Please try again in a moment.",
+                    "data": {}, "sources": []}
+        if response.status_code != 200:
+            try:
+                error = response.json().get("error", response.text)
+            except ValueError:
+                error = response.text
+            return {"answer": f"❌ Query service error ({response.status_code}): {error}",
+                    "data": {}, "sources": []}
+        return response.json()
+
+    def fetch_page(self, cursor_id: str, page: int = 1, page_size: Optional[int] = None) -> Dict[str, Any]:
+        params = {'page': page, 'size': page_size or 0}
+        response = self.session.get(f"{self.base_url}/results/{cursor_id}", params=params, timeout=self.timeout)
+        if response.status_code == 410:
+            raise CursorExpiredError(cursor_id)
+        response.raise_for_status()
+        return response.json()
+
+    def export_result(self, cursor_id: str, fmt: str = 'csv') -> Iterator[bytes]:
+        """Stream an export from the service chunk by chunk"""
+        response = self.session.get(f"{self.base_url}/results/{cursor_id}/export", params={'format': fmt},
+                                    timeout=self.timeout, stream=True)
+        if response.status_code == 410:
+            raise CursorExpiredError(cursor_id)
+        response.raise_for_status()
+        return response.iter_content(chunk_size=64 * 1024)
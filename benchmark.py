@@ -0,0 +1,373 @@
+"""
+End-to-end Benchmark for Project Samarth
+Runs a question corpus through QueryEngine with a deterministic local LLM
+stub at several data scales and reports per-stage latency and memory
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from answer_templates import render_result
+from chart_payloads import attach_charts
+from data_generator import SyntheticDataGenerator
+
+# Question corpus covering every intent. Each entry carries the parse the
+# stub LLM returns, so runs are deterministic and independent of Gemini, and
+# a phrase the answer must contain at every scale.
+CORPUS = [
+    ("Compare average annual rainfall in Punjab and Haryana for the last 5 years and list top 3 most produced crops",
+     {"intent": "compare_rainfall", "states": ["Punjab", "Haryana"], "districts": [], "crops": [],
+      "years": [], "metrics": ["rainfall", "production"], "operations": ["compare", "list"],
+      "filters": {"period": "last 5 years"}},
+     "Annual Rainfall Comparison: Punjab vs Haryana"),
+    ("Compare rainfall in Maharashtra and Uttar Pradesh",
+     {"intent": "compare_rainfall", "states": ["Maharashtra", "Uttar Pradesh"], "districts": [], "crops": [],
+      "years": [], "metrics": ["rainfall"], "operations": ["compare"], "filters": {}},
+     "Annual Rainfall Comparison: Maharashtra vs Uttar Pradesh"),
+    ("Which district has highest wheat production in Punjab?",
+     {"intent": "identify_district", "states": ["Punjab"], "districts": [], "crops": ["wheat"],
+      "years": [], "metrics": ["production"], "operations": ["identify"], "filters": {}},
+     "Highest Production District"),
+    ("Which district has highest rice production in Punjab in Kharif season in 2000?",
+     {"intent": "identify_district", "states": ["Punjab"], "districts": [], "crops": ["rice"],
+      "years": ["2000"], "metrics": ["production"], "operations": ["identify"], "filters": {"season": "Kharif"}},
+     "Highest Production District"),
+    ("Identify the district in Maharashtra with the highest sugarcane production",
+     {"intent": "identify_district", "states": ["Maharashtra"], "districts": [], "crops": ["sugarcane"],
+      "years": [], "metrics": ["production"], "operations": ["identify"], "filters": {}},
+     "Highest Production District"),
+    ("Analyze rice production trend in Punjab and correlate with rainfall",
+     {"intent": "analyze_trend", "states": ["Punjab"], "districts": [], "crops": ["rice"],
+      "years": [], "metrics": ["production", "rainfall"], "operations": ["analyze", "correlate"], "filters": {}},
+     "Trend Analysis: Rice in Punjab"),
+    ("Analyze the production trend of wheat in Uttar Pradesh over the last decade",
+     {"intent": "analyze_trend", "states": ["Uttar Pradesh"], "districts": [], "crops": ["wheat"],
+      "years": [], "metrics": ["production"], "operations": ["analyze"], "filters": {"period": "last 10 years"}},
+     "Trend Analysis: Wheat in Uttar Pradesh"),
+    ("List the top crops grown in Haryana",
+     {"intent": "list_crops", "states": ["Haryana"], "districts": [], "crops": [],
+      "years": [], "metrics": ["production"], "operations": ["list"], "filters": {}},
+     "Top Crops by Production: Haryana"),
+    ("Recommend drought-resistant crops based on 10-year climatic trends in Rajasthan",
+     {"intent": "policy_support", "states": ["Rajasthan"], "districts": [], "crops": [],
+      "years": [], "metrics": ["rainfall", "production"], "operations": ["analyze"], "filters": {}},
+     "Drought-Resilient Crops in Rajasthan"),
+]
+
+# Handler each corpus intent must be routed to
+ROUTES = {
+    "compare_rainfall": "_handle_rainfall_query",
+    "identify_district": "_handle_crop_query",
+    "analyze_trend": "_handle_trend_query",
+    "list_crops": "_handle_list_crops_query",
+    "policy_support": "_handle_recommendation_query",
+}
+
+# Generator settings per scale; rows are approximate
+SCALES = {
+    "small": dict(n_years=10, crop_density=0.2),                  # ~40k crop rows
+    "medium": dict(n_years=30, crop_density=0.5),                 # ~220k crop rows
+    "large": dict(n_years=30, crop_density=0.5, district_multiplier=5),  # ~1.1M crop rows
+}
+
+STAGES = ("parse", "execute", "format")
+
+# Entry points timed by --startup, each imported in a fresh interpreter
+STARTUP_MODULES = ("query_engine", "dataset_catalog", "engine_snapshot", "service")
+# Dependencies that should only load when first used
+LAZY_DEPENDENCIES = ("google.generativeai", "dotenv", "plotly", "requests", "http.server", "asyncio")
+
+_STARTUP_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {lazy!r} if m in sys.modules]}}))
+"""
+
+
+class _StubResponse:
+    def __init__(self, text, prompt):
+        self.text = text
+        # Rough token counts (~4 chars per token) in the shape Gemini reports them
+        self.usage_metadata = type("Usage", (), {
+            "prompt_token_count": len(prompt) // 4,
+            "candidates_token_count": len(text) // 4,
+        })()
+
+
+class StubGenerativeModel:
+    """Deterministic stand-in for genai.GenerativeModel
+
+    Answers parse prompts with the corpus parse for the embedded question,
+    after sleeping `latency` seconds to simulate the network round trip.
+    """
+
+    answers = {question: parsed for question, parsed, _ in CORPUS}
+    latency = 0.0
+
+    def __init__(self, model_name="stub"):
+        self.model_name = model_name
+
+    def generate_content(self, prompt, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+        question = ""
+        if "User Question:" in prompt:
+            question = prompt.split("User Question:", 1)[1].split("\n", 1)[0].strip()
+        parsed = self.answers.get(question)
+        text = f"```json\n{json.dumps(parsed)}\n```" if parsed else "Hello"
+        return _StubResponse(text, prompt)
+
+
+@contextlib.contextmanager
+def stub_llm(latency=0.0):
+    """Replace genai.GenerativeModel/configure with the local stub"""
+    import google.generativeai as genai
+
+    saved = genai.GenerativeModel, genai.configure
+    StubGenerativeModel.latency = latency
+    genai.GenerativeModel = StubGenerativeModel
+    genai.configure = lambda **kwargs: None
+    try:
+        yield StubGenerativeModel
+    finally:
+        genai.GenerativeModel, genai.configure = saved
+
+
+def summarize(samples):
+    """Latency summary in milliseconds"""
+    arr = np.asarray(samples) * 1000.0
+    return {
+        "n": int(arr.size),
+        "mean_ms": round(float(arr.mean()), 3),
+        "p50_ms": round(float(np.percentile(arr, 50)), 3),
+        "p95_ms": round(float(np.percentile(arr, 95)), 3),
+        "p99_ms": round(float(np.percentile(arr, 99)), 3),
+        "max_ms": round(float(arr.max()), 3),
+    }
+
+
+def run_stages(engine, question):
+    """Run one question, returning (seconds per stage, parse, result)"""
+    t0 = time.perf_counter()
+    parsed = engine.parse_query(question)
+    t1 = time.perf_counter()
+    result = engine.execute_query(parsed, render=False)
+    t2 = time.perf_counter()
+    # Rendering the answer, chart payloads and serializing the result dict
+    # are the formatting step every client pays
+    render_result(result)
+    attach_charts(question, result)
+    json.dumps(result, default=str)
+    t3 = time.perf_counter()
+    return {"parse": t1 - t0, "execute": t2 - t1, "format": t3 - t2}, parsed, result
+
+
+def check_answer(expected_parse, expected_phrase, parsed, result):
+    """Problems with one answer: wrong intent or handler, an error, or a missing phrase"""
+    problems = []
+    intent = expected_parse["intent"]
+    if parsed.get("intent") != intent:
+        problems.append(f"parsed as {parsed.get('intent')!r}, expected {intent!r}")
+    if result.get("route") != ROUTES[intent]:
+        problems.append(f"routed to {result.get('route')}, expected {ROUTES[intent]}")
+    answer = str(result.get("answer", ""))
+    if answer.startswith(("Error", "❌", "⚠️")):
+        problems.append(f"answered {answer.splitlines()[0][:80]!r}")
+    elif expected_phrase not in answer:
+        problems.append(f"answer lacks {expected_phrase!r}")
+    return problems
+
+
+def measure_peak_memory(engine):
+    """Peak traced allocation per stage (MB), in a separate untimed pass"""
+    peaks = {stage: 0.0 for stage in STAGES}
+    tracemalloc.start()
+    try:
+        for question, _, _ in CORPUS:
+            tracemalloc.reset_peak()
+            parsed = engine.parse_query(question)
+            peaks["parse"] = max(peaks["parse"], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+            result = engine.execute_query(parsed, render=False)
+            peaks["execute"] = max(peaks["execute"], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+            render_result(result)
+            attach_charts(question, result)
+            json.dumps(result, default=str)
+            peaks["format"] = max(peaks["format"], tracemalloc.get_traced_memory()[1])
+    finally:
+        tracemalloc.stop()
+    return {stage: round(peak / 1e6, 3) for stage, peak in peaks.items()}
+
+
+def benchmark_scale(scale, repeats=5, latency=0.0, seed=42):
+    """Benchmark the full corpus against one generated data scale"""
+    from query_engine import QueryEngine
+
+    generator = SyntheticDataGenerator(seed=seed, **SCALES[scale])
+    data = {
+        'crop_production': generator.crop_production_table(),
+        'rainfall': generator.rainfall_table(),
+    }
+    rows = {name: len(df) for name, df in data.items()}
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull), stub_llm(latency):
+        t0 = time.perf_counter()
+        engine = QueryEngine("stub-api-key-" + "x" * 30, data)
+        init_seconds = time.perf_counter() - t0
+
+        samples = {stage: [] for stage in STAGES}
+        errors = 0
+        misses = {}
+        start = time.perf_counter()
+        for _ in range(repeats):
+            for question, expected_parse, expected_phrase in CORPUS:
+                timings, parsed, result = run_stages(engine, question)
+                if str(result.get("answer", "")).startswith(("Error", "❌")):
+                    errors += 1
+                problems = check_answer(expected_parse, expected_phrase, parsed, result)
+                if problems:
+                    misses[question] = problems
+                for stage, seconds in timings.items():
+                    samples[stage].append(seconds)
+        wall = time.perf_counter() - start
+
+        peak_memory = measure_peak_memory(engine)
+
+    total = [sum(values) for values in zip(*(samples[stage] for stage in STAGES))]
+    return {
+        "rows": rows,
+        "init_ms": round(init_seconds * 1000.0, 3),
+        "questions": len(total),
+        "errors": errors,
+        "misses": misses,
+        "throughput_qps": round(len(total) / wall, 3),
+        "latency": dict({stage: summarize(samples[stage]) for stage in STAGES}, total=summarize(total)),
+        "peak_memory_mb": peak_memory,
+    }
+
+
+def _direct_imports(importtime_log, module):
+    """(name, cumulative ms) of the imports `module` itself triggered, from -X importtime output"""
+    pending = []
+    for line in importtime_log.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 1:
+            pending.append((name.strip(), int(cumulative) / 1000.0))
+        elif depth == 0:
+            if name.strip() == module:
+                return pending
+            pending = []
+    return []
+
+
+def measure_startup(modules=STARTUP_MODULES, repeats=5):
+    """Cold import time of each entry module and which lazy dependencies it pulled in"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    results = {}
+    for module in modules:
+        seconds, loaded, heaviest = [], [], []
+        for _ in range(repeats):
+            probe = _STARTUP_PROBE.format(module=module, lazy=LAZY_DEPENDENCIES)
+            run = subprocess.run([sys.executable, "-X", "importtime", "-c", probe], cwd=here,
+                                 capture_output=True, text=True, check=True)
+            outcome = json.loads(run.stdout.strip().splitlines()[-1])
+            seconds.append(outcome["seconds"])
+            loaded = outcome["loaded"]
+            heaviest = sorted(_direct_imports(run.stderr, module), key=lambda item: -item[1])[:5]
+        results[module] = {
+            "import_ms": round(float(np.median(seconds)) * 1000.0, 3),
+            "lazy_loaded": loaded,
+            "heaviest_imports_ms": {name: round(ms, 3) for name, ms in heaviest},
+        }
+    return results
+
+
+def compare(current, baseline_path):
+    """Print p50/p95 deltas against a previous report"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\n📊 Compared with {baseline_path} ({baseline['meta'].get('timestamp', '?')})")
+    for scale, result in current["results"].items():
+        old = baseline["results"].get(scale)
+        if not old:
+            continue
+        for stage in STAGES + ("total",):
+            for stat in ("p50_ms", "p95_ms"):
+                new_v, old_v = result["latency"][stage][stat], old["latency"][stage][stat]
+                change = (new_v - old_v) / old_v * 100 if old_v else 0.0
+                print(f"  {scale:>6} {stage:>7} {stat}: {old_v:9.3f} -> {new_v:9.3f} ({change:+.1f}%)")
+    for module, result in current.get("startup", {}).items():
+        old = baseline.get("startup", {}).get(module)
+        if old:
+            new_v, old_v = result["import_ms"], old["import_ms"]
+            change = (new_v - old_v) / old_v * 100 if old_v else 0.0
+            print(f"  import {module:>16}: {old_v:9.3f} -> {new_v:9.3f} ms ({change:+.1f}%)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark QueryEngine with a stubbed LLM")
+    parser.add_argument("--scales", nargs="+", default=["small", "medium"], choices=list(SCALES))
+    parser.add_argument("--repeats", type=int, default=5, help="Passes over the question corpus")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Simulated LLM latency (seconds)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="bench_output.json", help="Where to write the JSON report")
+    parser.add_argument("--compare", help="Previous JSON report to diff against")
+    parser.add_argument("--startup", action="store_true",
+                        help="Only time cold imports of the entry modules (no query benchmark)")
+    args = parser.parse_args()
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+            "repeats": args.repeats,
+            "llm_latency_s": args.llm_latency,
+            "seed": args.seed,
+        },
+        "results": {},
+    }
+
+    if args.startup:
+        print("⏱️  Timing cold imports...", file=sys.stderr)
+        report["startup"] = measure_startup(repeats=args.repeats)
+        for module, result in report["startup"].items():
+            heaviest = ", ".join(f"{name} {ms:.0f} ms" for name, ms in result["heaviest_imports_ms"].items())
+            print(f"  import {module}: {result['import_ms']:.1f} ms "
+                  f"(lazy deps loaded: {', '.join(result['lazy_loaded']) or 'none'}; heaviest: {heaviest})")
+
+    for scale in ([] if args.startup else args.scales):
+        print(f"⏱️  Benchmarking scale '{scale}'...", file=sys.stderr)
+        result = benchmark_scale(scale, repeats=args.repeats, latency=args.llm_latency, seed=args.seed)
+        report["results"][scale] = result
+        lat = result["latency"]
+        print(f"  {scale}: {result['rows']['crop_production']:,} crop rows, "
+              f"{result['throughput_qps']:.1f} q/s, total p50 {lat['total']['p50_ms']:.1f} ms, "
+              f"p99 {lat['total']['p99_ms']:.1f} ms")
+        for question, problems in result["misses"].items():
+            print(f"  ⚠️ {question}: {'; '.join(problems)}")
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ Report written to {args.output}")
+
+    if args.compare:
+        compare(report, args.compare)
@@ -0,0 +1,157 @@
+"""
+Chart Payloads Module for Project Samarth
+Turns handler result data into compact, columnar chart specs (one x list
+and one y list per series) that the UI can draw without rebuilding
+DataFrames, with long line series downsampled by LTTB
+"""
+
+import hashlib
+import json
+import os
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from derived_metrics import METRICS
+from json_types import to_jsonable
+
+# Points kept per line series; longer series are downsampled
+MAX_POINTS = int(os.getenv("SAMARTH_CHART_POINTS", "200"))
+
+PALETTE = ['#4CAF50', '#2196F3', '#FF9800', '#AB47BC', '#EF5350', '#26A69A', '#8D6E63', '#FFCA28']
+
+
+def lttb(x: Sequence[float], y: Sequence[float], threshold: int) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets: indices of `threshold` points that keep the series' shape
+
+    The first and last points are always kept; every bucket in between
+    contributes the point forming the largest triangle with the previous
+    pick and the next bucket's mean.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    picked = np.empty(threshold, dtype=int)
+    picked[0], picked[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, stop = edges[i], edges[i + 1]
+        next_stop = edges[i + 2] if i + 2 < len(edges) else n
+        mean_x = x[stop:next_stop].mean() if next_stop > stop else x[-1]
+        mean_y = y[stop:next_stop].mean() if next_stop > stop else y[-1]
+        area = np.abs((x[a] - mean_x) * (y[start:stop] - y[a]) - (x[a] - x[start:stop]) * (mean_y - y[a]))
+        a = start + int(np.argmax(area))
+        picked[i + 1] = a
+    return picked
+
+
+def _year_series(mapping: Dict, max_points: int):
+    """Sorted (x, y) lists from a {year: value} dict, downsampled to max_points"""
+    if not mapping:
+        return [], []
+    items = sorted((float(k), v) for k, v in mapping.items() if v is not None and np.isfinite(v))
+    x = np.array([k for k, _ in items])
+    y = np.array([v for _, v in items], dtype=float)
+    keep = lttb(x, y, max_points)
+    x, y = x[keep], y[keep]
+    x = x.astype(int) if len(x) and np.all(x == np.round(x)) else x
+    return x.tolist(), y.tolist()
+
+
+def _bar(title: str, x: List, ys: Dict[str, List], x_title: str, y_title: str, **extra) -> Dict:
+    return {
+        'kind': 'bar', 'title': title, 'x': x, 'x_title': x_title, 'y_title': y_title,
+        'series': [{'name': name, 'y': y, 'color': PALETTE[i % len(PALETTE)]}
+                   for i, (name, y) in enumerate(ys.items())],
+        **extra,
+    }
+
+
+def build_charts(data: Dict[str, Any], max_points: int = MAX_POINTS) -> List[Dict[str, Any]]:
+    """Chart specs for a handler result's data dict (empty when nothing is chartable)"""
+    if not data:
+        return []
+    charts = []
+
+    if 'highest_district' in data:
+        top = data['highest_district']
+        metric = METRICS.get(data.get('metric'), METRICS['production'])
+        column, unit, decimals = metric['column'], metric['unit'], metric['decimals']
+        charts.append({'kind': 'metrics', 'title': '📍 District Analysis', 'items': [
+            ['District', str(top.get('District', 'N/A'))],
+            [column, f"{float(top.get(column) or 0):.{decimals}f} {unit}"],
+            ['Year', str(top.get('Year', 'N/A'))],
+        ]})
+        records = data.get('top_districts') or []
+        if records and 'District' in records[0]:
+            charts.append(_bar(f'Top Districts by {column}', [str(r['District']) for r in records],
+                               {column: [r.get(column) for r in records]},
+                               'District', f'{column} ({unit})', gradient=True))
+
+    elif 'rainfall' in data and 'crops' in data:
+        rainfall = data['rainfall'] or {}
+        if rainfall:
+            chart = _bar('Average Annual Rainfall', list(rainfall), {'Rainfall': list(rainfall.values())},
+                         'State', 'Rainfall (mm)', color_by_x=True,
+                         labels=[f"{v:.1f} mm" for v in rainfall.values()])
+            chart['heading'] = '📈 Average Rainfall'
+            charts.append(chart)
+        crops = data['crops'] or {}
+        if crops:
+            names = list(dict.fromkeys(c for state_crops in crops.values() for c in state_crops))
+            chart = _bar('Crop Production Comparison', names,
+                         {state: [state_crops.get(c) for c in names] for state, state_crops in crops.items()},
+                         'Crop', 'Production (tonnes)')
+            chart['heading'] = '🌾 Top Crops Production'
+            charts.append(chart)
+
+    elif 'crop_trend' in data:
+        metric = str(data.get('metric', 'production')).title()
+        x, y = _year_series(data['crop_trend'], max_points)
+        series = [{'name': metric, 'x': x, 'y': y, 'color': '#4CAF50', 'axis': 'y'}]
+        if data.get('rolling_mean'):
+            x, y = _year_series(data['rolling_mean'], max_points)
+            series.append({'name': f'{metric} (rolling mean)', 'x': x, 'y': y, 'color': '#A5D6A7',
+                           'axis': 'y', 'dash': 'dot'})
+        if data.get('rainfall_trend'):
+            x, y = _year_series(data['rainfall_trend'], max_points)
+            series.append({'name': 'Rainfall', 'x': x, 'y': y, 'color': '#2196F3', 'axis': 'y2'})
+        charts.append({'kind': 'line', 'title': f'{metric} & Rainfall Trend', 'x_title': 'Year',
+                       'y_title': metric, 'y2_title': 'Rainfall (mm)', 'series': series})
+        if 'correlation' in data:
+            charts.append({'kind': 'metrics', 'items': [
+                ['Correlation Coefficient', f"{data['correlation']:.3f}",
+                 f'Correlation between {metric.lower()} and rainfall']]})
+
+    elif 'recommendations' in data:
+        records = (data['recommendations'] or []) + (data.get('drought_sensitive') or [])
+        records = list({r['Crop']: r for r in records}.values())
+        if records:
+            charts.append(_bar('Drought Resilience by Crop', [str(r['Crop']) for r in records],
+                               {'Resilience': [r.get('resilience') for r in records]},
+                               'Crop', 'Resilience score', gradient=True))
+
+    return to_jsonable(charts)
+
+
+def result_id(question: str, result: Dict[str, Any]) -> str:
+    """Stable id for a result, so identical answers share cached figures"""
+    digest = hashlib.sha1(question.encode())
+    digest.update(json.dumps(result.get('charts', []), sort_keys=True, default=str).encode())
+    digest.update(str(result.get('answer', '')).encode())
+    return digest.hexdigest()[:16]
+
+
+def attach_charts(question: str, result: Dict[str, Any], max_points: Optional[int] = None) -> Dict[str, Any]:
+    """Add 'charts' and 'result_id' to an answer_question result in place"""
+    try:
+        result['charts'] = build_charts(result.get('data') or {}, max_points or MAX_POINTS)
+    except Exception as e:
+        print(f"⚠️ Chart payload failed: {e}")
+        result['charts'] = []
+    result['result_id'] = result_id(question, result)
+    return result
@@ -0,0 +1,147 @@
+"""
+Chat History Module for Project Samarth
+Bounded store for the Streamlit chat history: recent answers stay in memory
+as compact JSON payloads, older ones spill to a JSONL file on disk, and
+only a small header per entry is kept for listing
+"""
+
+import json
+import os
+import tempfile
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from json_types import to_jsonable
+
+# Entries kept in memory with their full (compact) payload
+DEFAULT_KEEP = 10
+# Entries remembered at all; the oldest are forgotten beyond this
+DEFAULT_MAX_ENTRIES = 500
+
+
+def compact_result(result: Dict[str, Any]) -> Dict[str, Any]:
+    """answer/data/sources as plain JSON types (no DataFrames, NumPy scalars or datetimes)"""
+    return {
+        'answer': result.get('answer', ''),
+        'data': to_jsonable(result.get('data') or {}),
+        'sources': [str(s) for s in result.get('sources') or []],
+        'charts': to_jsonable(result.get('charts') or []),
+        'result_id': result.get('result_id'),
+    }
+
+
+class ChatHistory:
+    """Append-only chat history with a bounded in-memory footprint
+
+    `keep` newest entries are held in memory. Older entries are written
+    to the spill file once and read back by byte offset when the UI
+    asks for them; the file is rewritten when forgotten entries make up
+    most of it.
+    """
+
+    def __init__(self, path: Optional[str] = None, keep: int = DEFAULT_KEEP,
+                 max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.keep = keep
+        self.max_entries = max_entries
+        self._owns_path = path is None
+        if path is None:
+            fd, path = tempfile.mkstemp(prefix="samarth-chat-", suffix=".jsonl")
+            os.close(fd)
+        self.path = path
+        self._next_id = 1
+        self._headers: List[Dict[str, Any]] = []
+        self._entries: Dict[int, Dict[str, Any]] = {}
+        self._dead_bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._headers)
+
+    def append(self, question: str, result: Dict[str, Any]) -> int:
+        entry = {
+            'id': self._next_id,
+            'question': question,
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            **compact_result(result),
+        }
+        self._next_id += 1
+        self._headers.append({'id': entry['id'], 'question': question,
+                              'timestamp': entry['timestamp'], 'offset': None, 'size': 0})
+        self._entries[entry['id']] = entry
+        self._spill()
+        return entry['id']
+
+    def _spill(self):
+        """Move entries beyond `keep` to disk and forget those beyond `max_entries`"""
+        in_memory = [h for h in self._headers if h['offset'] is None]
+        overflow = in_memory[:max(0, len(in_memory) - self.keep)]
+        if overflow:
+            with open(self.path, 'ab') as f:
+                for header in overflow:
+                    line = (json.dumps(self._entries.pop(header['id'])) + '\n').encode()
+                    header['offset'], header['size'] = f.tell(), len(line)
+                    f.write(line)
+
+        if len(self._headers) > self.max_entries:
+            dropped = self._headers[:len(self._headers) - self.max_entries]
+            self._headers = self._headers[len(dropped):]
+            for header in dropped:
+                self._entries.pop(header['id'], None)
+                self._dead_bytes += header['size']
+            if self._dead_bytes > os.path.getsize(self.path) // 2:
+                self._rewrite()
+
+    def _rewrite(self):
+        """Drop forgotten entries from the spill file"""
+        tmp = f"{self.path}.tmp"
+        with open(self.path, 'rb') as src, open(tmp, 'wb') as dst:
+            for header in self._headers:
+                if header['offset'] is None:
+                    continue
+                src.seek(header['offset'])
+                line = src.read(header['size'])
+                header['offset'] = dst.tell()
+                dst.write(line)
+        os.replace(tmp, self.path)
+        self._dead_bytes = 0
+
+    def headers(self) -> List[Dict[str, Any]]:
+        """id, question and timestamp of every entry, newest first"""
+        return [{'id': h['id'], 'question': h['question'], 'timestamp': h['timestamp'],
+                 'in_memory': h['offset'] is None}
+                for h in reversed(self._headers)]
+
+    def get(self, entry_id: int) -> Optional[Dict[str, Any]]:
+        """Full compact entry, read from the spill file if it is no longer in memory"""
+        if entry_id in self._entries:
+            return self._entries[entry_id]
+        for header in self._headers:
+            if header['id'] == entry_id:
+                with open(self.path, 'rb') as f:
+                    f.seek(header['offset'])
+                    return json.loads(f.read(header['size']))
+        return None
+
+    def recent(self, n: int) -> List[Dict[str, Any]]:
+        """Newest n entries in full, newest first"""
+        return [self.get(h['id']) for h in self.headers()[:n]]
+
+    def memory_bytes(self) -> int:
+        """Approximate size of the payloads held in memory"""
+        return sum(len(json.dumps(entry)) for entry in self._entries.values())
+
+    def clear(self):
+        self._headers.clear()
+        self._entries.clear()
+        self._dead_bytes = 0
+        open(self.path, 'wb').close()
+
+    def close(self):
+        self.clear()
+        if self._owns_path and os.path.exists(self.path):
+            os.remove(self.path)
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
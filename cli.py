@@ -0,0 +1,284 @@
+"""
+Batch CLI for Project Samarth
+Answers a JSONL file of questions headlessly: questions run through
+QueryEngine on a thread pool with the rule-based, stub or Gemini parser,
+repeated questions are answered once, answers can be cached on disk across
+runs, and results stream out as JSONL lines with per-stage timings
+
+Run with:  python cli.py questions.jsonl --output answers.jsonl --workers 8
+      or:  cat questions.jsonl | python cli.py - --parser stub
+"""
+
+import argparse
+import contextlib
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+import metrics
+from answer_templates import FORMATS, LOCALES, DEFAULT_FORMAT, DEFAULT_LOCALE
+from json_types import to_jsonable
+from settings import load_env
+
+# Settings kept in .env apply to the defaults below and to the engine
+load_env()
+
+BATCH_QUESTIONS = metrics.REGISTRY.counter("samarth_batch_questions_total",
+                                           "Questions answered by the batch CLI, by source (engine/duplicate/cache)")
+
+PARSERS = ('rules', 'stub', 'gemini')
+DEFAULT_WORKERS = int(os.getenv("SAMARTH_BATCH_WORKERS", "4"))
+# Fields tried, in order, when a JSONL line is an object
+QUESTION_FIELDS = ('question', 'text', 'body', 'title')
+ID_FIELDS = ('id', 'request_id', 'question_id')
+
+
+def read_questions(lines: Iterable[str], field: Optional[str] = None) -> Iterator[Tuple[Any, str]]:
+    """(id, question) per JSONL line; a line may be an object or a bare JSON string
+
+    Objects without an id field are numbered by line.
+    """
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        item = json.loads(line)
+        if isinstance(item, str):
+            yield number, item
+            continue
+        fields = (field,) if field else QUESTION_FIELDS
+        question = next((item[f] for f in fields if item.get(f)), None)
+        if question is None:
+            raise ValueError(f"Line {number} has no question field ({', '.join(fields)})")
+        yield next((item[f] for f in ID_FIELDS if f in item), number), str(question)
+
+
+def normalize_question(question: str) -> str:
+    return " ".join(question.lower().split())
+
+
+class AnswerCache:
+    """Answers from earlier runs, in one append-only JSONL file per dataset version
+
+    Keys cover the normalized question, parser, format and locale, so a
+    changed dataset or engine starts a fresh file.
+    """
+
+    def __init__(self, directory: str, version: str):
+        os.makedirs(directory, exist_ok=True)
+        self.path = f"{directory}/answers-{version}.jsonl"
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # A run killed mid-write leaves at most one torn line
+                        continue
+                    self._entries[entry['key']] = entry['record']
+
+    @staticmethod
+    def key(question: str, parser: str, fmt: str, locale: str) -> str:
+        return hashlib.sha1(json.dumps([normalize_question(question), parser, fmt, locale]).encode()).hexdigest()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return self._entries.get(key)
+
+    def put(self, key: str, record: Dict[str, Any]):
+        with self._lock:
+            self._entries[key] = record
+            with open(self.path, 'a') as f:
+                f.write(json.dumps({'key': key, 'record': record}) + '\n')
+
+
+def load_data(data_source: str, cache_dir: str = "data_cache"):
+    """The catalog, or freshly generated frames for a synthetic scale"""
+    if data_source == 'catalog':
+        from data_collector import DataCollector
+        from dataset_catalog import DatasetCatalog
+        return DatasetCatalog(DataCollector(cache_dir))
+    from benchmark import SCALES
+    from data_generator import SyntheticDataGenerator
+    generator = SyntheticDataGenerator(seed=42, **SCALES[data_source])
+    return {'crop_production': generator.crop_production_table(), 'rainfall': generator.rainfall_table()}
+
+
+def build_engine(parser: str, data, snapshot_dir: Optional[str] = None, version: Optional[str] = None):
+    """Engine for a batch run, restored from snapshot_dir when one matches `version`"""
+    from engine_snapshot import warm_start
+
+    if parser == 'rules':
+        return warm_start(None, data, snapshot_dir, version=version, offline=True)
+    if parser == 'stub':
+        return warm_start("stub-api-key-" + "x" * 30, data, snapshot_dir, version=version)
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        raise SystemExit("❌ GEMINI_API_KEY is not set (use --parser rules for offline runs)")
+    return warm_start(api_key, data, snapshot_dir, version=version)
+
+
+def answer_record(engine, question: str, fmt: str, locale: str, include_data: bool) -> Dict[str, Any]:
+    """One question's JSON-ready answer, with stage timings"""
+    start = time.perf_counter()
+    try:
+        result = engine.answer_question(question, fmt=fmt, locale=locale)
+    except Exception as e:
+        metrics.QUERY_ERRORS.inc()
+        return {'error': repr(e), 'timings_ms': {'total': round((time.perf_counter() - start) * 1000.0, 3)}}
+    answer = result.get('answer', '')
+    record = {
+        'intent': result.get('intent'),
+        'answer': answer,
+        'sources': [str(s) for s in result.get('sources') or []],
+        'timings_ms': result.get('timings_ms', {}),
+    }
+    if fmt == 'json' and isinstance(answer, str) and answer.startswith('{'):
+        # Structured answers are embedded as objects rather than escaped strings
+        record['answer'] = json.loads(answer)
+    if include_data:
+        record['data'] = to_jsonable(result.get('data') or {})
+    if str(answer).startswith(("Error", "❌")):
+        record['error'] = str(answer)
+    return record
+
+
+def run_batch(engine, questions: Iterable[Tuple[Any, str]], out, workers: int = DEFAULT_WORKERS,
+              fmt: str = DEFAULT_FORMAT, locale: str = DEFAULT_LOCALE, parser: str = 'rules',
+              cache: Optional[AnswerCache] = None, include_data: bool = False) -> Dict[str, Any]:
+    """Answer every question, writing one JSONL line each in input order as soon as it is ready
+
+    At most `workers` * 4 questions wait to be written, so long files
+    stream out steadily. A question repeated in the batch is answered once
+    and shares the first answer, which is kept for the rest of the run.
+    """
+    counts = {'questions': 0, 'engine': 0, 'duplicate': 0, 'cache': 0, 'errors': 0}
+    totals = []
+    in_flight: Dict[str, Any] = {}
+    window = deque()
+    start = time.perf_counter()
+
+    def emit(question_id, question, future, source):
+        record = dict(future.result()) if hasattr(future, 'result') else dict(future)
+        if source == 'cache' and 'timings_ms' in record:
+            # Those timings belong to the run that answered it, not to this one
+            record['cached_timings_ms'] = record.pop('timings_ms')
+        # Exceptions are not cached; "no data" answers are, since the key covers the data version
+        if source == 'engine' and cache is not None and 'answer' in record:
+            cache.put(AnswerCache.key(question, parser, fmt, locale), record)
+        counts[source] += 1
+        counts['errors'] += 'error' in record
+        BATCH_QUESTIONS.inc(labels={"source": source})
+        if source == 'engine':
+            totals.append(record.get('timings_ms', {}).get('total', 0.0))
+        out.write(json.dumps({'id': question_id, 'question': question, 'source': source, **record},
+                             ensure_ascii=False) + '\n')
+        out.flush()
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="samarth-batch") as executor:
+        for question_id, question in questions:
+            counts['questions'] += 1
+            key = AnswerCache.key(question, parser, fmt, locale)
+            cached = cache.get(key) if cache is not None and key not in in_flight else None
+            if key in in_flight:
+                window.append((question_id, question, in_flight[key], 'duplicate'))
+            elif cached is not None:
+                window.append((question_id, question, cached, 'cache'))
+            else:
+                in_flight[key] = executor.submit(answer_record, engine, question, fmt, locale, include_data)
+                window.append((question_id, question, in_flight[key], 'engine'))
+            while len(window) > workers * 4 or (window and _ready(window[0][2])):
+                emit(*window.popleft())
+        while window:
+            emit(*window.popleft())
+
+    wall = time.perf_counter() - start
+    totals.sort()
+    counts.update({
+        'seconds': round(wall, 3),
+        'questions_per_second': round(counts['questions'] / wall, 3) if wall else 0.0,
+        'p50_ms': totals[len(totals) // 2] if totals else 0.0,
+        'p95_ms': totals[min(len(totals) - 1, int(len(totals) * 0.95))] if totals else 0.0,
+    })
+    return counts
+
+
+def _ready(item) -> bool:
+    return not hasattr(item, 'done') or item.done()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Answer a JSONL file of questions with QueryEngine")
+    parser.add_argument("input", help="JSONL questions file, or - for stdin")
+    parser.add_argument("--output", "-o", default="-", help="Where to write JSONL answers (default stdout)")
+    parser.add_argument("--field", help=f"Question field in each object (default: first of {', '.join(QUESTION_FIELDS)})")
+    parser.add_argument("--parser", choices=PARSERS, default="rules",
+                        help="rules: offline rule parser; stub: deterministic local LLM stub; gemini: GEMINI_API_KEY")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Questions answered concurrently")
+    parser.add_argument("--processes", type=int, help="Also run handlers in this many worker processes")
+    parser.add_argument("--format", choices=FORMATS, default=DEFAULT_FORMAT, dest="fmt")
+    parser.add_argument("--locale", choices=LOCALES, default=DEFAULT_LOCALE)
+    parser.add_argument("--data", default="catalog", choices=["catalog", "small", "medium", "large"],
+                        help="catalog: cached datasets; small/medium/large: generated data at that scale")
+    parser.add_argument("--cache-dir", default="data_cache", help="Dataset cache used with --data catalog")
+    parser.add_argument("--answer-cache", help="Directory of answers reused across runs of the same data")
+    parser.add_argument("--snapshot-dir", help="Warm-start the engine from snapshots in this directory")
+    parser.add_argument("--include-data", action="store_true", help="Add each result's data to its line")
+    parser.add_argument("--verbose", action="store_true", help="Show the engine's progress output on stderr")
+    args = parser.parse_args(argv)
+
+    out = sys.stdout if args.output == "-" else open(args.output, 'w', encoding='utf-8')
+    source = sys.stdin if args.input == "-" else open(args.input, encoding='utf-8')
+    # The engine reports progress with print(); keep stdout for answers only
+    log = sys.stderr if args.verbose else open(os.devnull, 'w')
+    stub = contextlib.nullcontext()
+    if args.parser == 'stub':
+        from benchmark import stub_llm
+        stub = stub_llm()
+    try:
+        with contextlib.redirect_stdout(log), stub:
+            t0 = time.perf_counter()
+            data = load_data(args.data, args.cache_dir)
+            # Keyed on the data as loaded, so a built and a restored engine find the same files
+            version = None
+            if args.answer_cache or args.snapshot_dir:
+                from engine_snapshot import dataset_version
+                version = dataset_version(data)
+            engine = build_engine(args.parser, data, args.snapshot_dir, version)
+            if args.processes:
+                engine.enable_process_pool(args.processes)
+            print(f"🌾 Engine ready in {(time.perf_counter() - t0) * 1000:.0f} ms", file=sys.stderr)
+
+            cache = None
+            if args.answer_cache:
+                cache = AnswerCache(args.answer_cache, version)
+                print(f"🗃️ {len(cache)} cached answers in {cache.path}", file=sys.stderr)
+
+            summary = run_batch(engine, read_questions(source, args.field), out, workers=args.workers,
+                                fmt=args.fmt, locale=args.locale, parser=args.parser, cache=cache,
+                                include_data=args.include_data)
+            engine.close()
+    finally:
+        for handle in (out, source, log):
+            if handle not in (sys.stdout, sys.stdin, sys.stderr):
+                handle.close()
+
+    print(f"✅ {summary['questions']} questions in {summary['seconds']:.1f}s "
+          f"({summary['questions_per_second']:.1f} q/s): {summary['engine']} answered, "
+          f"{summary['duplicate']} duplicates, {summary['cache']} from cache, {summary['errors']} errors; "
+          f"p50 {summary['p50_ms']:.1f} ms, p95 {summary['p95_ms']:.1f} ms", file=sys.stderr)
+    return 1 if summary['errors'] == summary['questions'] and summary['questions'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,18 +3,44 @@ Data Collector Module for Project Samarth
 Fetches and caches data from data.gov.in
 """
 
-import requests
 import pandas as pd
 import json
 import os
+import hashlib
+import random
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import time
+import metrics
+
+DEFAULT_BASE_URL = "https://api.data.gov.in/resource"
+DEFAULT_API_KEY = "579b464db66ec23bdd000001cdd3946e44ce4aad7209ff7b23ac571b"
+
+# Fetch modes: "live" talks to the API, "record" talks to the API and saves every
+# response under replay_dir, "replay" serves only from replay_dir (no network)
+FETCH_MODES = ("live", "record", "replay")
+
+
+class ReplayMissError(LookupError):
+    """Raised in replay mode when no recorded response matches a request"""
+
 
 class DataCollector:
-    def __init__(self, cache_dir="data_cache"):
+    def __init__(self, cache_dir="data_cache", base_url=None, mode=None, replay_dir=None,
+                 api_key=None, max_retries=3, backoff=0.5, timeout=30):
         self.cache_dir = cache_dir
-        self.base_url = "https://api.data.gov.in/resource"
+        self.base_url = (base_url or os.getenv("DATA_GOV_BASE_URL") or DEFAULT_BASE_URL).rstrip("/")
+        self.api_key = api_key or os.getenv("DATA_GOV_API_KEY") or DEFAULT_API_KEY
+        self.mode = mode or os.getenv("DATA_GOV_MODE", "live")
+        if self.mode not in FETCH_MODES:
+            raise ValueError(f"Unknown fetch mode '{self.mode}', expected one of {FETCH_MODES}")
+        self.replay_dir = replay_dir or f"{cache_dir}/replay"
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
         os.makedirs(cache_dir, exist_ok=True)
+        if self.mode != "live":
+            os.makedirs(self.replay_dir, exist_ok=True)
         
         # Key dataset IDs from data.gov.in
         self.datasets = {
@@ -22,42 +48,124 @@ class DataCollector:
             "rainfall": "eb1f4e8f-e7b5-4f8f-a7d7-7f3d9c6c4b8a",     # Rainfall data
         }
     
-    def fetch_data(self, resource_id, filters=None, limit=10000):
+    @staticmethod
+    def _key_params(params):
+        """Request params without the API key, as keyed and shown in errors"""
+        return {k: str(v) for k, v in params.items() if k != "api-key"}
+    
+    def _replay_file(self, resource_id, params):
+        """Recorded-response path for a request (the API key is not part of the key)"""
+        digest = hashlib.sha1(
+            json.dumps([resource_id, self._key_params(params)], sort_keys=True).encode()
+        ).hexdigest()[:16]
+        return f"{self.replay_dir}/{resource_id}-{digest}.json"
+    
+    def _request(self, resource_id, params):
+        """GET one resource page, with replay/record support and retries"""
+        replay_file = self._replay_file(resource_id, params)
+        
+        if self.mode == "replay":
+            if not os.path.exists(replay_file):
+                raise ReplayMissError(f"No recorded response for {resource_id} {self._key_params(params)}")
+            with open(replay_file, 'r') as f:
+                return json.load(f)
+        
+        # Imported here so cached and replayed runs never load the HTTP stack
+        import requests
+        url = f"{self.base_url}/{resource_id}"
+        for attempt in range(self.max_retries + 1):
+            try:
+                with metrics.FETCH_LATENCY.time():
+                    response = requests.get(url, params=params, timeout=self.timeout)
+                # Only throttling and server-side errors are worth retrying
+                if response.status_code == 429 or response.status_code >= 500:
+                    raise requests.HTTPError(f"{response.status_code} from {url}", response=response)
+                response.raise_for_status()
+                data = response.json()
+                break
+            except (requests.ConnectionError, requests.Timeout, requests.HTTPError) as e:
+                status = getattr(getattr(e, "response", None), "status_code", None)
+                retryable = status is None or status == 429 or status >= 500
+                if not retryable or attempt == self.max_retries:
+                    raise
+                # Exponential backoff with jitter so concurrent pages don't retry in lockstep
+                time.sleep(self.backoff * (2 ** attempt) * (0.5 + random.random() / 2))
+        
+        if self.mode == "record":
+            with open(replay_file, 'w') as f:
+                json.dump(data, f)
+        
+        return data
+    
+    def fetch_data(self, resource_id, filters=None, limit=10000, offset=0):
         """Fetch data from data.gov.in API"""
-        cache_file = f"{self.cache_dir}/{resource_id}.json"
+        suffix = f"-{offset}" if offset else ""
+        cache_file = f"{self.cache_dir}/{resource_id}{suffix}.json"
         
         # Check cache first
         if os.path.exists(cache_file):
             age = time.time() - os.path.getmtime(cache_file)
             if age < 86400:  # 24 hours
+                metrics.FETCH_CACHE.inc(labels={"result": "hit"})
                 with open(cache_file, 'r') as f:
                     return json.load(f)
+        metrics.FETCH_CACHE.inc(labels={"result": "miss"})
         
         # Fetch from API
         params = {
-            "api-key": "579b464db66ec23bdd000001cdd3946e44ce4aad7209ff7b23ac571b",
+            "api-key": self.api_key,
             "format": "json",
             "limit": limit
         }
+        if offset:
+            params["offset"] = offset
         
         if filters:
             params["filters"] = json.dumps(filters)
         
         try:
-            url = f"{self.base_url}/{resource_id}"
-            response = requests.get(url, params=params, timeout=30)
-            response.raise_for_status()
-            data = response.json()
+            data = self._request(resource_id, params)
             
             # Cache the response
             with open(cache_file, 'w') as f:
                 json.dump(data, f)
             
             return data
+        except ReplayMissError:
+            # A replay run must not quietly carry on without the data it was recorded with
+            metrics.FETCH_ERRORS.inc()
+            raise
         except Exception as e:
+            metrics.FETCH_ERRORS.inc()
             print(f"Error fetching data: {e}")
             return None
     
+    def fetch_all_pages(self, resource_id, filters=None, page_size=1000, max_workers=4):
+        """Fetch every record of a resource, paging with offset/limit
+        
+        The first page is fetched alone to learn the total; the remaining
+        pages are fetched concurrently. Pages are not written to the JSON
+        cache, and a failed page raises instead of returning partial data.
+        """
+        base_params = {"api-key": self.api_key, "format": "json", "limit": page_size}
+        if filters:
+            base_params["filters"] = json.dumps(filters)
+        
+        first = self._request(resource_id, dict(base_params, offset=0))
+        records = list(first.get("records", []))
+        total = int(first.get("total", len(records)))
+        
+        offsets = range(page_size, total, page_size)
+        if not offsets:
+            return records
+        
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+            pages = pool.map(lambda off: self._request(resource_id, dict(base_params, offset=off)), offsets)
+            for page in pages:
+                records.extend(page.get("records", []))
+        
+        return records
+    
     def get_crop_production_data(self):
         """Get agricultural production data"""
         cache_file = f"{self.cache_dir}/crop_production.csv"
@@ -107,10 +215,12 @@ class DataCollector:
     
     def get_all_data(self):
         """Load all datasets"""
-        return {
+        data = {
             'crop_production': self.get_crop_production_data(),
             'rainfall': self.get_rainfall_data()
         }
+        metrics.record_datasets(data)
+        return data
 
 if __name__ == "__main__":
     collector = DataCollector()
@@ -0,0 +1,154 @@
+"""
+Dataset Catalog Module for Project Samarth
+Partitions cached datasets by state on disk and keeps their metadata (row
+counts, columns, year range, entity names) in metadata.json, so the app can
+start and describe the data without loading it, and queries load only the
+state partitions they touch
+"""
+
+import json
+import os
+import re
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import pandas as pd
+
+from data_collector import DataCollector
+from entity_resolver import entity_key
+
+CATALOG_VERSION = 1
+PARTITION_COLUMN = 'State'
+# Partition label used when a dataset has no State column
+WHOLE_DATASET = '*'
+ENTITY_COLUMNS = ('State', 'District', 'Crop', 'Season')
+
+
+def _slug(value) -> str:
+    return re.sub(r'[^a-z0-9]+', '_', str(value).lower()).strip('_') or 'unknown'
+
+
+class DatasetCatalog:
+    """Lazily loaded, state-partitioned view of the DataCollector datasets
+
+    Partitions and metadata are rebuilt only when a source CSV in the
+    cache changes (size or modification time), so a restart reads one
+    small JSON file instead of every dataset.
+    """
+
+    def __init__(self, collector: Optional[DataCollector] = None, cache_dir: Optional[str] = None):
+        self.collector = collector or DataCollector()
+        self.cache_dir = cache_dir or self.collector.cache_dir
+        self.root = f"{self.cache_dir}/catalog"
+        self.loaders = {
+            'crop_production': self.collector.get_crop_production_data,
+            'rainfall': self.collector.get_rainfall_data,
+        }
+        self.metadata = self._open()
+
+    def _metadata_path(self) -> str:
+        return f"{self.root}/metadata.json"
+
+    def _fingerprint(self, name: str) -> Optional[str]:
+        path = f"{self.cache_dir}/{name}.csv"
+        if not os.path.exists(path):
+            return None
+        stat = os.stat(path)
+        return f"{stat.st_size}-{int(stat.st_mtime)}"
+
+    def _open(self) -> Dict:
+        metadata = {}
+        try:
+            with open(self._metadata_path()) as f:
+                metadata = json.load(f)
+        except (OSError, ValueError):
+            pass
+        if metadata.get('version') != CATALOG_VERSION:
+            metadata = {'version': CATALOG_VERSION, 'datasets': {}}
+
+        stale = [name for name in self.loaders
+                 if name not in metadata['datasets']
+                 or metadata['datasets'][name].get('fingerprint') != self._fingerprint(name)]
+        for name in stale:
+            print(f"📦 Partitioning {name} for the catalog...")
+            metadata['datasets'][name] = self._build(name)
+        if stale:
+            self._write(metadata)
+        return metadata
+
+    def _build(self, name: str) -> Dict:
+        """Load one dataset in full, write its partitions and describe it"""
+        df = self.loaders[name]()
+        os.makedirs(f"{self.root}/{name}", exist_ok=True)
+
+        partitions = {}
+        if PARTITION_COLUMN in df.columns:
+            groups = df.groupby(df[PARTITION_COLUMN].fillna('Unknown').astype(str), sort=True)
+        else:
+            groups = [(WHOLE_DATASET, df)]
+        for state, part in groups:
+            path = f"{name}/{_slug(state)}.pkl"
+            part.reset_index(drop=True).to_pickle(f"{self.root}/{path}")
+            partitions[state] = {'file': path, 'rows': len(part)}
+
+        entry = {
+            'rows': len(df),
+            'columns': df.columns.tolist(),
+            'memory_bytes': int(df.memory_usage(deep=True).sum()),
+            'distinct': {col: int(df[col].nunique()) for col in ENTITY_COLUMNS if col in df.columns},
+            'values': {col: sorted(df[col].dropna().astype(str).unique().tolist())
+                       for col in ENTITY_COLUMNS if col in df.columns},
+            'partitions': partitions,
+            'fingerprint': self._fingerprint(name),
+        }
+        if 'Year' in df.columns and len(df):
+            entry['years'] = [int(df['Year'].min()), int(df['Year'].max())]
+        if {'State', 'District'}.issubset(df.columns):
+            entry['district_pairs'] = df[['State', 'District']].drop_duplicates().astype(str).values.tolist()
+        return entry
+
+    def _write(self, metadata: Dict):
+        os.makedirs(self.root, exist_ok=True)
+        tmp = f"{self._metadata_path()}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(metadata, f)
+        os.replace(tmp, self._metadata_path())
+
+    def names(self) -> List[str]:
+        return list(self.metadata['datasets'])
+
+    def stats(self, name: str) -> Dict:
+        """Precomputed description of one dataset (no data is loaded)"""
+        return self.metadata['datasets'][name]
+
+    def entity_values(self, name: str) -> Dict[str, List[str]]:
+        return self.stats(name).get('values', {})
+
+    def district_pairs(self) -> Dict[str, pd.DataFrame]:
+        """Distinct (State, District) pairs per dataset, for the district crosswalk"""
+        return {
+            name: pd.DataFrame(entry['district_pairs'], columns=['State', 'District'])
+            for name, entry in self.metadata['datasets'].items() if 'district_pairs' in entry
+        }
+
+    def all_partitions(self) -> Set[Tuple[str, str]]:
+        return {(name, state) for name, entry in self.metadata['datasets'].items()
+                for state in entry['partitions']}
+
+    def partitions_for(self, states: Iterable[str]) -> Set[Tuple[str, str]]:
+        """Partitions of the requested states, compared on entity_key
+
+        Pass resolved state names: 'Uttar Pradesh' or 'uttar  pradesh'
+        match that partition, and 'Pradesh' matches none. Unpartitioned
+        datasets are always included.
+        """
+        wanted = {entity_key(s) for s in states if s}
+        return {(name, state) for name, state in self.all_partitions()
+                if state == WHOLE_DATASET or entity_key(state) in wanted}
+
+    def load(self, partitions: Iterable[Tuple[str, str]]) -> Dict[str, pd.DataFrame]:
+        """Read partitions from disk, concatenated per dataset"""
+        frames = {}
+        for name, state in sorted(partitions):
+            info = self.stats(name)['partitions'][state]
+            frames.setdefault(name, []).append(pd.read_pickle(f"{self.root}/{info['file']}"))
+        return {name: pd.concat(parts, ignore_index=True) for name, parts in frames.items()}
@@ -0,0 +1,91 @@
+"""
+Derived Metrics Module for Project Samarth
+Yield (Production / Area) materialized at load time, with area-weighted
+state and district aggregates that handlers rank and trend on directly
+"""
+
+from typing import Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Metrics the query planner can ask for, with their column and display unit
+METRICS = {
+    'production': {'column': 'Production', 'unit': 'tonnes', 'label': 'Production', 'decimals': 0},
+    'area': {'column': 'Area', 'unit': 'hectares', 'label': 'Area', 'decimals': 0},
+    'yield': {'column': 'Yield', 'unit': 'tonnes/hectare', 'label': 'Yield', 'decimals': 2},
+}
+
+# Question phrases that mean "rank / trend on yield, not raw production"
+YIELD_KEYWORDS = ('yield', 'productivity', 'productive', 'per hectare', 'efficiency')
+
+
+def compute_yield(production: pd.Series, area: pd.Series) -> np.ndarray:
+    """Production / Area, NaN where area is missing or zero"""
+    production = pd.to_numeric(production, errors='coerce').to_numpy(dtype=float)
+    area = pd.to_numeric(area, errors='coerce').to_numpy(dtype=float)
+    valid = (area > 0) & ~np.isnan(production)
+    return np.divide(production, area, out=np.full(len(area), np.nan), where=valid)
+
+
+def weighted_aggregate(df: pd.DataFrame, keys: Tuple[str, ...]) -> pd.DataFrame:
+    """Sum Production and Area per key and derive yield as sum(P) / sum(A)
+
+    Only rows with both a production figure and a positive area count
+    towards the yield, so a row missing its area cannot inflate it.
+    Averaging row-level yields instead would over-weight small plots.
+    """
+    production = pd.to_numeric(df['Production'], errors='coerce')
+    area = pd.to_numeric(df['Area'], errors='coerce')
+    valid = (area > 0) & production.notna()
+    parts = pd.DataFrame({
+        'Production': production,
+        'Area': area,
+        '_yield_production': production.where(valid),
+        '_yield_area': area.where(valid),
+    })
+    for key in keys:
+        parts[key] = df[key]
+    grouped = parts.groupby(list(keys), observed=True, sort=True).sum(min_count=1)
+    grouped['Yield'] = compute_yield(grouped.pop('_yield_production'), grouped.pop('_yield_area'))
+    return grouped.reset_index()
+
+
+class DerivedMetrics:
+    """Yield column on the crop table plus weighted per-level aggregates
+
+    Built once when the engine loads, so yield questions are filters over
+    small precomputed tables rather than per-request division and groupby.
+    """
+
+    LEVELS = {
+        'state': ('State', 'Crop', 'Year'),
+        'district': ('State', 'District', 'Crop', 'Year'),
+    }
+
+    def __init__(self, crop_df: pd.DataFrame):
+        crop_df['Yield'] = compute_yield(crop_df['Production'], crop_df['Area'])
+        self.crop_df = crop_df
+        # Carry the canonical district id through when the crosswalk assigned one
+        self.keys = {
+            level: keys if level != 'district' or 'District_ID' not in crop_df.columns
+            else keys[:2] + ('District_ID',) + keys[2:]
+            for level, keys in self.LEVELS.items()
+            if all(key in crop_df.columns for key in keys)
+        }
+        self.tables: Dict[str, pd.DataFrame] = {
+            level: weighted_aggregate(crop_df, keys) for level, keys in self.keys.items()
+        }
+
+    @staticmethod
+    def supports(crop_df: pd.DataFrame) -> bool:
+        return {'Production', 'Area'}.issubset(crop_df.columns)
+
+    def table(self, level: str) -> pd.DataFrame:
+        return self.tables[level]
+
+
+def metric_for(query_text: str) -> str:
+    """'yield' when the question asks about productivity, else 'production'"""
+    query_text = query_text.lower()
+    return 'yield' if any(keyword in query_text for keyword in YIELD_KEYWORDS) else 'production'
@@ -0,0 +1,176 @@
+"""
+District Index Module for Project Samarth
+Shared district-name cleaning, a crosswalk assigning canonical District_IDs
+across the crop and rainfall tables, and a (District, Crop, Year) fact table
+that joins production with rainfall once at load
+"""
+
+import re
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from trend_analytics import row_correlation
+
+# Known misspellings / OCR issues in data.gov.in district names
+DISTRICT_CORRECTIONS = {
+    'Mritsar': 'Amritsar',
+    'Mritsara': 'Amritsar',
+    'Mirtsar': 'Amritsar',
+    'Chnadigarh': 'Chandigarh',
+    'Patila': 'Patiala'
+}
+
+
+def clean_district_names(series: pd.Series) -> pd.Series:
+    """Strip, drop non-letters, title-case and correct known misspellings
+
+    Cleans each distinct name once and maps the result back, so the cost
+    scales with the number of districts rather than rows. A categorical
+    (e.g. memory-mapped shared data) stays one, over recoded categories.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        cleaned = _clean_names(pd.Series(series.cat.categories.astype(str)))
+        if cleaned.is_unique and cleaned.is_monotonic_increasing:
+            # Same codes, so mapped codes stay mapped
+            return series.cat.rename_categories(list(cleaned))
+        categories = pd.Index(sorted(cleaned.unique()), dtype=str)
+        recode = np.append(categories.get_indexer(cleaned), -1)
+        codes = recode[series.cat.codes.to_numpy()].astype(series.cat.codes.dtype)
+        return pd.Series(pd.Categorical.from_codes(codes, categories), index=series.index, name=series.name)
+    unique = pd.Series(series.astype(str).unique())
+    return series.astype(str).map(dict(zip(unique, _clean_names(unique))))
+
+
+def _clean_names(names: pd.Series) -> pd.Series:
+    return (
+        names
+        .str.strip()
+        .str.replace(r'[^a-zA-Z\s]', '', regex=True)
+        .str.title()
+        .replace(DISTRICT_CORRECTIONS)
+    )
+
+
+def normalize(name) -> str:
+    """Comparison key: lowercase letters only ('Sri Ganganagar' == 'sriganganagar')"""
+    return re.sub(r'[^a-z]', '', str(name).lower())
+
+
+class DistrictCrosswalk:
+    """Canonical District_ID for every (State, District) across datasets
+
+    The same district is matched across tables on normalized state and
+    district names; the first spelling seen becomes its display name.
+    """
+
+    def __init__(self, frames: Dict[str, pd.DataFrame]):
+        pairs = []
+        for source, df in frames.items():
+            if df is None or not {'State', 'District'}.issubset(df.columns):
+                continue
+            unique = df[['State', 'District']].drop_duplicates().astype(str)
+            unique['source'] = source
+            pairs.append(unique)
+        if pairs:
+            pairs = pd.concat(pairs, ignore_index=True)
+        else:
+            pairs = pd.DataFrame(columns=['State', 'District', 'source'])
+
+        pairs['_key'] = pairs['State'].map(normalize) + '|' + pairs['District'].map(normalize)
+        pairs['District_ID'], _ = pd.factorize(pairs['_key'])
+        self._ids = dict(zip(pairs['_key'], pairs['District_ID']))
+
+        self.table = (
+            pairs.groupby('District_ID', sort=True)
+            .agg(State=('State', 'first'), District=('District', 'first'),
+                 sources=('source', lambda s: ",".join(sorted(set(s)))))
+            .reset_index()
+        )
+        self._by_name = {}
+        for district_id, district in zip(self.table['District_ID'], self.table['District']):
+            self._by_name.setdefault(normalize(district), []).append(district_id)
+
+    def assign(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Add a District_ID column (-1 for unknown pairs) in place"""
+        if not {'State', 'District'}.issubset(df.columns):
+            return df
+        unique = df[['State', 'District']].drop_duplicates()
+        keys = unique['State'].astype(str).map(normalize) + '|' + unique['District'].astype(str).map(normalize)
+        ids = pd.Series([self._ids.get(k, -1) for k in keys], index=pd.MultiIndex.from_frame(unique.astype(str)))
+        row_keys = pd.MultiIndex.from_frame(df[['State', 'District']].astype(str))
+        df['District_ID'] = ids.reindex(row_keys).to_numpy(dtype=np.int32)
+        return df
+
+    def resolve(self, name: str, states: Optional[List[str]] = None) -> List[int]:
+        """District_IDs matching a name (exact, then partial), optionally within states"""
+        key = normalize(name)
+        ids = list(self._by_name.get(key, []))
+        if not ids and key:
+            ids = [i for k, group in self._by_name.items() if key in k for i in group]
+        if states and ids:
+            wanted = {normalize(s) for s in states}
+            in_states = [i for i in ids if normalize(self.table.at[i, 'State']) in wanted]
+            ids = in_states or ids
+        return ids
+
+    def name(self, district_id: int) -> str:
+        row = self.table.loc[district_id]
+        return f"{row['District']}, {row['State']}"
+
+
+class DistrictFacts:
+    """Production, area, yield and rainfall per (District_ID, Crop, Year)
+
+    Rows are sorted by (District_ID, Crop, Year) and each series' row range
+    is indexed, so a district question slices instead of merging.
+    """
+
+    KEYS = ['District_ID', 'Crop', 'Year']
+
+    def __init__(self, district_table: pd.DataFrame, rain_df: Optional[pd.DataFrame]):
+        facts = district_table[district_table['District_ID'] >= 0]
+        rain_columns = []
+        if rain_df is not None and 'District_ID' in rain_df.columns:
+            rain_columns = [c for c in ('Annual_Rainfall_mm', 'Monsoon_Rainfall_mm') if c in rain_df.columns]
+            rain = rain_df[rain_df['District_ID'] >= 0].groupby(['District_ID', 'Year'])[rain_columns].mean()
+            facts = facts.merge(rain.reset_index(), on=['District_ID', 'Year'], how='left')
+        self.rain_columns = rain_columns
+        self.table = facts.sort_values(self.KEYS, kind='stable').reset_index(drop=True)
+
+        ids = self.table['District_ID'].to_numpy()
+        crops = self.table['Crop'].astype(str).to_numpy()
+        starts = np.flatnonzero(np.r_[True, (ids[1:] != ids[:-1]) | (crops[1:] != crops[:-1])])
+        ends = np.r_[starts[1:], len(ids)]
+        self._slices = {(int(ids[s]), crops[s].lower()): (s, e) for s, e in zip(starts, ends)}
+        self._correlations = None
+
+    def has(self, district_id: int, crop: str) -> bool:
+        return (district_id, crop.lower()) in self._slices
+
+    def series(self, district_id: int, crop: str, last_n: Optional[int] = None) -> pd.DataFrame:
+        """Year-indexed facts for one district and crop"""
+        bounds = self._slices.get((district_id, crop.lower()))
+        if bounds is None:
+            return self.table.iloc[0:0].set_index('Year')
+        frame = self.table.iloc[bounds[0]:bounds[1]].set_index('Year')
+        return frame.iloc[-last_n:] if last_n else frame
+
+    def correlations(self) -> pd.DataFrame:
+        """Full-history correlation of production and yield with annual rainfall per (District_ID, Crop)"""
+        if self._correlations is None:
+            if 'Annual_Rainfall_mm' not in self.rain_columns:
+                self._correlations = pd.DataFrame()
+                return self._correlations
+            keys = ['District_ID', 'Crop']
+            rain = self.table.pivot_table(index=keys, columns='Year', values='Annual_Rainfall_mm', observed=True)
+            result = {}
+            for column in ('Production', 'Yield'):
+                if column in self.table.columns:
+                    wide = self.table.pivot_table(index=keys, columns='Year', values=column, observed=True)
+                    wide = wide.reindex(index=rain.index, columns=rain.columns)
+                    result[f"{column.lower()}_rainfall_correlation"] = row_correlation(
+                        wide.to_numpy(dtype=float), rain.to_numpy(dtype=float))
+            self._correlations = pd.DataFrame(result, index=rain.index)
+        return self._correlations
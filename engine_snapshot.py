@@ -0,0 +1,272 @@
+"""
+Engine Snapshot Module for Project Samarth
+Persists a prepared QueryEngine (cleaned data, district crosswalk,
+derived tables, trend/resilience indexes, schema and entity dictionaries)
+keyed on the dataset version, so a new replica restores it by memory-mapping
+the arrays instead of rebuilding everything on cold start
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+import metrics
+from process_pool import export_shared, open_shared
+from settings import env
+
+SNAPSHOT_LOADS = metrics.REGISTRY.counter("samarth_snapshot_loads_total",
+                                          "Engine warm starts, by outcome (restored/built/failed)")
+
+# Bump when the on-disk layout changes
+SNAPSHOT_FORMAT = 1
+# Snapshot versions kept per root (older ones are removed after a save)
+DEFAULT_KEEP = 2
+# Smaller arrays are pickled inline rather than memory-mapped
+MIN_MMAP_ELEMENTS = 4096
+
+# Engine attributes that make up the prepared state
+STATE_ATTRIBUTES = ('data', '_loaded_partitions', 'derived', '_district_facts', '_trend_indexes',
+                    '_resilience_indexes', 'crosswalk', 'data_schema', 'entities', 'resolver', '_prompt_prefix')
+# Modules whose code shapes the pickled state; editing one invalidates old snapshots
+SOURCE_MODULES = ('query_engine', 'derived_metrics', 'district_index', 'trend_analytics',
+                  'recommendations', 'dataset_catalog', 'entity_resolver', 'engine_snapshot')
+
+
+def _source_digest() -> str:
+    digest = hashlib.sha1()
+    here = os.path.dirname(os.path.abspath(__file__))
+    for module in SOURCE_MODULES:
+        path = f"{here}/{module}.py"
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+    return digest.hexdigest()
+
+
+def dataset_version(data) -> str:
+    """Key for a snapshot: the data it was built from plus the engine code
+
+    A catalog is keyed on its source fingerprints (no rows are read); a
+    dict of frames on a hash of their contents.
+    """
+    digest = hashlib.sha1(f"format={SNAPSHOT_FORMAT}\n".encode())
+    digest.update(_source_digest().encode())
+    if hasattr(data, 'metadata'):
+        datasets = data.metadata['datasets']
+        digest.update(json.dumps({name: [entry.get('fingerprint'), entry.get('rows')]
+                                  for name, entry in sorted(datasets.items())}).encode())
+    else:
+        for name in sorted(data):
+            df = data[name]
+            digest.update(f"{name}:{df.shape}:{list(map(str, df.columns))}".encode())
+            digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()[:16]
+
+
+def _mappable(df: pd.DataFrame) -> bool:
+    """Whether export_shared/open_shared round-trips this frame exactly"""
+    if not isinstance(df.index, pd.RangeIndex) or df.index.start != 0 or df.index.step != 1:
+        return False
+    if not df.columns.is_unique or not all(isinstance(col, str) for col in df.columns):
+        return False
+    for col in df.columns:
+        dtype = df[col].dtype
+        if isinstance(dtype, np.dtype) and dtype.kind in 'biuf':
+            continue
+        # Frames restored from a snapshot or the pool hold text as categoricals
+        if isinstance(dtype, pd.CategoricalDtype):
+            dtype = dtype.categories.dtype
+            if pd.api.types.is_string_dtype(dtype) or dtype == object:
+                continue
+            return False
+        if pd.api.types.infer_dtype(df[col], skipna=True) not in ('string', 'empty'):
+            return False
+    return True
+
+
+class _SnapshotPickler(pickle.Pickler):
+    """Pickles engine state with large frames and arrays written as .npy files
+
+    Every object is written once however many indexes reference it, and
+    comes back shared in the same way.
+    """
+
+    def __init__(self, file, directory: str):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.directory = directory
+        self.refs: Dict[int, tuple] = {}
+        # Holds written objects so their ids cannot be reused mid-pickle
+        self._alive = []
+
+    def persistent_id(self, obj):
+        if isinstance(obj, pd.DataFrame):
+            kind = 'frame'
+        elif isinstance(obj, np.ndarray) and obj.dtype.kind in 'biufcmM' and obj.size >= MIN_MMAP_ELEMENTS:
+            kind = 'array'
+        else:
+            return None
+        if id(obj) in self.refs:
+            return self.refs[id(obj)]
+        if kind == 'frame' and not _mappable(obj):
+            return None
+
+        name = f"{kind}{len(self.refs)}"
+        if kind == 'frame':
+            export_shared({name: obj}, f"{self.directory}/frames")
+        else:
+            os.makedirs(f"{self.directory}/arrays", exist_ok=True)
+            np.save(f"{self.directory}/arrays/{name}.npy", np.ascontiguousarray(obj))
+        self.refs[id(obj)] = (kind, name)
+        self._alive.append(obj)
+        return self.refs[id(obj)]
+
+
+class _SnapshotUnpickler(pickle.Unpickler):
+    def __init__(self, file, directory: str):
+        super().__init__(file)
+        self.directory = directory
+        frames_dir = f"{directory}/frames"
+        self.frames = open_shared(frames_dir) if os.path.isdir(frames_dir) else {}
+        self.arrays: Dict[str, np.ndarray] = {}
+
+    def persistent_load(self, pid):
+        kind, name = pid
+        if kind == 'frame':
+            return self.frames[name]
+        if name not in self.arrays:
+            self.arrays[name] = np.load(f"{self.directory}/arrays/{name}.npy", mmap_mode='r')
+        return self.arrays[name]
+
+
+def save_snapshot(engine, directory: str, version: Optional[str] = None) -> str:
+    """Write the engine's prepared state under directory/<version>
+
+    An engine over in-memory frames is warmed first (every index built).
+    A catalog engine is saved as loaded so far, since warming it would
+    read every partition and undo lazy loading; once restored, it loads
+    the rest on demand as the original would. The snapshot is written to
+    a temporary directory and renamed into place, so concurrent replicas
+    never see a partial one.
+    """
+    version = version or dataset_version(engine.catalog if engine.catalog is not None else engine.data)
+    target = f"{directory}/{version}"
+    if os.path.exists(f"{target}/manifest.json"):
+        return target
+
+    if engine.catalog is None:
+        engine.warm_up()
+    tmp = f"{target}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    try:
+        write_state(engine, tmp, version)
+        os.rename(tmp, target)
+    except OSError:
+        # Another replica renamed its copy into place first
+        shutil.rmtree(tmp, ignore_errors=True)
+        if not os.path.exists(f"{target}/manifest.json"):
+            raise
+    except Exception:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    print(f"💾 Saved engine snapshot {version} to {target}")
+    prune_snapshots(directory)
+    return target
+
+
+def write_state(engine, directory: str, version: Optional[str] = None) -> Dict[str, Any]:
+    """Write the engine's state and manifest into an existing directory, as it is now
+
+    Nothing is built first. save_snapshot uses this for versioned
+    snapshots; the process pool uses it to hand its workers a prepared
+    engine to restore.
+    """
+    # Held so a partition loaded meanwhile cannot pair new frames with old indexes
+    with engine._lock:
+        state = {attr: getattr(engine, attr) for attr in STATE_ATTRIBUTES}
+        with open(f"{directory}/state.pkl", 'wb') as f:
+            pickler = _SnapshotPickler(f, directory)
+            pickler.dump(state)
+        data = state['data']
+    manifest = {
+        'format': SNAPSHOT_FORMAT,
+        'version': version,
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'model_name': getattr(engine, 'model_name', None),
+        'partitions': sorted(f"{name}/{partition}" for name, partition in state['_loaded_partitions']),
+        'rows': {name: len(df) for name, df in data.items()},
+        'memory_bytes': {name: int(df.memory_usage(deep=True).sum()) for name, df in data.items()},
+        'mapped': len(pickler.refs),
+    }
+    with open(f"{directory}/manifest.json", 'w') as f:
+        json.dump(manifest, f)
+    return manifest
+
+
+def load_snapshot(path: str) -> Dict[str, Any]:
+    """Manifest and engine state of one snapshot; arrays are memory-mapped, not read
+
+    The files must stay in place while the restored engine is in use.
+    """
+    with open(f"{path}/manifest.json") as f:
+        manifest = json.load(f)
+    if manifest.get('format') != SNAPSHOT_FORMAT:
+        raise ValueError(f"Snapshot format {manifest.get('format')} is not {SNAPSHOT_FORMAT}")
+    with open(f"{path}/state.pkl", 'rb') as f:
+        state = _SnapshotUnpickler(f, path).load()
+    return {'manifest': manifest, 'state': state}
+
+
+def prune_snapshots(directory: str, keep: int = DEFAULT_KEEP):
+    """Remove all but the `keep` newest snapshots under directory"""
+    snapshots = [entry.path for entry in os.scandir(directory)
+                 if entry.is_dir() and os.path.exists(f"{entry.path}/manifest.json")]
+    snapshots.sort(key=os.path.getmtime, reverse=True)
+    for path in snapshots[keep:]:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def warm_start(api_key: str, data, directory: Optional[str] = None, version: Optional[str] = None,
+               **engine_kwargs):
+    """QueryEngine restored from the snapshot for this data, building and saving one if missing
+
+    Pass `version` when the caller has already hashed the data.
+    """
+    from query_engine import QueryEngine
+    # Root directory for snapshots; unset disables warm starts in app.py and service.py
+    directory = directory or env("SAMARTH_SNAPSHOT_DIR")
+    if not directory:
+        return QueryEngine(api_key, data, **engine_kwargs)
+
+    version = version or dataset_version(data)
+    path = f"{directory}/{version}"
+    if os.path.exists(f"{path}/manifest.json"):
+        start = time.perf_counter()
+        try:
+            snapshot = load_snapshot(path)
+        except Exception as e:
+            SNAPSHOT_LOADS.inc(labels={"outcome": "failed"})
+            print(f"⚠️ Could not restore snapshot {version}, rebuilding: {e}")
+        else:
+            catalog = data if hasattr(data, 'metadata') else None
+            engine = QueryEngine.from_snapshot(api_key, snapshot, catalog=catalog, **engine_kwargs)
+            SNAPSHOT_LOADS.inc(labels={"outcome": "restored"})
+            print(f"⚡ Restored engine snapshot {version} in {(time.perf_counter() - start) * 1000:.1f} ms")
+            return engine
+
+    engine = QueryEngine(api_key, data, **engine_kwargs)
+    os.makedirs(directory, exist_ok=True)
+    try:
+        save_snapshot(engine, directory, version)
+        SNAPSHOT_LOADS.inc(labels={"outcome": "built"})
+    except Exception as e:
+        print(f"⚠️ Could not save engine snapshot: {e}")
+    return engine
@@ -0,0 +1,205 @@
+"""
+Entity Resolver Module for Project Samarth
+Resolves parsed state, district, crop and season names to the exact values
+in the data: exact and alias lookups first (UP -> Uttar Pradesh, paddy ->
+Rice), then misspellings through a prebuilt character-trigram index checked
+by edit distance, so handlers filter with isin instead of substring scans
+"""
+
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import metrics
+
+ENTITY_RESOLUTIONS = metrics.REGISTRY.counter("samarth_entity_resolutions_total",
+                                              "Parsed entity names resolved, by method (exact/alias/word/fuzzy/none)")
+
+# Common abbreviations and alternate names; targets missing from the data are ignored
+ALIASES = {
+    'State': {
+        'up': 'Uttar Pradesh', 'mp': 'Madhya Pradesh', 'hp': 'Himachal Pradesh', 'ap': 'Andhra Pradesh',
+        'tn': 'Tamil Nadu', 'wb': 'West Bengal', 'uk': 'Uttarakhand', 'jk': 'Jammu And Kashmir',
+        'j&k': 'Jammu And Kashmir', 'jammu & kashmir': 'Jammu And Kashmir', 'orissa': 'Odisha',
+        'uttaranchal': 'Uttarakhand', 'pondicherry': 'Puducherry', 'cg': 'Chhattisgarh',
+        'nct of delhi': 'Delhi',
+    },
+    'Crop': {
+        'paddy': 'Rice', 'soybean': 'Soyabean', 'soya': 'Soyabean', 'corn': 'Maize', 'mustard': 'Rapeseed & Mustard',
+        'rapeseed': 'Rapeseed & Mustard', 'arhar': 'Arhar/Tur', 'tur': 'Arhar/Tur', 'pigeon pea': 'Arhar/Tur',
+        'chickpea': 'Gram', 'chana': 'Gram', 'peanut': 'Groundnut', 'pearl millet': 'Bajra',
+        'sorghum': 'Jowar', 'finger millet': 'Ragi', 'green gram': 'Moong', 'black gram': 'Urad',
+        'lentil': 'Masoor', 'sesame': 'Sesamum', 'til': 'Sesamum', 'chilli': 'Dry Chillies',
+        'chillies': 'Dry Chillies', 'cassava': 'Tapioca', 'sugar cane': 'Sugarcane',
+    },
+}
+
+# Names shorter than this are only matched exactly or by alias
+MIN_FUZZY_LENGTH = 4
+# Candidates kept from the trigram index before the edit-distance check
+FUZZY_CANDIDATES = 8
+# Longest run of question words tried as one name ('rapeseed and mustard')
+MAX_SPAN_WORDS = 4
+# In free text, only words this long are checked as misspellings
+MIN_TEXT_FUZZY_LENGTH = 5
+# Question vocabulary that is never a misspelled name ('price' is not Rice, 'most' not Moth)
+QUESTION_WORDS = frozenset("""
+    about across analyse analyze annual area average based between compare comparison correlate
+    correlation crop crops data decade district districts drought during every grown growing hectare
+    hectares highest lowest maximum minimum most over past policy price prices produce produced
+    producing production rainfall recommend resistant season seasons show state states their these
+    tonnes total trend trends which where while yield yields
+""".split())
+
+
+def entity_key(name) -> str:
+    """Comparison key: lowercase letters and digits only ('Tamil  Nadu' == 'tamilnadu')"""
+    return re.sub(r'[^a-z0-9]', '', str(name).lower())
+
+
+def _trigrams(key: str) -> Set[str]:
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Levenshtein distance, or limit + 1 as soon as it must exceed limit"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+def _max_edits(key: str) -> int:
+    return 1 if len(key) <= 6 else 2 if len(key) <= 12 else 3
+
+
+class EntityResolver:
+    """Exact, alias and fuzzy lookup of entity names, per column
+
+    Every spelling in the data is grouped under its key; the first one
+    seen is the canonical name. The trigram postings and word index are
+    built once, so a lookup touches only names sharing trigrams with the
+    query.
+    """
+
+    def __init__(self, values: Iterable[Tuple[str, Iterable]], aliases: Optional[Dict[str, Dict[str, str]]] = None):
+        # column -> key -> every spelling with that key (canonical first)
+        self.spellings: Dict[str, Dict[str, List[str]]] = {}
+        for column, names in values:
+            by_key = self.spellings.setdefault(column, {})
+            for name in names:
+                name = str(name)
+                key = entity_key(name)
+                if key and name not in by_key.setdefault(key, []):
+                    by_key[key].append(name)
+
+        self.aliases: Dict[str, Dict[str, str]] = {}
+        for column, table in (ALIASES if aliases is None else aliases).items():
+            known = self.spellings.get(column, {})
+            self.aliases[column] = {entity_key(alias): entity_key(target) for alias, target in table.items()
+                                    if entity_key(target) in known}
+
+        self.trigrams: Dict[str, Dict[str, Set[str]]] = {}
+        self.words: Dict[str, Dict[str, Set[str]]] = {}
+        for column, by_key in self.spellings.items():
+            postings, words = {}, {}
+            for key, names in by_key.items():
+                for gram in _trigrams(key):
+                    postings.setdefault(gram, set()).add(key)
+                for word in re.findall(r'[a-z0-9]+', names[0].lower()):
+                    words.setdefault(word, set()).add(key)
+            self.trigrams[column], self.words[column] = postings, words
+
+    def _key_for(self, column: str, name, words: bool = True,
+                 min_fuzzy: Optional[int] = MIN_FUZZY_LENGTH) -> Tuple[Optional[str], str]:
+        """(key of the matching data name or None, how it was found); min_fuzzy=None skips fuzzy matching"""
+        known = self.spellings.get(column)
+        if not known:
+            return None, 'none'
+        key = entity_key(name)
+        if not key:
+            return None, 'none'
+        if key in known:
+            return key, 'exact'
+        alias = self.aliases.get(column, {}).get(key)
+        if alias:
+            return alias, 'alias'
+        # A distinctive word of one name ('bengal', 'kashmir')
+        word_keys = self.words[column].get(str(name).strip().lower()) if words else None
+        if word_keys and len(word_keys) == 1:
+            return next(iter(word_keys)), 'word'
+        if min_fuzzy is None or len(key) < min_fuzzy:
+            return None, 'none'
+
+        grams = _trigrams(key)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self.trigrams[column].get(gram, ()))
+        limit = _max_edits(key)
+        best, best_rank = None, None
+        for candidate, count in shared.most_common(FUZZY_CANDIDATES):
+            distance = edit_distance(key, candidate, limit)
+            if distance > limit:
+                continue
+            # Fewest edits wins; ties go to the larger trigram overlap
+            rank = (distance, -2.0 * count / (len(grams) + len(candidate) + 2))
+            if best_rank is None or rank < best_rank:
+                best, best_rank = candidate, rank
+        return best, 'fuzzy' if best else 'none'
+
+    def resolve(self, column: str, name) -> Optional[str]:
+        """Canonical data value for a parsed name, or None when nothing is close"""
+        key, method = self._key_for(column, name)
+        ENTITY_RESOLUTIONS.inc(labels={"method": method})
+        return self.spellings[column][key][0] if key else None
+
+    def mentions(self, column: str, text: str) -> List[str]:
+        """Canonical names mentioned in free text, in order of first mention
+
+        Runs of up to MAX_SPAN_WORDS words match exactly or by alias, the
+        longest run first ('west bengal' rather than 'bengal'); single
+        words may also match a misspelling ('panjab'). Lone words of longer
+        names and common question words are not matched, so 'small' is
+        not Small Millets, and two-letter aliases only when written in
+        capitals ('UP', not 'sum up').
+        """
+        if column not in self.spellings:
+            return []
+        words = re.findall(r'[A-Za-z0-9&]+', str(text))
+        tokens = [w.lower() for w in words]
+        found, i = [], 0
+        while i < len(tokens):
+            for width in range(min(MAX_SPAN_WORDS, len(tokens) - i), 0, -1):
+                span = tokens[i:i + width]
+                if width == 1 and span[0] in QUESTION_WORDS:
+                    break
+                key, method = self._key_for(column, " ".join(span), words=False,
+                                            min_fuzzy=MIN_TEXT_FUZZY_LENGTH if width == 1 else None)
+                if key and method == 'alias' and len(entity_key(" ".join(span))) <= 2 \
+                        and not "".join(words[i:i + width]).isupper():
+                    key = None
+                if key:
+                    ENTITY_RESOLUTIONS.inc(labels={"method": method})
+                    name = self.spellings[column][key][0]
+                    if name not in found:
+                        found.append(name)
+                    i += width - 1
+                    break
+            i += 1
+        return found
+
+    def variants(self, column: str, name) -> Tuple[str, ...]:
+        """Every data spelling of a resolved name (name itself when unknown), for isin filters"""
+        key = entity_key(name)
+        known = self.spellings.get(column, {})
+        if key not in known:
+            key, _ = self._key_for(column, name)
+        return tuple(known[key]) if key else (str(name),)
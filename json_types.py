@@ -0,0 +1,40 @@
+"""
+JSON Types Module for Project Samarth
+Converts results to plain JSON types. Kept apart from service.py so the
+engine, chart and history modules can use it without importing the ASGI
+service stack
+"""
+
+import math
+from datetime import date, datetime
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+
+def to_jsonable(value: Any) -> Any:
+    """Convert an answer_question result to plain JSON types
+
+    NumPy/pandas scalars become Python numbers, NaN becomes null, and
+    dict keys (years, ids) become strings as JSON requires.
+    """
+    if isinstance(value, dict):
+        return {str(to_jsonable(k)): to_jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple, set)):
+        return [to_jsonable(v) for v in value]
+    if isinstance(value, pd.DataFrame):
+        return to_jsonable(value.to_dict('records'))
+    if isinstance(value, (pd.Series, np.ndarray)):
+        return to_jsonable(value.tolist())
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    if value is pd.NaT:
+        return None
+    if isinstance(value, (pd.Timestamp, datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return str(value)
@@ -0,0 +1,267 @@
+"""
+LLM Client Module for Project Samarth
+Wraps the Gemini model with per-call deadlines, a circuit breaker, a
+process-wide rate limiter and request coalescing, so a slow, failing or
+saturated API degrades to the local parser instead of stalling users
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Optional
+
+import metrics
+from settings import env
+
+LLM_TIMEOUTS = metrics.REGISTRY.counter("samarth_llm_timeouts_total", "LLM calls that missed their deadline")
+CIRCUIT_STATE = metrics.REGISTRY.gauge("samarth_llm_circuit_open", "1 while the LLM circuit breaker is open")
+CIRCUIT_REJECTIONS = metrics.REGISTRY.counter("samarth_llm_circuit_rejections_total",
+                                              "Calls routed to the local parser because the circuit was open")
+LLM_THROTTLED = metrics.REGISTRY.counter("samarth_llm_throttled_total",
+                                         "Calls dropped by the client-side rate limiter")
+LLM_COALESCED = metrics.REGISTRY.counter("samarth_llm_coalesced_total",
+                                         "Calls that joined an identical in-flight request")
+
+
+def default_timeout() -> float:
+    """Per-call deadline in seconds (SAMARTH_LLM_TIMEOUT, read when a client is made)"""
+    return float(env("SAMARTH_LLM_TIMEOUT", "5.0"))
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling the LLM while the circuit breaker is open"""
+
+
+class LLMTimeoutError(TimeoutError):
+    """Raised when an LLM call misses its deadline"""
+
+
+class RateLimitedError(RuntimeError):
+    """Raised when the client-side quota has no room before the deadline"""
+
+
+class TokenBucket:
+    """Refills `rate_per_minute` units per minute up to `capacity`"""
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until `amount` is available (0 if it is now)"""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        return 0.0 if self.tokens >= amount else (amount - self.tokens) / self.rate
+
+    def take(self, amount: float):
+        self.tokens -= min(amount, self.capacity)
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute limits shared by all sessions"""
+
+    def __init__(self, requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None):
+        self.requests = TokenBucket(requests_per_minute or float(env("SAMARTH_LLM_RPM", "60")))
+        self.tokens = TokenBucket(tokens_per_minute or float(env("SAMARTH_LLM_TPM", "1000000")))
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float, timeout: float) -> bool:
+        """Block until both budgets allow the call; False if that exceeds timeout"""
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                wait = max(self.requests.wait_time(1, now), self.tokens.wait_time(tokens, now))
+                if wait == 0.0:
+                    self.requests.take(1)
+                    self.tokens.take(tokens)
+                    return True
+            if now + wait > deadline:
+                return False
+            time.sleep(min(wait, 0.05))
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough prompt size (~4 characters per token)"""
+    return max(1, len(text) // 4)
+
+
+class CircuitBreaker:
+    """Classic closed / open / half-open breaker
+
+    After `failure_threshold` consecutive failures (errors or timeouts) the
+    circuit opens for `reset_timeout` seconds; then a single trial call is
+    let through, and its outcome closes or re-opens the circuit.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+    # What allow() returns to the one caller it lets through while half-open
+    TRIAL = "trial"
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Truthy if a call may go out: TRIAL for the half-open trial, else True/False"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self.state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return self.TRIAL
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.state = self.CLOSED
+            self._trial_in_flight = False
+        CIRCUIT_STATE.set(0)
+
+    def release(self):
+        """Give back a half-open trial whose call never reached the API (trial holder only)"""
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    print(f"⚠️ LLM circuit opened after {self.failures} failures")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                self._trial_in_flight = False
+        CIRCUIT_STATE.set(1 if self.state == self.OPEN else 0)
+
+
+# All sessions share one Gemini key, so health and quota are tracked process-wide
+DEFAULT_BREAKER = CircuitBreaker()
+_IN_FLIGHT = {}
+_IN_FLIGHT_LOCK = threading.Lock()
+# The shared limiter and executor are made on first use, once settings are read
+_SHARED = {}
+_SHARED_LOCK = threading.Lock()
+
+
+def default_limiter() -> RateLimiter:
+    with _SHARED_LOCK:
+        if 'limiter' not in _SHARED:
+            _SHARED['limiter'] = RateLimiter()
+        return _SHARED['limiter']
+
+
+def _executor() -> ThreadPoolExecutor:
+    with _SHARED_LOCK:
+        if 'executor' not in _SHARED:
+            _SHARED['executor'] = ThreadPoolExecutor(max_workers=int(env("SAMARTH_LLM_WORKERS", "16")),
+                                                     thread_name_prefix="llm")
+        return _SHARED['executor']
+
+
+class LLMCall:
+    """Handle for an in-flight LLM request"""
+
+    def __init__(self, client: "LLMClient", future, leader: bool = True, trial: bool = False):
+        self._client = client
+        self._future = future
+        # Only the caller that started the request reports it to the breaker
+        self.leader = leader
+        # Whether this call holds the breaker's half-open trial
+        self.trial = trial
+
+    def result(self, timeout: Optional[float] = None):
+        """Wait for the response, recording the outcome on the breaker"""
+        breaker = self._client.breaker
+        try:
+            response = self._future.result(timeout=timeout)
+        except FutureTimeout:
+            LLM_TIMEOUTS.inc()
+            if self.leader:
+                breaker.record_failure()
+            raise LLMTimeoutError(f"LLM call exceeded {timeout:.2f}s deadline")
+        except RateLimitedError:
+            # Our own throttling says nothing about the API's health, but a
+            # half-open trial it swallowed must be let through again
+            if self.trial:
+                breaker.release()
+            raise
+        except Exception:
+            if self.leader:
+                breaker.record_failure()
+            raise
+        if self.leader:
+            breaker.record_success()
+        return response
+
+
+class LLMClient:
+    def __init__(self, model, timeout: Optional[float] = None, breaker: Optional[CircuitBreaker] = None,
+                 limiter: Optional[RateLimiter] = None):
+        self.model = model
+        self.timeout = timeout or default_timeout()
+        self.breaker = breaker or DEFAULT_BREAKER
+        self.limiter = limiter or default_limiter()
+
+    def available(self):
+        """False while the breaker is open (callers should go local); pass the value to submit()"""
+        allowed = self.breaker.allow()
+        if not allowed:
+            CIRCUIT_REJECTIONS.inc()
+        return allowed
+
+    def _run(self, key, prompt: str):
+        try:
+            if not self.limiter.acquire(estimate_tokens(prompt), timeout=self.timeout):
+                LLM_THROTTLED.inc()
+                raise RateLimitedError("Client-side LLM rate limit reached")
+            return self.model.generate_content(prompt)
+        finally:
+            # Trial calls (key None) were never registered for sharing
+            if key is not None:
+                with _IN_FLIGHT_LOCK:
+                    _IN_FLIGHT.pop(key, None)
+
+    def submit(self, prompt: str, permit=True) -> LLMCall:
+        """Start a call in the background; check available() first and pass what it returned
+        
+        Identical prompts to the same model share one request while it is in
+        flight (single-flight), so a burst of users asking the same sample
+        question costs one LLM call and one unit of quota. The half-open
+        trial always makes its own request: as a follower of a hung one it
+        could neither report nor give back the trial.
+        """
+        key = (getattr(self.model, "model_name", id(self.model)), prompt)
+        if permit == CircuitBreaker.TRIAL:
+            return LLMCall(self, _executor().submit(self._run, None, prompt), trial=True)
+        with _IN_FLIGHT_LOCK:
+            future = _IN_FLIGHT.get(key)
+            if future is not None:
+                LLM_COALESCED.inc()
+                return LLMCall(self, future, leader=False)
+            future = _executor().submit(self._run, key, prompt)
+            _IN_FLIGHT[key] = future
+        return LLMCall(self, future)
+
+    def generate(self, prompt: str, timeout: Optional[float] = None):
+        """Blocking call with a deadline; raises CircuitOpenError when open"""
+        permit = self.available()
+        if not permit:
+            raise CircuitOpenError("LLM circuit is open")
+        return self.submit(prompt, permit).result(timeout=timeout or self.timeout)
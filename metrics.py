@@ -0,0 +1,339 @@
+"""
+Metrics Module for Project Samarth
+Process-wide counters, gauges and rolling HDR-style latency histograms,
+exported in Prometheus text format over HTTP or to a file
+"""
+
+import math
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+
+def _label_key(labels: Optional[Dict[str, str]]) -> Tuple:
+    return tuple(sorted((labels or {}).items()))
+
+
+def _format_labels(key: Tuple, extra: Optional[Dict[str, str]] = None) -> str:
+    items = list(key) + list((extra or {}).items())
+    if not items:
+        return ""
+    escaped = (f'{k}="{_escape(v)}"' for k, v in items)
+    return "{" + ",".join(escaped) + "}"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, labels: Optional[Dict[str, str]] = None):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, labels: Optional[Dict[str, str]] = None) -> float:
+        return self._values.get(_label_key(labels), 0)
+
+    def expose(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        # Copied under the lock: a label first seen mid-scrape would resize the dict
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            lines.append(f"{self.name}{_format_labels(key)} {value}")
+        return lines
+
+
+class Gauge(Counter):
+    def set(self, value: float, labels: Optional[Dict[str, str]] = None):
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+    def expose(self):
+        lines = super().expose()
+        lines[1] = f"# TYPE {self.name} gauge"
+        return lines
+
+
+class HdrHistogram:
+    """Log-linear bucketed histogram (HDR-style) with bounded relative error
+
+    Values are split into power-of-two ranges, each divided into
+    `sub_buckets` linear buckets, so quantiles are accurate to roughly
+    1/sub_buckets relative error between `lowest` and `highest`.
+    """
+
+    def __init__(self, lowest: float = 1e-4, highest: float = 600.0, sub_buckets: int = 16):
+        self.lowest = lowest
+        self.sub_buckets = sub_buckets
+        self.n_ranges = max(1, math.ceil(math.log2(highest / lowest)))
+        self.counts = [0] * (self.n_ranges * sub_buckets + 2)
+        self.total = 0
+        self.sum = 0.0
+
+    def _index(self, value: float) -> int:
+        if value < self.lowest:
+            return 0
+        exponent = int(math.log2(value / self.lowest))
+        if exponent >= self.n_ranges:
+            return len(self.counts) - 1
+        base = self.lowest * (2 ** exponent)
+        sub = int((value - base) / base * self.sub_buckets)
+        return 1 + exponent * self.sub_buckets + min(sub, self.sub_buckets - 1)
+
+    def upper_bound(self, index: int) -> float:
+        if index == 0:
+            return self.lowest
+        if index >= len(self.counts) - 1:
+            return math.inf
+        exponent, sub = divmod(index - 1, self.sub_buckets)
+        base = self.lowest * (2 ** exponent)
+        return base + base * (sub + 1) / self.sub_buckets
+
+    def record(self, value: float):
+        self.counts[self._index(value)] += 1
+        self.total += 1
+        self.sum += value
+
+    def copy(self) -> "HdrHistogram":
+        """Independent copy that can be read while this one keeps recording"""
+        clone = HdrHistogram.__new__(HdrHistogram)
+        clone.lowest, clone.sub_buckets, clone.n_ranges = self.lowest, self.sub_buckets, self.n_ranges
+        clone.counts, clone.total, clone.sum = list(self.counts), self.total, self.sum
+        return clone
+
+    def merge(self, other: "HdrHistogram"):
+        for i, count in enumerate(other.counts):
+            self.counts[i] += count
+        self.total += other.total
+        self.sum += other.sum
+
+    def quantile(self, q: float) -> float:
+        if not self.total:
+            return 0.0
+        target = q * self.total
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= target and count:
+                return self.upper_bound(i)
+        return self.upper_bound(len(self.counts) - 1)
+
+    def cumulative_at(self, bound: float) -> int:
+        """Observations <= bound, for Prometheus `le` buckets"""
+        return sum(count for i, count in enumerate(self.counts) if self.upper_bound(i) <= bound)
+
+
+# Prometheus bucket edges (seconds) derived from the HDR counts
+EXPORT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram:
+    """Latency histogram with a cumulative view and a rolling window
+
+    The rolling view keeps `window_slots` sub-histograms of `slot_seconds`
+    each, so quantiles reflect recent traffic (default: last 5 minutes).
+    """
+
+    def __init__(self, name: str, help_text: str, slot_seconds: float = 30.0, window_slots: int = 10):
+        self.name = name
+        self.help = help_text
+        self.slot_seconds = slot_seconds
+        self.window_slots = window_slots
+        self._cumulative = {}
+        self._slots = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, labels: Optional[Dict[str, str]] = None):
+        key = _label_key(labels)
+        slot = int(time.time() // self.slot_seconds)
+        with self._lock:
+            self._cumulative.setdefault(key, HdrHistogram()).record(value)
+            slots = self._slots.setdefault(key, {})
+            slots.setdefault(slot, HdrHistogram()).record(value)
+            for old in [s for s in slots if s <= slot - self.window_slots]:
+                del slots[old]
+
+    def time(self, labels: Optional[Dict[str, str]] = None):
+        """Context manager observing the elapsed seconds of a block"""
+        return _Timer(self, labels)
+
+    def rolling(self, labels: Optional[Dict[str, str]] = None) -> HdrHistogram:
+        key = _label_key(labels)
+        current = int(time.time() // self.slot_seconds)
+        merged = HdrHistogram()
+        with self._lock:
+            for slot, hist in self._slots.get(key, {}).items():
+                if slot > current - self.window_slots:
+                    merged.merge(hist)
+        return merged
+
+    def quantile(self, q: float, labels: Optional[Dict[str, str]] = None, rolling: bool = True) -> float:
+        if rolling:
+            return self.rolling(labels).quantile(q)
+        with self._lock:
+            hist = self._cumulative.get(_label_key(labels))
+            hist = hist.copy() if hist else None
+        return hist.quantile(q) if hist else 0.0
+
+    def expose(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        # Copies taken under the lock, so each series' buckets, sum and count agree
+        with self._lock:
+            cumulative = sorted(((key, hist.copy()) for key, hist in self._cumulative.items()),
+                                key=lambda item: item[0])
+        for key, hist in cumulative:
+            for bound in EXPORT_BUCKETS:
+                lines.append(f"{self.name}_bucket{_format_labels(key, {'le': bound})} {hist.cumulative_at(bound)}")
+            lines.append(f"{self.name}_bucket{_format_labels(key, {'le': '+Inf'})} {hist.total}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {hist.sum}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {hist.total}")
+        # Rolling-window quantiles as a companion gauge family
+        lines.append(f"# TYPE {self.name}_rolling gauge")
+        for key, _ in cumulative:
+            window = self.rolling(dict(key))
+            for q in (0.5, 0.95, 0.99):
+                lines.append(f"{self.name}_rolling{_format_labels(key, {'quantile': q})} {window.quantile(q)}")
+        return lines
+
+
+class _Timer:
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self._start, self.labels)
+        return False
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, help_text, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help_text, **kwargs)
+            return metric
+
+    def counter(self, name: str, help_text: str = "") -> Counter:
+        return self._get_or_create(Counter, name, help_text)
+
+    def gauge(self, name: str, help_text: str = "") -> Gauge:
+        return self._get_or_create(Gauge, name, help_text)
+
+    def histogram(self, name: str, help_text: str = "", **kwargs) -> Histogram:
+        return self._get_or_create(Histogram, name, help_text, **kwargs)
+
+    def render_prometheus(self) -> str:
+        lines = []
+        with self._lock:
+            registered = [self._metrics[name] for name in sorted(self._metrics)]
+        for metric in registered:
+            lines.extend(metric.expose())
+        return "\n".join(lines) + "\n"
+
+    def dump_to_file(self, path: str):
+        """Write the Prometheus text atomically (node_exporter textfile style)"""
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            f.write(self.render_prometheus())
+        os.replace(tmp, path)
+
+
+REGISTRY = MetricsRegistry()
+
+# Shared metric handles used across the app
+QUERIES = REGISTRY.counter("samarth_queries_total", "Questions answered, by route")
+QUERY_ERRORS = REGISTRY.counter("samarth_query_errors_total", "Questions whose execution raised")
+ANSWER_LATENCY = REGISTRY.histogram("samarth_answer_latency_seconds", "End-to-end answer_question latency")
+STAGE_LATENCY = REGISTRY.histogram("samarth_stage_latency_seconds", "Latency of parse and execute stages")
+LLM_CALLS = REGISTRY.counter("samarth_llm_calls_total", "LLM generate_content calls, by purpose")
+LLM_ERRORS = REGISTRY.counter("samarth_llm_errors_total", "LLM calls that raised, by purpose")
+PARSE_FALLBACKS = REGISTRY.counter("samarth_parse_fallbacks_total", "Questions parsed by the rule-based fallback")
+FETCH_CACHE = REGISTRY.counter("samarth_fetch_cache_total", "DataCollector cache lookups, by result (hit/miss)")
+FETCH_ERRORS = REGISTRY.counter("samarth_fetch_errors_total", "DataCollector fetches that failed")
+FETCH_LATENCY = REGISTRY.histogram("samarth_fetch_latency_seconds", "data.gov.in request latency")
+DATASET_MEMORY = REGISTRY.gauge("samarth_dataset_memory_bytes", "Resident memory of loaded datasets")
+DATASET_ROWS = REGISTRY.gauge("samarth_dataset_rows", "Rows in loaded datasets")
+
+
+def record_datasets(data):
+    """Update dataset memory/row gauges for a dict of DataFrames"""
+    for name, df in data.items():
+        DATASET_MEMORY.set(int(df.memory_usage(deep=True).sum()), {"dataset": name})
+        DATASET_ROWS.set(len(df), {"dataset": name})
+
+
+class _MetricsHandler:
+    """GET /metrics handler, mixed into BaseHTTPRequestHandler when the exporter starts"""
+    registry = REGISTRY
+
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_response(404)
+            self.end_headers()
+            return
+        payload = self.registry.render_prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_http_server(port: int, host: str = "0.0.0.0", registry: MetricsRegistry = REGISTRY):
+    """Serve /metrics on a side port from a daemon thread"""
+    # http.server is only imported by processes that export over HTTP
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    handler = type("Handler", (_MetricsHandler, BaseHTTPRequestHandler), {"registry": registry})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"📈 Metrics exporter listening on http://{host}:{port}/metrics")
+    return server
+
+
+def start_file_dumper(path: str, interval: float = 15.0, registry: MetricsRegistry = REGISTRY):
+    """Periodically dump metrics to a file from a daemon thread"""
+    stop = threading.Event()
+
+    def loop():
+        while not stop.wait(interval):
+            try:
+                registry.dump_to_file(path)
+            except OSError as e:
+                print(f"⚠️ Could not write metrics to {path}: {e}")
+
+    threading.Thread(target=loop, daemon=True).start()
+    return stop
+
+
+def start_from_env():
+    """Start exporters from SAMARTH_METRICS_PORT / SAMARTH_METRICS_FILE"""
+    started = []
+    port = os.getenv("SAMARTH_METRICS_PORT")
+    if port:
+        started.append(start_http_server(int(port)))
+    path = os.getenv("SAMARTH_METRICS_FILE")
+    if path:
+        started.append(start_file_dumper(path))
+    return started
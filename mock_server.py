@@ -0,0 +1,228 @@
+"""
+Mock data.gov.in Server for Project Samarth
+Serves synthetic paginated resources locally so ingestion can be
+load-tested offline with controllable size, latency and failures
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+# Small fixed vocabularies keep records stable for a given (seed, index)
+_STATES = {
+    'Punjab': ['Ludhiana', 'Amritsar', 'Patiala', 'Jalandhar', 'Bathinda'],
+    'Haryana': ['Karnal', 'Ambala', 'Hisar', 'Rohtak', 'Sirsa'],
+    'Uttar Pradesh': ['Meerut', 'Agra', 'Lucknow', 'Kanpur', 'Varanasi'],
+    'Maharashtra': ['Pune', 'Nashik', 'Nagpur', 'Kolhapur', 'Solapur'],
+}
+_CROPS = ['Wheat', 'Rice', 'Sugarcane', 'Cotton', 'Maize', 'Bajra']
+_SEASONS = ['Kharif', 'Rabi', 'Zaid']
+
+_FIELDS = {
+    'crop_production': [('State', 'keyword'), ('District', 'keyword'), ('Crop', 'keyword'),
+                        ('Year', 'double'), ('Production', 'double'), ('Area', 'double'),
+                        ('Season', 'keyword')],
+    'rainfall': [('State', 'keyword'), ('District', 'keyword'), ('Year', 'double'),
+                 ('Annual_Rainfall_mm', 'double'), ('Monsoon_Rainfall_mm', 'double')],
+}
+
+
+def synthetic_record(schema, index, seed=0):
+    """Deterministic record number `index` of a synthetic resource"""
+    rng = random.Random(f"{seed}:{schema}:{index}")
+    state = list(_STATES)[index % len(_STATES)]
+    district = _STATES[state][(index // len(_STATES)) % len(_STATES[state])]
+    year = 1995 + (index // 20) % 30
+
+    if schema == 'rainfall':
+        annual = round(rng.uniform(400, 1400), 1)
+        return {
+            'State': state, 'District': district, 'Year': year,
+            'Annual_Rainfall_mm': annual,
+            'Monsoon_Rainfall_mm': round(annual * rng.uniform(0.6, 0.8), 1),
+        }
+
+    area = round(rng.uniform(200, 5000))
+    return {
+        'State': state, 'District': district, 'Crop': rng.choice(_CROPS), 'Year': year,
+        'Production': round(area * rng.uniform(1.5, 5.0)), 'Area': area,
+        'Season': rng.choice(_SEASONS),
+    }
+
+
+class MockDataGovServer:
+    """Local stand-in for api.data.gov.in/resource
+
+    Usage:
+        with MockDataGovServer(latency=0.05) as server:
+            server.add_resource("crops", 50000, schema="crop_production")
+            collector = DataCollector(base_url=server.url)
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, jitter=0.0,
+                 error_rate=0.0, seed=0, max_limit=10000):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.seed = seed
+        self.max_limit = max_limit
+        self.resources = {}
+        # (resource_id, filters JSON) -> indexes of the matching records
+        self._matches = {}
+        self.request_count = 0
+        self.error_count = 0
+        self._lock = threading.Lock()
+        self._rng = random.Random(seed)
+        self._thread = None
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+
+    @property
+    def url(self):
+        """Base URL to pass to DataCollector(base_url=...)"""
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/resource"
+
+    def add_resource(self, resource_id, n_records, schema='crop_production'):
+        """Register a synthetic resource with n_records rows"""
+        if schema not in _FIELDS:
+            raise ValueError(f"Unknown schema '{schema}', expected one of {list(_FIELDS)}")
+        self.resources[resource_id] = {'n_records': n_records, 'schema': schema}
+        with self._lock:
+            self._matches = {key: value for key, value in self._matches.items() if key[0] != resource_id}
+        return self
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _should_fail(self):
+        with self._lock:
+            self.request_count += 1
+            fail = self.error_rate > 0 and self._rng.random() < self.error_rate
+            if fail:
+                self.error_count += 1
+            delay = self.latency + (self._rng.uniform(0, self.jitter) if self.jitter else 0)
+        return fail, delay
+
+    def _matching(self, resource_id, filters):
+        """Indexes of the records matching a filters JSON object, found once per filter"""
+        key = (resource_id, filters)
+        with self._lock:
+            indexes = self._matches.get(key)
+        if indexes is None:
+            resource = self.resources[resource_id]
+            wanted = {k: str(v) for k, v in json.loads(filters).items()}
+            indexes = []
+            for i in range(resource['n_records']):
+                record = synthetic_record(resource['schema'], i, self.seed)
+                if all(str(record.get(k)) == v for k, v in wanted.items()):
+                    indexes.append(i)
+            with self._lock:
+                self._matches[key] = indexes
+        return indexes
+
+    def _page(self, resource_id, query):
+        """Build one data.gov.in style JSON page
+
+        Filters apply before paging, as on the real API: offset and limit
+        count matching records, and total is the number that match.
+        """
+        resource = self.resources[resource_id]
+        schema = resource['schema']
+        limit = min(int(query.get('limit', ['10'])[0]), self.max_limit)
+        offset = int(query.get('offset', ['0'])[0])
+
+        filters = query.get('filters')
+        if filters:
+            indexes = self._matching(resource_id, filters[0])
+            total = len(indexes)
+            page = indexes[offset:offset + limit]
+        else:
+            total = resource['n_records']
+            page = range(offset, min(offset + limit, total))
+        records = [synthetic_record(schema, i, self.seed) for i in page]
+
+        return {
+            'status': 'ok',
+            'index_name': resource_id,
+            'title': f"Synthetic {schema} ({total} records)",
+            'total': total,
+            'count': len(records),
+            'limit': str(limit),
+            'offset': str(offset),
+            'field': [{'id': name, 'name': name, 'type': kind} for name, kind in _FIELDS[schema]],
+            'records': records,
+        }
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                parts = parsed.path.strip('/').split('/')
+                fail, delay = server._should_fail()
+                if delay:
+                    time.sleep(delay)
+
+                if len(parts) != 2 or parts[0] != 'resource' or parts[1] not in server.resources:
+                    return self._send(404, {'status': 'error', 'message': 'Resource not found'})
+                if fail:
+                    return self._send(503, {'status': 'error', 'message': 'Injected failure'})
+
+                body = server._page(parts[1], parse_qs(parsed.query))
+                self._send(200, body)
+
+            def _send(self, status, body):
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a local mock data.gov.in server")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--records", type=int, default=100000, help="Rows per resource")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added per request")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra random latency (seconds)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 503")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    server = MockDataGovServer(port=args.port, latency=args.latency, jitter=args.jitter,
+                               error_rate=args.error_rate, seed=args.seed)
+    server.add_resource("9ef84268-d588-465a-a308-a864a43d0070", args.records, schema='crop_production')
+    server.add_resource("eb1f4e8f-e7b5-4f8f-a7d7-7f3d9c6c4b8a", args.records, schema='rainfall')
+    print(f"🌐 Mock data.gov.in serving at {server.url}")
+    print(f"   export DATA_GOV_BASE_URL={server.url}")
+    try:
+        server.start()
+        server._thread.join()
+    except KeyboardInterrupt:
+        server.stop()
@@ -0,0 +1,419 @@
+"""
+Process Pool Module for Project Samarth
+Runs QueryEngine handlers in worker processes so heavy pandas work does
+not hold the GIL of the Streamlit or service process. A prepared engine is
+written once as a snapshot whose frames and arrays are memory-mapped .npy
+files, so workers restore it instead of copying or re-preparing the data,
+and running tasks can be cancelled by replacing their worker. A
+task past its deadline is stopped the same way (PoolTimeoutError); a pool
+with no live worker raises PoolUnavailableError so the caller can run the
+handler itself
+"""
+
+import itertools
+import json
+import multiprocessing as mp
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import deque
+from multiprocessing.connection import wait
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+import metrics
+from settings import env
+
+POOL_TASKS = metrics.REGISTRY.counter("samarth_pool_tasks_total", "Handler tasks run in the process pool, by outcome")
+POOL_QUEUED = metrics.REGISTRY.gauge("samarth_pool_queued", "Handler tasks waiting for a worker process")
+
+
+
+def default_task_timeout() -> float:
+    """Seconds a handler may run in the pool (SAMARTH_POOL_TIMEOUT, read when a pool starts)"""
+    return float(env("SAMARTH_POOL_TIMEOUT", "60"))
+
+
+class TaskCancelledError(RuntimeError):
+    """Raised by PoolTask.result() after the task was cancelled"""
+
+
+class WorkerError(RuntimeError):
+    """Raised by PoolTask.result() when the handler failed in the worker"""
+
+
+class PoolUnavailableError(RuntimeError):
+    """Raised by PoolTask.result() when no worker process could start"""
+
+
+class PoolTimeoutError(RuntimeError):
+    """Raised by PoolTask.result() when the task ran past its deadline and was stopped"""
+
+
+def export_shared(data: Dict[str, pd.DataFrame], directory: str):
+    """Write every column as an .npy file workers can memory-map
+
+    Numeric columns are stored as-is; text columns as category codes plus
+    a small JSON list of the distinct values in sorted order, so a
+    categorical over the codes sorts like the strings did.
+    """
+    for name, df in data.items():
+        os.makedirs(f"{directory}/{name}", exist_ok=True)
+        columns = []
+        for i, col in enumerate(df.columns):
+            series = df[col]
+            path = f"{name}/{i}.npy"
+            if pd.api.types.is_numeric_dtype(series) or pd.api.types.is_bool_dtype(series):
+                np.save(f"{directory}/{path}", series.to_numpy())
+                columns.append({'name': col, 'kind': 'numeric', 'file': path})
+            else:
+                codes, uniques = pd.factorize(series, sort=True, use_na_sentinel=True)
+                np.save(f"{directory}/{path}", codes.astype(_code_dtype(len(uniques))))
+                columns.append({'name': col, 'kind': 'text', 'file': path,
+                                'values': [str(v) for v in uniques]})
+        with open(f"{directory}/{name}/columns.json", 'w') as f:
+            json.dump({'rows': len(df), 'columns': columns}, f)
+
+
+def _code_dtype(n_values: int):
+    """Narrowest code type pandas keeps as-is for a categorical of n_values"""
+    for dtype in (np.int8, np.int16, np.int32):
+        if n_values < np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+def open_shared(directory: str) -> Dict[str, pd.DataFrame]:
+    """Rebuild DataFrames over memory-mapped columns
+
+    Nothing is copied: numeric columns are the mapped arrays and text
+    columns are categoricals whose codes are the mapped arrays, so a
+    process holds one copy of each distinct string rather than one per row.
+    """
+    data = {}
+    for name in sorted(os.listdir(directory)):
+        spec_file = f"{directory}/{name}/columns.json"
+        if not os.path.exists(spec_file):
+            continue
+        with open(spec_file) as f:
+            spec = json.load(f)
+        columns = {}
+        for column in spec['columns']:
+            values = np.load(f"{directory}/{column['file']}", mmap_mode='r')
+            if column['kind'] == 'text':
+                # Code -1 is a missing value
+                values = pd.Categorical.from_codes(values, pd.Index(column['values'], dtype=str))
+            columns[column['name']] = values
+        data[name] = pd.DataFrame(columns, copy=False)
+    return data
+
+
+# Worker-process state
+_engine = None
+
+
+def _worker_main(shared_dir: str, conn, prepared: bool = False):
+    """Restore (or build) an offline engine over the shared data, then run tasks until told to stop"""
+    global _engine
+    from query_engine import QueryEngine
+    from tracing import Tracer
+    try:
+        if prepared:
+            _engine = QueryEngine.from_snapshot(None, shared_dir, tracer=Tracer(enabled=False), offline=True)
+        else:
+            _engine = QueryEngine(None, open_shared(shared_dir), tracer=Tracer(enabled=False), offline=True)
+    except Exception as e:
+        conn.send(('failed', None, repr(e)))
+        return
+    conn.send(('ready', None, None))
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            return
+        if message is None:
+            return
+        task_id, parsed_query = message
+        try:
+            # The parent renders the structured answer in the format the caller wants
+            result = _engine.execute_query(parsed_query, render=False)
+            cursor = (result.get('data') or {}).get('cursor')
+            if cursor:
+                # The parent serves pages and exports, so the table goes back with the answer
+                result['_cursor'] = _engine.results.pop(cursor['id'])
+            conn.send((task_id, 'ok', result))
+        except Exception as e:
+            conn.send((task_id, 'error', repr(e)))
+
+
+class PoolTask:
+    """Handle for one handler run in the pool"""
+
+    def __init__(self, pool: "HandlerPool", task_id: int, parsed_query: Dict):
+        self.pool = pool
+        self.task_id = task_id
+        self.parsed_query = parsed_query
+        self.state = 'queued'
+        self._result = None
+        self._error = None
+        self._done = threading.Event()
+
+    def _finish(self, state: str, result=None, error=None):
+        self.state = state
+        self._result = result
+        self._error = error
+        POOL_TASKS.inc(labels={"outcome": state})
+        self._done.set()
+
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._done.wait(timeout)
+
+    def cancel(self) -> bool:
+        """Drop the task if queued, or stop its worker if running"""
+        return self.pool.cancel(self)
+
+    def result(self, timeout: Optional[float] = None) -> Dict[str, Any]:
+        if not self._done.wait(timeout):
+            raise TimeoutError(f"Handler task {self.task_id} still running after {timeout}s")
+        if self.state == 'cancelled':
+            raise TaskCancelledError(f"Handler task {self.task_id} was cancelled")
+        if self.state == 'timeout':
+            raise PoolTimeoutError(self._error)
+        if self.state == 'unavailable':
+            raise PoolUnavailableError(self._error)
+        if self.state == 'error':
+            raise WorkerError(self._error)
+        return self._result
+
+
+class _Worker:
+    def __init__(self, ctx, shared_dir: str, prepared: bool = False):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(shared_dir, child_conn, prepared), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.ready = False
+        self.task: Optional[PoolTask] = None
+
+    def stop(self, kill: bool = False):
+        if kill:
+            self.process.kill()
+        else:
+            try:
+                self.conn.send(None)
+            except OSError:
+                pass
+        self.process.join(timeout=5)
+        self.conn.close()
+
+
+class HandlerPool:
+    """Fixed set of worker processes executing parsed queries
+
+    `data` is a prepared QueryEngine, whose state workers restore as it
+    is, or a dict of raw frames that each worker prepares itself.
+
+    Tasks wait in a FIFO queue and go to the first idle worker. Cancelling
+    a running task kills its worker and starts a fresh one, since pandas
+    work cannot be interrupted from outside. A worker that fails while
+    starting is not replaced; once none are left, waiting tasks fail with
+    PoolUnavailableError.
+    """
+
+    def __init__(self, data, workers: Optional[int] = None,
+                 start_method: Optional[str] = None, shared_dir: Optional[str] = None,
+                 task_timeout: Optional[float] = None):
+        self.workers = workers or max(1, (os.cpu_count() or 2) - 1)
+        self.task_timeout = task_timeout or default_task_timeout()
+        self._ctx = mp.get_context(start_method or env("SAMARTH_POOL_START", "spawn"))
+        base = "/dev/shm" if os.path.isdir("/dev/shm") else None
+        self._owns_dir = shared_dir is None
+        self.shared_dir = shared_dir or tempfile.mkdtemp(prefix="samarth-pool-", dir=base)
+        self.prepared = not isinstance(data, dict)
+        if self.prepared:
+            from engine_snapshot import write_state
+            write_state(data, self.shared_dir)
+        else:
+            export_shared(data, self.shared_dir)
+
+        self._ids = itertools.count(1)
+        self._queue = deque()
+        self._lock = threading.Lock()
+        self._closed = False
+        # Workers being replaced outside the lock; the pool is not empty while any are
+        self._respawning = 0
+        self._pool = [_Worker(self._ctx, self.shared_dir, self.prepared) for _ in range(self.workers)]
+        self._dispatcher = threading.Thread(target=self._dispatch_loop, name="samarth-pool", daemon=True)
+        self._dispatcher.start()
+        print(f"⚙️ Handler pool started with {self.workers} worker processes")
+
+    def submit(self, parsed_query: Dict) -> PoolTask:
+        task = PoolTask(self, next(self._ids), parsed_query)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Handler pool is closed")
+            if not self._pool and not self._respawning:
+                task._finish('unavailable', error="No handler worker process is running")
+                return task
+            self._queue.append(task)
+            POOL_QUEUED.set(len(self._queue))
+            self._assign()
+        return task
+
+    def cancel(self, task: PoolTask, state: str = 'cancelled', error: Optional[str] = None) -> bool:
+        stale = None
+        with self._lock:
+            if task.done():
+                return False
+            if task in self._queue:
+                self._queue.remove(task)
+                POOL_QUEUED.set(len(self._queue))
+            else:
+                for worker in self._pool:
+                    if worker.task is task:
+                        stale = self._take_out(worker)
+                        break
+            task._finish(state, error=error)
+        if stale is not None:
+            self._respawn(stale)
+        return True
+
+    def _take_out(self, worker: _Worker) -> _Worker:
+        """Remove a worker that _respawn will replace (caller holds the lock)"""
+        self._pool.remove(worker)
+        self._respawning += 1
+        return worker
+
+    def _respawn(self, stale: _Worker):
+        """Stop a worker taken out of the pool and start its replacement
+
+        Killing and joining can take seconds, so this runs without the
+        lock; other workers keep taking tasks meanwhile.
+        """
+        stale.stop(kill=True)
+        worker = _Worker(self._ctx, self.shared_dir, self.prepared)
+        with self._lock:
+            self._respawning -= 1
+            closed = self._closed
+            if not closed:
+                self._pool.append(worker)
+        if closed:
+            worker.stop(kill=True)
+
+    def _assign(self):
+        """Hand queued tasks to idle, ready workers (caller holds the lock)"""
+        for worker in self._pool:
+            if not self._queue:
+                break
+            if worker.ready and worker.task is None:
+                task = self._queue.popleft()
+                task.state = 'running'
+                worker.task = task
+                worker.conn.send((task.task_id, task.parsed_query))
+        POOL_QUEUED.set(len(self._queue))
+
+    def _dispatch_loop(self):
+        while not self._closed:
+            with self._lock:
+                conns = {worker.conn: worker for worker in self._pool}
+            try:
+                ready = wait(list(conns), timeout=0.1)
+            except OSError:
+                continue
+            for conn in ready:
+                worker = conns[conn]
+                try:
+                    message = conn.recv()
+                except (EOFError, OSError):
+                    self._replace_dead(worker)
+                    continue
+                failed = False
+                with self._lock:
+                    kind, state, payload = message
+                    if kind == 'ready':
+                        worker.ready = True
+                    elif kind == 'failed':
+                        failed = True
+                        self._drop_worker(worker, payload)
+                    elif worker.task is not None and worker.task.task_id == kind:
+                        task, worker.task = worker.task, None
+                        task._finish(state, payload if state == 'ok' else None,
+                                     payload if state == 'error' else None)
+                    self._assign()
+                if failed:
+                    worker.stop(kill=True)
+
+    def _drop_worker(self, worker: _Worker, reason: str):
+        """Remove a worker that could not start (caller holds the lock, and stops it after)
+
+        A respawn would fail the same way. With no worker left, nothing
+        could run the queued tasks, so they fail instead of waiting.
+        """
+        print(f"❌ Handler worker failed to start: {reason}")
+        self._pool.remove(worker)
+        if not self._pool and not self._respawning:
+            for task in self._queue:
+                task._finish('unavailable', error=f"No handler worker could start: {reason}")
+            self._queue.clear()
+            POOL_QUEUED.set(0)
+
+    def _replace_dead(self, worker: _Worker):
+        """A worker died (killed on cancel, or crashed): fail its task and respawn"""
+        with self._lock:
+            if worker not in self._pool or self._closed:
+                return
+            if not worker.ready:
+                self._drop_worker(worker, "worker process exited during start-up")
+                respawn = False
+            else:
+                self._take_out(worker)
+                respawn = True
+                task = worker.task
+                if task is not None and not task.done():
+                    task._finish('error', error="Worker process exited while running the task")
+        if respawn:
+            self._respawn(worker)
+        else:
+            worker.stop(kill=True)
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            for task in self._queue:
+                task._finish('cancelled')
+            self._queue.clear()
+            workers, self._pool = self._pool, []
+            for worker in workers:
+                if worker.task is not None and not worker.task.done():
+                    worker.task._finish('cancelled')
+        for worker in workers:
+            worker.stop(kill=worker.task is not None)
+        if self._owns_dir:
+            shutil.rmtree(self.shared_dir, ignore_errors=True)
+
+    def run(self, parsed_query: Dict, cancel: Optional[threading.Event] = None,
+            timeout: Optional[float] = None, poll: float = 0.05) -> Dict[str, Any]:
+        """Submit and wait; setting `cancel` (e.g. on client disconnect) stops the task
+
+        A task not done after `timeout` seconds (task_timeout by default)
+        is stopped and PoolTimeoutError raised. Running it again elsewhere
+        would only repeat the slowest work, so callers report the timeout.
+        """
+        timeout = timeout or self.task_timeout
+        deadline = time.monotonic() + timeout
+        task = self.submit(parsed_query)
+        while not task.wait(poll):
+            if cancel is not None and cancel.is_set():
+                task.cancel()
+                break
+            if time.monotonic() >= deadline:
+                self.cancel(task, 'timeout', f"Handler task {task.task_id} not done after {timeout:g}s")
+                break
+        return task.result()
@@ -3,32 +3,155 @@ Intelligent Query Engine for Project Samarth - FIXED VERSION
 Uses LLM to parse queries and execute data operations
 """
 
-import google.generativeai as genai
 import pandas as pd
+import numpy as np
 import json
 import re
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Tuple
 import os
-from dotenv import load_dotenv
+import threading
+import time
+from tracing import get_tracer, current_span, traced
+import metrics
+from trend_analytics import TrendIndex, least_squares_slopes
+from derived_metrics import DerivedMetrics, METRICS, YIELD_KEYWORDS, metric_for, weighted_aggregate
+from recommendations import ResilienceIndex, DEFAULT_WINDOW
+from district_index import DistrictCrosswalk, DistrictFacts, clean_district_names
+from dataset_catalog import DatasetCatalog
+from chart_payloads import attach_charts
+from result_cursor import ResultStore
+from subresult_cache import SubresultCache, predicate
+from entity_resolver import EntityResolver
+from answer_templates import Answer, format_values, render_result, DEFAULT_FORMAT, DEFAULT_LOCALE
+from llm_client import LLMClient, CircuitBreaker, CircuitOpenError, LLMTimeoutError, default_timeout
+from settings import load_env
 
-load_dotenv()
 
 class QueryEngine:
-    def __init__(self, api_key: str, data: Dict[str, pd.DataFrame]):
+    def __init__(self, api_key: str, data: Dict[str, pd.DataFrame], tracer=None,
+                 llm_timeout: Optional[float] = None, hedge: bool = True, offline: bool = False):
+        self._init_runtime(tracer, hedge)
+        
+        # Offline engines (pool workers, batch runs) parse with rules only
+        if offline:
+            self.model = None
+            self.model_name = None
+            self.llm = None
+        else:
+            self._connect_llm(api_key, llm_timeout)
+        
+        # A DatasetCatalog loads state partitions per question; a dict is used as-is
+        self.catalog = data if isinstance(data, DatasetCatalog) else None
+        # Shallow copies: cleaned and added columns stay out of the caller's frames
+        self.data = {} if self.catalog else {name: df.copy(deep=False) for name, df in data.items()}
+        self._loaded_partitions = set()
+        self.derived = None
+        self._district_facts = None
+        self._trend_indexes = {}
+        self._resilience_indexes = {}
+        
+        # Canonical District_IDs shared by crop_production and rainfall; with a
+        # catalog the crosswalk comes from metadata, before any rows are loaded
+        district_frames = self.catalog.district_pairs() if self.catalog else self.data
+        self._clean_districts(district_frames)
+        self.crosswalk = DistrictCrosswalk(district_frames)
+        if self.catalog is None:
+            self._prepare(self.data)
+        
+        # Continue with your schema initialization
+        self.data_schema = self._generate_schema()
+        self.entities = self._build_entity_index()
+        self.resolver = EntityResolver(self._entity_values())
+        self._prompt_prefix = self._build_prompt_prefix()
+    
+    def _init_runtime(self, tracer, hedge: bool):
+        """Per-process state that is never part of a snapshot"""
+        load_env()
+        self.tracer = tracer or get_tracer()
+        self.hedge = hedge
+        self.pool = None
+        # Questions run on several threads; lazy loads and index builds happen under this
+        self._lock = threading.RLock()
+        # Default rendering of structured answers ('markdown', 'text' or 'json')
+        self.answer_format = os.getenv("SAMARTH_ANSWER_FORMAT", DEFAULT_FORMAT)
+        self.locale = os.getenv("SAMARTH_LOCALE", DEFAULT_LOCALE)
+        # Full tabular results, paged and exported by cursor id
+        self.results = ResultStore()
+        # Filtered slices shared across questions; cleared whenever data changes
+        self.subresults = SubresultCache()
+    
+    @classmethod
+    def from_snapshot(cls, api_key: str, snapshot, catalog: Optional[DatasetCatalog] = None, tracer=None,
+                      llm_timeout: Optional[float] = None, hedge: bool = True, offline: bool = False):
+        """Engine over a saved snapshot (a path or engine_snapshot.load_snapshot's result)
+        
+        Nothing is recomputed, and the model recorded in the snapshot is
+        used without probing the others.
+        """
+        from engine_snapshot import load_snapshot
+        if isinstance(snapshot, str):
+            snapshot = load_snapshot(snapshot)
+        engine = cls.__new__(cls)
+        engine._init_runtime(tracer, hedge)
+        engine.catalog = catalog
+        for attr, value in snapshot['state'].items():
+            setattr(engine, attr, value)
+        
+        model_name = snapshot['manifest'].get('model_name')
+        if offline:
+            engine.model = None
+            engine.model_name = None
+            engine.llm = None
+        elif model_name:
+            engine._connect_llm(api_key, llm_timeout, model_names=[model_name], probe=False)
+        else:
+            engine._connect_llm(api_key, llm_timeout)
+        # Sizes were measured at save time; a deep memory scan would cost more than the restore
+        for name, rows in snapshot['manifest']['rows'].items():
+            metrics.DATASET_ROWS.set(rows, {"dataset": name})
+            metrics.DATASET_MEMORY.set(snapshot['manifest']['memory_bytes'][name], {"dataset": name})
+        return engine
+    
+    def warm_up(self):
+        """Load every partition and build every index, as a snapshot stores them"""
+        self._ensure_loaded({})
+        if 'crop_production' in self.data:
+            self.trend_index_for('production')
+            if self.derived is not None:
+                self.trend_index_for('yield')
+        self.district_facts
+        self.resilience_index()
+    
+    # Tried in order until one answers (API versions vary)
+    MODEL_NAMES = ['gemini-pro', 'gemini-1.5-pro', 'gemini-1.0-pro', 'gemini-2.5-flash']
+    
+    def _connect_llm(self, api_key: str, llm_timeout: Optional[float], model_names: Optional[List[str]] = None,
+                     probe: bool = True):
+        """Validate the key and pick the first Gemini model that answers
+        
+        With probe=False the first of model_names is used without a test call.
+        """
+        llm_timeout = llm_timeout or default_timeout()
         # Validate API key before configuring
         if not api_key or len(api_key) < 30:
             raise ValueError("Invalid API key. Please provide a valid Google Gemini API key.")
         
         try:
+            # The Gemini SDK is slow to import; offline engines never need it
+            import google.generativeai as genai
             genai.configure(api_key=api_key)
-            # Try different model names (API versions vary)
-            model_names = ['gemini-pro', 'gemini-1.5-pro', 'gemini-1.0-pro', 'gemini-2.5-flash']
+            model_names = model_names or self.MODEL_NAMES
+            # Probes get their own breaker so unknown model names don't trip the shared one
+            probe_breaker = CircuitBreaker(failure_threshold=len(model_names) + 1)
             
             for model_name in model_names:
                 try:
                     self.model = genai.GenerativeModel(model_name)
-                    test_response = self.model.generate_content("Hi")
-                    print(f"✅ API Key validated! Using model: {model_name}")
+                    if probe:
+                        test_response = LLMClient(self.model, breaker=probe_breaker).generate("Hi", timeout=llm_timeout * 2)
+                    self.model_name = model_name
+                    print(f"✅ API Key validated! Using model: {model_name}" if probe
+                          else f"✅ Using model: {model_name}")
                     break
                 except:
                     continue
@@ -39,83 +162,224 @@ class QueryEngine:
             print(f"❌ API Key validation failed: {e}")
             raise ValueError(f"API key is not valid: {e}")
         
-        self.data = data
+        self.llm = LLMClient(self.model, timeout=llm_timeout)
+    
+    def _clean_districts(self, frames: Dict[str, pd.DataFrame]):
         try:
-            # ✅ Only run cleaning if crop_production dataset exists
-            if 'crop_production' in self.data:
-                crop_df = self.data['crop_production']
-
-                # ✅ Check if 'District' column actually exists
-                if 'District' in crop_df.columns:
-                    # Step 1: Clean basic formatting
-                    crop_df['District'] = (
-                        crop_df['District']
-                        .astype(str)
-                        .str.strip()
-                        .str.replace(r'[^a-zA-Z\s]', '', regex=True)
-                        .str.title()
-                    )
-
-                    # Step 2: Correct known misspellings / OCR issues
-                    corrections = {
-                        'Mritsar': 'Amritsar',
-                        'Mritsara': 'Amritsar',
-                        'Mirtsar': 'Amritsar',
-                        'Chnadigarh': 'Chandigarh',
-                        'Patila': 'Patiala'
-                    }
-
-                    crop_df['District'] = crop_df['District'].replace(corrections)
-
-                    # Step 3: Store the cleaned DataFrame back
-                    self.data['crop_production'] = crop_df
-
+            # ✅ Clean district names the same way in every dataset that has them,
+            # so crop and rainfall rows for a district line up
+            for name, df in frames.items():
+                if 'District' in df.columns:
+                    df['District'] = clean_district_names(df['District'])
         except Exception as e:
             print("⚠️ Warning while cleaning district names:", e)
-
-        # Continue with your schema initialization
-        self.data_schema = self._generate_schema()
+    
+    def _prepare(self, data: Dict[str, pd.DataFrame], changed: Optional[List[str]] = None):
+        """Assign district ids and build derived tables over data, then make it the engine's data
+        
+        Only the `changed` frames (default: all) are written to, since the
+        others may be in use by questions on other threads. Everything is
+        built before anything is published.
+        """
+        for name in (data if changed is None else changed):
+            self.crosswalk.assign(data[name])
+        
+        # Materialize yield and its weighted state/district aggregates once per load
+        derived = None
+        crop_df = data.get('crop_production')
+        if crop_df is not None and DerivedMetrics.supports(crop_df):
+            derived = DerivedMetrics(crop_df)
+        self.data, self.derived = data, derived
+        self._district_facts = None
+        self._trend_indexes = {}
+        self._resilience_indexes = {}
+        self.subresults.clear()
+        metrics.record_datasets(data)
+    
+    def _ensure_loaded(self, parsed_query: Dict):
+        """Load the catalog partitions a query needs (all of them without a state)"""
+        if self.catalog is None:
+            return
+        states = self._expand_regions([str(s).title() for s in parsed_query.get('states') or []],
+                                      str(parsed_query).lower())
+        for district in parsed_query.get('districts') or []:
+            states += [self.crosswalk.table.at[i, 'State'] for i in self.crosswalk.resolve(district)]
+        # The same spellings the handlers filter on, so every row they select is loaded
+        states = [variant for state in states for variant in self._filter_values('State', state)]
+        wanted = self.catalog.partitions_for(states) if states else self.catalog.all_partitions()
+        if not wanted - self._loaded_partitions:
+            return
+        
+        with self._lock:
+            # Another question may have loaded some of them while this one waited
+            missing = wanted - self._loaded_partitions
+            if not missing:
+                return
+            with self.tracer.span("data.load", partitions=len(missing)):
+                frames = self.catalog.load(missing)
+                self._clean_districts(frames)
+                # Extend copies, so questions still reading the current frames are unaffected
+                data = dict(self.data)
+                for name, df in frames.items():
+                    data[name] = pd.concat([data[name], df], ignore_index=True) if name in data else df
+                self._prepare(data, changed=list(frames))
+                self._loaded_partitions = self._loaded_partitions | missing
+    
+    # Categorical columns whose values the parser should spell exactly
+    ENTITY_COLUMNS = ('State', 'District', 'Crop', 'Season')
+    # Cap on dictionary entries sent per question, per column
+    MAX_ENTITIES_PER_COLUMN = 8
+    # Question words that never identify an entity on their own
+    PROMPT_STOPWORDS = {'district', 'districts', 'state', 'states', 'season', 'the', 'and',
+                        'new', 'north', 'south', 'east', 'west', 'central', 'upper', 'lower'}
     
     def _generate_schema(self) -> str:
-        """Generate schema description for LLM"""
+        """Generate compact schema description for LLM
+        
+        Only column names and year ranges; entity values are sent per
+        question from the entity index instead of as sample dumps.
+        """
         schema = []
         
+        if self.catalog is not None:
+            for name in self.catalog.names():
+                stats = self.catalog.stats(name)
+                schema.append(f"Dataset: {name}")
+                schema.append(f"Columns: {', '.join(stats['columns'])}")
+                if 'years' in stats:
+                    schema.append(f"Years: {stats['years'][0]}-{stats['years'][1]}")
+            return "\n".join(schema)
+        
         for name, df in self.data.items():
-            schema.append(f"\nDataset: {name}")
+            schema.append(f"Dataset: {name}")
             schema.append(f"Columns: {', '.join(df.columns.tolist())}")
-            schema.append(f"Sample values:")
-            for col in df.columns:
-                unique_vals = df[col].unique()[:5]
-                schema.append(f"  {col}: {unique_vals}")
+            if 'Year' in df.columns and len(df):
+                schema.append(f"Years: {df['Year'].min()}-{df['Year'].max()}")
         
         return "\n".join(schema)
     
-    def parse_query(self, question: str) -> Dict[str, Any]:
-        """Use LLM to parse natural language query into structured format"""
+    def _build_entity_index(self) -> Dict[str, Dict[str, set]]:
+        """Map each lowercase word of every entity name to the names containing it"""
+        index = {}
+        for col, values in self._entity_values():
+            for value in values:
+                value = str(value)
+                for word in re.findall(r'[a-z]+', value.lower()):
+                    if len(word) >= 3 or word == value.lower():
+                        index.setdefault(word, {}).setdefault(col, set()).add(value)
+        return index
+    
+    def _entity_values(self):
+        """(column, distinct names) per dataset, from catalog metadata when available"""
+        if self.catalog is not None:
+            for name in self.catalog.names():
+                for col, values in self.catalog.entity_values(name).items():
+                    if col == 'District':
+                        values = clean_district_names(pd.Series(values)).unique()
+                    yield col, values
+            return
+        for df in self.data.values():
+            for col in self.ENTITY_COLUMNS:
+                if col in df.columns:
+                    yield col, df[col].dropna().unique()
+    
+    def _entities_for(self, question: str) -> Dict[str, List[str]]:
+        """Entity dictionary entries relevant to one question
         
-        prompt = f"""You are a data analysis assistant. Parse the following question into a structured JSON format.
+        Names are ranked by how many of their words the question contains,
+        so 'Ludhiana Punjab' beats names that merely share one word.
+        """
+        scores = {}
+        for word in set(re.findall(r'[a-z]+', question.lower())) - self.PROMPT_STOPWORDS:
+            for col, values in self.entities.get(word, {}).items():
+                col_scores = scores.setdefault(col, {})
+                for value in values:
+                    col_scores[value] = col_scores.get(value, 0) + 1
+        return {
+            col: sorted(col_scores, key=lambda v: (-col_scores[v], v))[:self.MAX_ENTITIES_PER_COLUMN]
+            for col, col_scores in scores.items()
+        }
+    
+    def _build_prompt_prefix(self) -> str:
+        """Static part of the parse prompt, built once per engine"""
+        return f"""You are a data analysis assistant. Parse the question into JSON.
 
-Available datasets and their schemas:
+Datasets:
 {self.data_schema}
 
-User Question: {question}
-
-Extract the following information and return ONLY a valid JSON object:
-{{
-    "intent": "compare_rainfall | list_crops | identify_district | analyze_trend | policy_support",
-    "states": ["state names mentioned"],
-    "districts": ["district names if mentioned"],
-    "crops": ["crop names mentioned"],
-    "years": ["year range if mentioned"],
-    "metrics": ["what to measure: production, rainfall, area, etc"],
-    "operations": ["compare", "list", "identify", "correlate", "analyze"],
-    "filters": {{"any additional filters"}}
-}}
-
-Return ONLY the JSON, no other text."""
+Return ONLY a valid JSON object of this shape:
+{{"intent": "compare_rainfall | list_crops | identify_district | analyze_trend | policy_support",
+ "states": [], "districts": [], "crops": [], "years": [],
+ "metrics": ["production | yield | rainfall | area | ..."],
+ "operations": ["compare | list | identify | correlate | analyze | rank_all"],
+ "filters": {{}}}}"""
+    
+    def _build_parse_prompt(self, question: str) -> str:
+        """Cached prefix + entity names the question mentions + the question"""
+        lines = [self._prompt_prefix]
+        entities = self._entities_for(question)
+        if entities:
+            lines.append("\nKnown names in this question (use these spellings):")
+            lines.extend(f"{col}: {', '.join(values)}" for col, values in entities.items())
+        lines.append(f"\nUser Question: {question}")
+        lines.append("Return ONLY the JSON, no other text.")
+        return "\n".join(lines)
+    
+    def _generate(self, prompt: str, purpose: str, on_wait=None):
+        """Call the LLM under its deadline, inside a span that records token counts
+        
+        on_wait runs on this thread while the request is in flight (hedging).
+        Raises CircuitOpenError without calling out while the API is unhealthy.
+        """
+        with self.tracer.span("llm.generate", purpose=purpose) as span:
+            if self.llm is None:
+                raise CircuitOpenError("LLM is disabled for this offline engine")
+            permit = self.llm.available()
+            if not permit:
+                span.set_attribute("outcome", "circuit_open")
+                raise CircuitOpenError("LLM circuit is open")
+            metrics.LLM_CALLS.inc(labels={"purpose": purpose})
+            call = self.llm.submit(prompt, permit)
+            if on_wait:
+                on_wait()
+            try:
+                response = call.result(timeout=self.llm.timeout)
+            except LLMTimeoutError:
+                span.set_attribute("outcome", "timeout")
+                raise
+            except Exception:
+                span.set_attribute("outcome", "error")
+                metrics.LLM_ERRORS.inc(labels={"purpose": purpose})
+                raise
+            usage = getattr(response, "usage_metadata", None)
+            if usage is not None:
+                span.set_attribute("prompt_tokens", getattr(usage, "prompt_token_count", 0))
+                span.set_attribute("response_tokens", getattr(usage, "candidates_token_count", 0))
+            else:
+                # Rough estimate (~4 characters per token) when the SDK reports no usage
+                span.set_attribute("prompt_tokens", len(prompt) // 4)
+            return response
+    
+    @traced("parse_query")
+    def parse_query(self, question: str) -> Dict[str, Any]:
+        """Use LLM to parse natural language query into structured format"""
+        
+        if self.llm is None:
+            current_span().set_attribute("parser", "rules")
+            return self._fallback_parse(question)
+        
+        prompt = self._build_parse_prompt(question)
+        current_span().set_attribute("prompt_chars", len(prompt))
 
+        # Hedge: run the local parser while Gemini is working, so a missed
+        # deadline costs nothing extra
+        hedged = {}
+        
+        def parse_locally():
+            hedged['parsed'] = self._fallback_parse(question)
+        
         try:
-            response = self.model.generate_content(prompt)
+            response = self._generate(prompt, "parse", on_wait=parse_locally if self.hedge else None)
             json_str = response.text.strip()
             
             # Extract JSON from markdown if present
@@ -131,25 +395,36 @@ Return ONLY the JSON, no other text."""
         except Exception as e:
             print(f"⚠️ Error parsing query with LLM: {e}")
             print(f"🔄 Falling back to rule-based parsing...")
-            return self._fallback_parse(question)
+            current_span().set_attribute("fallback", True)
+            metrics.PARSE_FALLBACKS.inc()
+            parsed = hedged.get('parsed') or self._fallback_parse(question)
+            print(f"🔄 Fallback parser result: {parsed}")
+            return parsed
     
     def _fallback_parse(self, question: str) -> Dict[str, Any]:
         """Fallback rule-based parser when LLM fails"""
         question_lower = question.lower()
         
-        # Extract states (Indian states)
-        states_keywords = ['punjab', 'haryana', 'up', 'uttar pradesh', 'maharashtra', 
-                          'karnataka', 'tamil nadu', 'kerala', 'gujarat', 'rajasthan',
-                          'madhya pradesh', 'mp', 'west bengal', 'bihar', 'andhra pradesh']
-        states = [s for s in states_keywords if s in question_lower]
+        # States and crops as spelled in the data; aliases ("UP", "paddy") and
+        # misspellings ("Panjab") resolve through the entity index
+        states = self.resolver.mentions('State', question)
+        crops = self.resolver.mentions('Crop', question)
         
-        # Extract crops
-        crop_keywords = ['wheat', 'rice', 'sugarcane', 'cotton', 'maize', 'pulses',
-                        'paddy', 'bajra', 'jowar', 'soybean', 'groundnut']
-        crops = [c for c in crop_keywords if c in question_lower]
+        # Keyword lists when no data names are known yet
+        if 'State' not in self.resolver.spellings:
+            states_keywords = ['punjab', 'haryana', 'up', 'uttar pradesh', 'maharashtra', 
+                              'karnataka', 'tamil nadu', 'kerala', 'gujarat', 'rajasthan',
+                              'madhya pradesh', 'mp', 'west bengal', 'bihar', 'andhra pradesh']
+            # Whole words only, so 'up' is not found in "group" nor 'rice' in "price"
+            states = [s for s in states_keywords if re.search(rf'\b{re.escape(s)}\b', question_lower)]
+        if 'Crop' not in self.resolver.spellings:
+            crop_keywords = ['wheat', 'rice', 'sugarcane', 'cotton', 'maize', 'pulses',
+                            'paddy', 'bajra', 'jowar', 'soybean', 'groundnut']
+            crops = [c for c in crop_keywords if re.search(rf'\b{re.escape(c)}\b', question_lower)]
+        # Region mentions ("all northern states") expand to member states
+        states += [s for s in self._expand_regions([], question_lower) if s not in states]
         
         # Extract years (match 4-digit years)
-        import re
         years = re.findall(r'\b(19\d{2}|20\d{2})\b', question)
         
         # Extract season
@@ -162,7 +437,9 @@ Return ONLY the JSON, no other text."""
             seasons.append('Zaid')
         
         # Determine intent based on keywords
-        if 'district' in question_lower and ('highest' in question_lower or 'maximum' in question_lower or 'most' in question_lower):
+        if any(k in question_lower for k in ('recommend', 'drought', 'resilien', 'promot')):
+            intent = 'policy_support'
+        elif 'district' in question_lower and ('highest' in question_lower or 'maximum' in question_lower or 'most' in question_lower):
             intent = 'identify_district'
         elif 'compare' in question_lower and 'rainfall' in question_lower:
             intent = 'compare_rainfall'
@@ -174,29 +451,40 @@ Return ONLY the JSON, no other text."""
             intent = 'compare_rainfall'  # default
         
         # Extract metrics
-        metrics = []
+        measures = []
         if 'rainfall' in question_lower:
-            metrics.append('rainfall')
+            measures.append('rainfall')
         if 'production' in question_lower or crops:
-            metrics.append('production')
+            measures.append('production')
         if 'area' in question_lower:
-            metrics.append('area')
+            measures.append('area')
+        if any(keyword in question_lower for keyword in YIELD_KEYWORDS):
+            measures.append('yield')
         
         parsed = {
             "intent": intent,
             "states": states,
             "crops": crops,
             "years": years,
-            "operations": ["compare" if "compare" in question_lower else "identify" if "district" in question_lower else "analyze"],
-            "metrics": metrics,
+            "operations": ["compare" if "compare" in question_lower else "identify" if "district" in question_lower else "analyze"]
+                          + (["rank_all"] if any(k in question_lower for k in self.FULL_RANKING_KEYWORDS) else []),
+            "metrics": measures,
             "filters": {"season": seasons[0] if seasons else None}
         }
+        # Keep the period phrase so handlers can apply "last N years" windows
+        period = re.search(r'(?:last|past|over)\s+\d+\s+years?|(?:last|past) decade', question_lower)
+        if period:
+            parsed["filters"]["period"] = period.group(0)
         
-        print(f"🔄 Fallback parser result: {parsed}")
         return parsed
     
-    def execute_query(self, parsed_query: Dict[str, Any]) -> Dict[str, Any]:
-        """Execute the parsed query on datasets"""
+    @traced("execute_query")
+    def execute_query(self, parsed_query: Dict[str, Any], render: bool = True) -> Dict[str, Any]:
+        """Execute the parsed query on datasets
+        
+        With render=False the answer is left as a structured Answer for the
+        caller to render (answer_question does this in its format stage).
+        """
         
         intent = parsed_query.get("intent", "")
         results = {
@@ -207,178 +495,388 @@ Return ONLY the JSON, no other text."""
         }
         
         try:
+            parsed_query = self._resolve_entities(parsed_query)
+            self._ensure_loaded(parsed_query)
+            
             # Check for keywords to determine query type
             query_str = str(parsed_query).lower()
             
+            # Rainfall comparisons and trends route on intent first; the keyword
+            # checks below would otherwise match the 'districts' key every parse carries
+            if "compare_rainfall" in intent:
+                handler = self._handle_rainfall_query
+            
+            elif "analyze_trend" in intent:
+                handler = self._handle_trend_query
+            
+            elif "list_crops" in intent:
+                handler = self._handle_list_crops_query
+            
+            # Drought-resilience recommendations and policy questions
+            elif "policy_support" in intent or "drought" in query_str:
+                handler = self._handle_recommendation_query
+            
             # District-level crop queries (highest/lowest production)
-            if ("district" in query_str or "highest" in query_str or "lowest" in query_str) and \
+            elif ("district" in query_str or "highest" in query_str or "lowest" in query_str) and \
                ("crop" in query_str or "production" in query_str or parsed_query.get('crops')):
-                results = self._handle_crop_query(parsed_query)
+                handler = self._handle_crop_query
             
             # Rainfall comparison queries
             elif ("rainfall" in query_str and "compare" in query_str) or "compare_rainfall" in intent:
-                results = self._handle_rainfall_query(parsed_query)
+                handler = self._handle_rainfall_query
             
             # Trend analysis queries
             elif "trend" in query_str or "analyze" in query_str or "correlation" in query_str:
-                results = self._handle_trend_query(parsed_query)
+                handler = self._handle_trend_query
             
             # Default: try to determine best handler
             else:
                 # If has crops and states -> crop query
                 if parsed_query.get('crops') and parsed_query.get('states'):
-                    results = self._handle_crop_query(parsed_query)
+                    handler = self._handle_crop_query
                 # If has rainfall metrics -> rainfall query
                 elif 'rainfall' in str(parsed_query.get('metrics', [])).lower():
-                    results = self._handle_rainfall_query(parsed_query)
+                    handler = self._handle_rainfall_query
                 # Otherwise try rainfall as default
                 else:
-                    results = self._handle_rainfall_query(parsed_query)
+                    handler = self._handle_rainfall_query
+            
+            current_span().set_attribute("route", handler.__name__)
+            metrics.QUERIES.inc(labels={"route": handler.__name__})
+            results = handler(parsed_query)
+            results["route"] = handler.__name__
+            if render:
+                render_result(results, self.answer_format, self.locale)
                 
         except Exception as e:
             print(f"❌ Error executing query: {e}")
+            metrics.QUERY_ERRORS.inc()
             import traceback
             traceback.print_exc()
             results["answer"] = f"Error executing query: {str(e)}"
         
         return results
     
+    # Trend series keys; districts are keyed by canonical id so same-named
+    # districts in different states stay separate
+    TREND_LEVELS = {'state': ('State', 'Crop'), 'district': ('District_ID', 'Crop')}
+    
+    # Region names users ask about, expanded to member states
+    REGIONS = {
+        'northern': ['Punjab', 'Haryana', 'Himachal Pradesh', 'Jammu And Kashmir', 'Uttarakhand',
+                     'Uttar Pradesh', 'Rajasthan', 'Delhi', 'Chandigarh'],
+        'southern': ['Andhra Pradesh', 'Karnataka', 'Kerala', 'Tamil Nadu', 'Telangana', 'Puducherry'],
+        'eastern': ['Bihar', 'Jharkhand', 'Odisha', 'West Bengal'],
+        'western': ['Goa', 'Gujarat', 'Maharashtra'],
+        'central': ['Chhattisgarh', 'Madhya Pradesh'],
+        'north eastern': ['Arunachal Pradesh', 'Assam', 'Manipur', 'Meghalaya', 'Mizoram',
+                          'Nagaland', 'Sikkim', 'Tripura'],
+    }
+    
+    def _expand_regions(self, states: List[str], query_text: str) -> List[str]:
+        """Replace region mentions ('all northern states') with member states"""
+        expanded = []
+        text = query_text.replace('-', ' ')
+        # 'north eastern' is checked before 'eastern' so it is not double-counted
+        for region in sorted(self.REGIONS, key=len, reverse=True):
+            if f"{region} states" in text or f"{region} india" in text or f"{region} region" in text:
+                expanded.extend(self.REGIONS[region])
+                text = text.replace(region, '')
+        for state in states:
+            region = str(state).lower().replace('-', ' ').replace(' states', '').replace('all ', '').strip()
+            expanded.extend(self.REGIONS.get(region, [state]))
+        # Spell members as the data does, then de-duplicate keeping first-mention order
+        return list(dict.fromkeys(self.resolver.resolve('State', s) or str(s).title() for s in expanded))
+    
+    def _canonical(self, column: str, name) -> str:
+        """Data spelling of a parsed entity name; unknown names are returned as given"""
+        return self.resolver.resolve(column, name) or str(name)
+    
+    def _resolve_entities(self, parsed_query: Dict) -> Dict:
+        """Copy of a parse with states, districts, crops and season spelled exactly as in the data
+        
+        Region words ('northern') are left for the handlers that expand them.
+        """
+        with self.tracer.span("entities.resolve"):
+            resolved = dict(parsed_query)
+            for field, column in (('states', 'State'), ('districts', 'District'), ('crops', 'Crop')):
+                # Only fields the parse has, since routing also reads the parse's keys
+                if parsed_query.get(field):
+                    resolved[field] = list(dict.fromkeys(self._canonical(column, name)
+                                                         for name in parsed_query[field]))
+            filters = parsed_query.get('filters')
+            if isinstance(filters, dict) and filters.get('season'):
+                resolved['filters'] = {**filters, 'season': self._canonical('Season', filters['season'])}
+        return resolved
+    
+    def _match_states(self, series: pd.Series, states: List[str]) -> pd.Series:
+        """Label each row with the requested state it belongs to (NaN if none)
+        
+        States are resolved names; rows match any data spelling of them
+        exactly, through one map() over the column.
+        """
+        labels = {spelling: state for state in reversed(states)
+                  for spelling in self.resolver.variants('State', state)}
+        return series.map(labels)
+    
+    def _filter_values(self, column: str, name: str) -> Tuple[str, ...]:
+        """Exact values an isin filter on column should keep for a resolved name"""
+        return self.resolver.variants(column, name)
+    
+    @staticmethod
+    def _period_years(query_text: str):
+        """Window length from 'last N years' / 'over N years' / 'last decade', else None"""
+        match = re.search(r'(?:last|past|over)\s+(\d+)\s+years?', query_text)
+        if match:
+            return int(match.group(1))
+        if 'decade' in query_text:
+            return 10
+        return None
+    
+    def _query_metric(self, parsed_query: Dict) -> str:
+        """Metric to rank or trend on: 'yield' if the planner or question asks for it"""
+        if self.derived is None:
+            return 'production'
+        requested = [str(m).lower() for m in parsed_query.get('metrics') or []]
+        if 'yield' in requested:
+            return 'yield'
+        return metric_for(str(parsed_query))
+    
+    def trend_index_for(self, metric: str = 'production') -> TrendIndex:
+        """Batch trend statistics per metric, built on the first question that needs them"""
+        index = self._trend_indexes.get(metric)
+        if index is None:
+            # Built under the engine lock, so a concurrent load cannot pair it with older data
+            with self._lock, self.tracer.span("trend_index.build", metric=metric):
+                index = self._trend_indexes.get(metric)
+                if index is None:
+                    if metric == 'yield':
+                        index = TrendIndex(self.data['crop_production'], self.data.get('rainfall'), value='Yield',
+                                           level_tables=self.derived.tables, agg='mean', levels=self.TREND_LEVELS)
+                    else:
+                        index = TrendIndex(self.data['crop_production'], self.data.get('rainfall'),
+                                           levels=self.TREND_LEVELS)
+                    self._trend_indexes[metric] = index
+        return index
+    
+    @property
+    def trend_index(self) -> TrendIndex:
+        return self.trend_index_for('production')
+    
+    @property
+    def district_facts(self) -> Optional[DistrictFacts]:
+        """District-year production joined with district rainfall, built once"""
+        facts = self._district_facts
+        if facts is None and self.derived is not None and 'district' in self.derived.tables:
+            with self._lock, self.tracer.span("district_facts.build"):
+                if self._district_facts is None:
+                    self._district_facts = DistrictFacts(self.derived.table('district'), self.data.get('rainfall'))
+                facts = self._district_facts
+        return facts
+    
+    def _resolve_district(self, name: str, states: List[str], crop: str) -> Optional[int]:
+        """District_ID for a named district that has data for the crop"""
+        ids = self.crosswalk.resolve(name, states)
+        facts = self.district_facts
+        if facts is not None:
+            ids = [i for i in ids if facts.has(i, crop)] or ids
+        return ids[0] if ids else None
+    
+    def resilience_index(self, window: int = DEFAULT_WINDOW) -> Optional[ResilienceIndex]:
+        """Drought-resilience scores over a climate window, built once per window"""
+        if self.derived is None or 'district' not in self.derived.tables or 'rainfall' not in self.data:
+            return None
+        index = self._resilience_indexes.get(window)
+        if index is None:
+            with self._lock, self.tracer.span("resilience_index.build", window=window):
+                index = self._resilience_indexes.get(window)
+                if index is None:
+                    index = ResilienceIndex(self.derived.table('district'), self.data['rainfall'], window=window)
+                    self._resilience_indexes[window] = index
+        return index
+    
+    @traced("handler.rainfall")
     def _handle_rainfall_query(self, parsed_query: Dict) -> Dict:
-        """Handle rainfall comparison queries"""
+        """Handle rainfall comparison queries across any number of states"""
         df = self.data['rainfall']
-        states = parsed_query.get('states', [])
+        current_span().add("rows_scanned", len(df))
         years = parsed_query.get('years', [])
+        query_text = str(parsed_query).lower()
+        states = self._expand_regions(parsed_query.get('states', []), query_text)
         
         print(f"🔍 Handling rainfall query for states: {states}, years: {years}")
         
-        # Extract "last N years" from query text
-        import re
-        query_text = str(parsed_query).lower()
-        last_n_match = re.search(r'last\s+(\d+)\s+years?', query_text)
-        n_years = None
-        if last_n_match:
-            n_years = int(last_n_match.group(1))
+        # Extract "last N years" / "over N years" / "last decade" from query text
+        n_years = self._period_years(query_text)
+        if n_years:
             print(f"📅 Filtering for last {n_years} years")
         
-        if len(states) >= 2:
-            state1, state2 = states[0].title(), states[1].title()
-            
-            # Filter data by states
-            df1 = df[df['State'].str.contains(state1, case=False, na=False)].copy()
-            df2 = df[df['State'].str.contains(state2, case=False, na=False)].copy()
-            
-            if df1.empty or df2.empty:
-                return {
-                    "answer": f"❌ No rainfall data found for {state1} or {state2}",
-                    "data": {},
-                    "sources": []
-                }
-            
-            # Filter by last N years if specified
-            if n_years:
-                max_year = df['Year'].max()
-                min_year = max_year - n_years + 1
-                df1 = df1[df1['Year'] >= min_year]
-                df2 = df2[df2['Year'] >= min_year]
-                year_range = f"{min_year}-{max_year}"
-            elif years:
-                # Use specific years if provided
-                year_list = [int(y) for y in years if str(y).isdigit()]
-                if year_list:
-                    df1 = df1[df1['Year'].isin(year_list)]
-                    df2 = df2[df2['Year'].isin(year_list)]
-                    year_range = f"{min(year_list)}-{max(year_list)}"
-            else:
-                year_range = f"{df1['Year'].min()}-{df1['Year'].max()}"
-            
-            # Get year-by-year data
-            rainfall_by_year_1 = df1.groupby('Year')['Annual_Rainfall_mm'].mean().sort_index()
-            rainfall_by_year_2 = df2.groupby('Year')['Annual_Rainfall_mm'].mean().sort_index()
-            
-            # Calculate averages
-            avg1 = rainfall_by_year_1.mean()
-            avg2 = rainfall_by_year_2.mean()
-            
-            # Build detailed year-by-year comparison
-            year_comparison = []
-            for year in sorted(set(rainfall_by_year_1.index) | set(rainfall_by_year_2.index)):
-                rain1 = rainfall_by_year_1.get(year, 0)
-                rain2 = rainfall_by_year_2.get(year, 0)
-                year_comparison.append(f"  {year}: {state1} = {rain1:.1f} mm, {state2} = {rain2:.1f} mm")
-            
-            # Get crop data for same states
-            crop_df = self.data['crop_production']
-            
-            # Filter crops by same year range
-            crops1 = crop_df[crop_df['State'].str.contains(state1, case=False, na=False)]
-            crops2 = crop_df[crop_df['State'].str.contains(state2, case=False, na=False)]
-            
-            if n_years:
-                crops1 = crops1[crops1['Year'] >= min_year]
-                crops2 = crops2[crops2['Year'] >= min_year]
-            
-            top_crops1 = crops1.groupby('Crop')['Production'].sum().nlargest(3)
-            top_crops2 = crops2.groupby('Crop')['Production'].sum().nlargest(3)
-            
-            # Build answer
-            answer_parts = [
-                f"**Annual Rainfall Comparison: {state1} vs {state2}**",
-                f"**Period:** {year_range} ({len(rainfall_by_year_1)} years)\n",
-                "**Year-by-Year Rainfall (mm):**"
-            ]
-            answer_parts.extend(year_comparison)
-            
-            answer_parts.extend([
-                f"\n**Average Annual Rainfall:**",
-                f"- {state1}: {avg1:.2f} mm",
-                f"- {state2}: {avg2:.2f} mm",
-                f"- Difference: {abs(avg1 - avg2):.2f} mm ({state1 if avg1 > avg2 else state2} receives more)\n"
-            ])
-            
-            # Add rainfall trend
-            if len(rainfall_by_year_1) > 1:
-                trend1 = "increasing" if rainfall_by_year_1.iloc[-1] > rainfall_by_year_1.iloc[0] else "decreasing"
-                trend2 = "increasing" if rainfall_by_year_2.iloc[-1] > rainfall_by_year_2.iloc[0] else "decreasing"
-                answer_parts.append(f"**Trends:** {state1} is {trend1}, {state2} is {trend2}\n")
-            
-            answer_parts.extend([
-                f"**Top 3 Crops by Production (Same Period):**\n",
-                f"**{state1}:**"
-            ])
-            answer_parts.extend([f"  {i+1}. {crop}: {prod:.0f} tonnes" 
-                               for i, (crop, prod) in enumerate(top_crops1.items())])
-            
-            answer_parts.append(f"\n**{state2}:**")
-            answer_parts.extend([f"  {i+1}. {crop}: {prod:.0f} tonnes" 
-                               for i, (crop, prod) in enumerate(top_crops2.items())])
-            
-            answer_parts.append("\n*Data Sources: Ministry of Agriculture & Farmers Welfare, India Meteorological Department (data.gov.in)*")
-            
-            answer = "\n".join(answer_parts)
-            
+        if len(states) < 2:
             return {
-                "answer": answer,
-                "data": {
-                    "rainfall": {state1: avg1, state2: avg2},
-                    "rainfall_by_year": {
-                        state1: rainfall_by_year_1.to_dict(),
-                        state2: rainfall_by_year_2.to_dict()
-                    },
-                    "crops": {state1: top_crops1.to_dict(), state2: top_crops2.to_dict()},
-                    "year_range": year_range
-                },
-                "sources": ["data.gov.in - IMD Rainfall", "data.gov.in - Agriculture Production"]
+                "answer": "⚠️ Please specify at least two states for comparison.", 
+                "data": {}, 
+                "sources": []
+            }
+        
+        # One pass: label rows by requested state, then filter by period
+        labels = self._match_states(df['State'], states)
+        rain = df.assign(_label=labels)[labels.notna()]
+        
+        min_year = None
+        if n_years:
+            max_year = df['Year'].max()
+            min_year = max_year - n_years + 1
+            rain = rain[rain['Year'] >= min_year]
+        elif years:
+            year_list = [int(y) for y in years if str(y).isdigit()]
+            if year_list:
+                rain = rain[rain['Year'].isin(year_list)]
+        
+        # Year x State matrix of mean annual rainfall
+        pivot = rain.pivot_table(index='Year', columns='_label', values='Annual_Rainfall_mm', aggfunc='mean')
+        found = [s for s in states if s in pivot.columns]
+        missing = [s for s in states if s not in pivot.columns]
+        if len(found) < 2:
+            return {
+                "answer": f"❌ No rainfall data found for {' or '.join(missing or states)}",
+                "data": {},
+                "sources": []
             }
+        pivot = pivot[found].sort_index()
+        year_range = f"{pivot.index.min()}-{pivot.index.max()}"
+        
+        averages = pivot.mean()
+        slopes = pd.Series(least_squares_slopes(pivot.to_numpy(dtype=float).T, pivot.index.to_numpy()),
+                           index=pivot.columns)
+        group_mean = averages.mean()
+        
+        # Top 3 crops per state over the same period, from one groupby
+        crop_df = self.data['crop_production']
+        current_span().add("rows_scanned", len(crop_df))
+        crop_labels = self._match_states(crop_df['State'], found)
+        crops = crop_df.assign(_label=crop_labels)[crop_labels.notna()]
+        if min_year is not None:
+            crops = crops[crops['Year'] >= min_year]
+        top_crops = (crops.groupby(['_label', 'Crop'])['Production'].sum()
+                     .sort_values(ascending=False)
+                     .groupby(level=0).head(3))
+        
+        # Build answer: states become positional columns s0..sN of one row template
+        answer = Answer(f"Annual Rainfall Comparison: {' vs '.join(found)}")
+        answer.labelled("Period:", f"{year_range} ({len(pivot)} years)").gap()
+        answer.heading("Year-by-Year Rainfall (mm):")
+        columns = {f"s{i}": pivot[s].round(1).to_numpy() for i, s in enumerate(found)}
+        answer.table("  {year}: " + ", ".join(f"{s} = {{s{i}:.1f}} mm" for i, s in enumerate(found)),
+                     {"year": pivot.index.to_numpy(), **columns}, name="rainfall_by_year")
+        
+        answer.gap().heading("Average Annual Rainfall:")
+        comparison = [(s, f"{averages[s]:.2f} mm") for s in found]
+        if len(found) == 2:
+            s1, s2 = found
+            comparison.append(("Difference", f"{abs(averages[s1] - averages[s2]):.2f} mm "
+                                             f"({s1 if averages[s1] > averages[s2] else s2} receives more)"))
+        else:
+            wettest, driest = averages.idxmax(), averages.idxmin()
+            comparison.append(("Wettest", f"{wettest} ({averages[wettest] - group_mean:+.2f} mm vs group mean)"))
+            comparison.append(("Driest", f"{driest} ({averages[driest] - group_mean:+.2f} mm vs group mean)"))
+        answer.fields(comparison).gap()
+        
+        # Trend from the least-squares slope rather than first vs last year
+        if len(pivot) > 1:
+            trends = ", ".join(
+                f"{s} is {'increasing' if slopes[s] > 0 else 'decreasing'} ({slopes[s]:+.1f} mm/yr)"
+                for s in found if pd.notna(slopes[s])
+            )
+            answer.labelled("Trends:", trends).gap()
+        
+        answer.heading("Top 3 Crops by Production (Same Period):").gap()
+        crops_by_state = {}
+        for state in found:
+            state_top = top_crops[state] if state in top_crops.index.get_level_values(0) else pd.Series(dtype=float)
+            crops_by_state[state] = state_top.to_dict()
+            answer.heading(f"{state}:")
+            answer.table("  {rank}. {crop}: {production:.0f} tonnes",
+                         {"rank": np.arange(1, len(state_top) + 1), "crop": state_top.index.to_numpy(),
+                          "production": state_top.to_numpy()}, name=f"top_crops_{state}")
+            answer.gap()
+        
+        answer.source("Data Sources: Ministry of Agriculture & Farmers Welfare, India Meteorological Department (data.gov.in)")
         
         return {
-            "answer": "⚠️ Please specify at least two states for comparison.", 
-            "data": {}, 
-            "sources": []
+            "answer": answer,
+            "data": {
+                "rainfall": averages.to_dict(),
+                "rainfall_by_year": {s: pivot[s].dropna().to_dict() for s in found},
+                "rainfall_trend_mm_per_year": slopes.to_dict(),
+                "crops": crops_by_state,
+                "year_range": year_range
+            },
+            "sources": ["data.gov.in - IMD Rainfall", "data.gov.in - Agriculture Production"]
+        }
+    
+    # Crops listed per state by _handle_list_crops_query
+    TOP_CROPS = 5
+    
+    @traced("handler.list_crops")
+    def _handle_list_crops_query(self, parsed_query: Dict) -> Dict:
+        """Top crops by total production in each requested state"""
+        query_text = str(parsed_query).lower()
+        states = self._expand_regions(parsed_query.get('states', []), query_text)
+        if not states:
+            return {"answer": "⚠️ Please specify at least one state.", "data": {}, "sources": []}
+        
+        df = self.data['crop_production']
+        current_span().add("rows_scanned", len(df))
+        labels = self._match_states(df['State'], states)
+        crops = df.assign(_label=labels)[labels.notna()]
+        n_years = self._period_years(query_text)
+        if n_years and len(crops):
+            crops = crops[crops['Year'] > crops['Year'].max() - n_years]
+        top_crops = (crops.groupby(['_label', 'Crop'])['Production'].sum()
+                     .sort_values(ascending=False)
+                     .groupby(level=0).head(self.TOP_CROPS))
+        found = [s for s in states if s in top_crops.index.get_level_values(0)]
+        if not found:
+            return {"answer": f"❌ No crop production data found for {' or '.join(states)}", "data": {}, "sources": []}
+        
+        year_range = f"{crops['Year'].min()}-{crops['Year'].max()}"
+        answer = Answer(f"Top Crops by Production: {', '.join(found)}")
+        answer.labelled("Period:", year_range).gap()
+        crops_by_state = {}
+        for state in found:
+            state_top = top_crops[state]
+            crops_by_state[state] = state_top.to_dict()
+            answer.heading(f"{state}:")
+            answer.table("  {rank}. {crop}: {production:.0f} tonnes",
+                         {"rank": np.arange(1, len(state_top) + 1), "crop": state_top.index.to_numpy(),
+                          "production": state_top.to_numpy()}, name=f"top_crops_{state}")
+            answer.gap()
+        answer.source("Data Source: Ministry of Agriculture & Farmers Welfare (data.gov.in)")
+        
+        return {
+            "answer": answer,
+            "data": {"crops": crops_by_state, "year_range": year_range},
+            "sources": ["data.gov.in - Agriculture Production"]
         }
     
+    @traced("handler.crop")
+    def _district_ranking(self, rows: pd.DataFrame, rank_col: str) -> pd.DataFrame:
+        """Per-district totals over the matched years, with the number of years
+        
+        Production and area are summed; yield is total production over total area.
+        """
+        keys = [k for k in ('District_ID', 'District') if k in rows.columns]
+        if {'Production', 'Area'}.issubset(rows.columns):
+            by_district = weighted_aggregate(rows, tuple(keys))
+        else:
+            by_district = rows.groupby(keys, observed=True)[[rank_col]].sum(min_count=1).reset_index()
+        by_district['Years'] = rows.groupby(keys, observed=True)['Year'].nunique().to_numpy()
+        return by_district[by_district[rank_col].notna()]
+    
     def _handle_crop_query(self, parsed_query: Dict) -> Dict:
         """Handle crop production queries"""
         df = self.data['crop_production']
+        current_span().add("rows_scanned", len(df))
         states = parsed_query.get('states', [])
         crops = parsed_query.get('crops', [])
         years = parsed_query.get('years', [])
@@ -388,29 +886,42 @@ Return ONLY the JSON, no other text."""
         
         # Handle single state queries (e.g., "Which district has highest wheat in Punjab?")
         if len(states) >= 1 and crops:
-            crop_name = crops[0].title()
-            state_name = states[0].title()
-            
-            # Filter by crop and state
-            filtered_df = df[
-                (df['Crop'].str.contains(crop_name, case=False, na=False)) &
-                (df['State'].str.contains(state_name, case=False, na=False))
-            ]
+            crop_name = crops[0]
+            state_name = states[0]
             
-            # Apply additional filters (year, season, etc.)
+            # Filter on the resolved crop and state, plus year and season when given
+            predicates = [predicate('Crop', 'isin', self._filter_values('Crop', crop_name)),
+                          predicate('State', 'isin', self._filter_values('State', state_name))]
             if years:
                 year_val = int(years[0]) if isinstance(years[0], str) and years[0].isdigit() else None
                 if year_val:
-                    filtered_df = filtered_df[filtered_df['Year'] == year_val]
+                    predicates.append(predicate('Year', 'eq', year_val))
             
             # Check for season filter in the original query
             season_keywords = {'rabi': 'Rabi', 'kharif': 'Kharif', 'zaid': 'Zaid'}
-            if 'Season' in filtered_df.columns:
+            season_filtered = False
+            if 'Season' in df.columns:
                 for keyword, season in season_keywords.items():
                     if keyword in str(parsed_query).lower():
-                        filtered_df = filtered_df[filtered_df['Season'].str.contains(season, case=False, na=False)]
+                        predicates.append(predicate('Season', 'isin', self._filter_values('Season', season)))
+                        season_filtered = True
                         break
             
+            metric = METRICS[self._query_metric(parsed_query)]
+            rank_col, unit, label, decimals = metric['column'], metric['unit'], metric['label'], metric['decimals']
+            dataset, frame = 'crop_production', df
+            if rank_col == 'Yield' and not season_filtered:
+                # Rank on area-weighted district-year yield across seasons; a season
+                # filter already leaves one row per district-year, with its own yield
+                dataset, frame = 'district_yield', self.derived.table('district')
+            
+            def ranked_rows(rows: pd.DataFrame) -> pd.DataFrame:
+                return rows[rows['Yield'].notna()] if rank_col == 'Yield' else rows
+            
+            # The slice comes from (or is derived from) the shared subresult cache
+            filtered_df = ranked_rows(self.subresults.slice(dataset, frame, predicates))
+            
+            current_span().set_attribute("rows_matched", len(filtered_df))
             if filtered_df.empty:
                 return {
                     "answer": f"❌ No {crop_name} data found for {state_name}",
@@ -418,48 +929,74 @@ Return ONLY the JSON, no other text."""
                     "sources": []
                 }
             
-            # Find highest production district
-            max_row = filtered_df.loc[filtered_df['Production'].idxmax()]
+            # Find highest production (or yield) district
+            max_row = filtered_df.loc[filtered_df[rank_col].idxmax()]
             
             # Build answer with available information
-            answer_parts = [f"**{crop_name} Production in {state_name}**\n"]
-            answer_parts.append(f"**Highest Production District:**")
-            answer_parts.append(f"- District: {max_row['District']}")
-            answer_parts.append(f"- Production: {max_row['Production']:.0f} tonnes")
-            answer_parts.append(f"- Year: {max_row['Year']}")
+            answer = Answer(f"{crop_name} {label} in {state_name}").gap()
+            answer.heading(f"Highest {label} District:")
+            highest = [("District", max_row['District'])]
+            if rank_col != 'Production':
+                highest.append((label, f"{max_row[rank_col]:.{decimals}f} {unit}"))
+            highest.append(("Production", f"{max_row['Production']:.0f} tonnes"))
+            highest.append(("Year", max_row['Year']))
             
             if 'Area' in max_row and pd.notna(max_row['Area']):
-                answer_parts.append(f"- Area: {max_row['Area']:.0f} hectares")
+                highest.append(("Area", f"{max_row['Area']:.0f} hectares"))
             if 'Season' in max_row and pd.notna(max_row['Season']):
-                answer_parts.append(f"- Season: {max_row['Season']}")
+                highest.append(("Season", max_row['Season']))
+            answer.fields(highest)
             
-            # Add top districts if multiple exist
-            top_districts = filtered_df.nlargest(5, 'Production')[['District', 'Production', 'Year']]
+            # Rank districts, not district-years; cached with the slice it is built from
+            by_district = self.subresults.aggregate(
+                dataset, frame, predicates, f"district_ranking:{rank_col}",
+                lambda rows: self._district_ranking(ranked_rows(rows), rank_col))
+            first_year, last_year = filtered_df['Year'].min(), filtered_df['Year'].max()
+            period = str(first_year) if first_year == last_year else f"{first_year}-{last_year}"
+            basis = "overall" if rank_col == 'Yield' else "total"
+            
+            # The full ranking stays server-side behind a cursor; the answer
+            # lists the top 5, or one page when every district was asked for
+            columns = [c for c in dict.fromkeys(['District', rank_col, 'Production', 'Area', 'Years'])
+                       if c in by_district.columns]
+            ranking = by_district.sort_values(rank_col, ascending=False, kind='stable')[columns]
+            cursor = self.results.create(ranking, title=f"{crop_name} {label} by district in {state_name}, {period}")
+            shown = cursor.page_size if self._wants_full_ranking(parsed_query) else 5
+            top_districts = ranking.head(shown)
             if len(top_districts) > 1:
-                answer_parts.append(f"\n**Top 5 Districts by Production:**")
-                for idx, row in top_districts.iterrows():
-                    answer_parts.append(f"  {row['District']}: {row['Production']:.0f} tonnes ({row['Year']})")
+                answer.gap().heading(f"Top {len(top_districts)} Districts by {label} ({basis}, {period}):")
+                years_note = "" if first_year == last_year else " ({Years} yr)"
+                answer.table(f"  {{District}}: {{value:.{decimals}f}} {unit}{years_note}",
+                             {"District": top_districts['District'].to_numpy(),
+                              "value": top_districts[rank_col].to_numpy(),
+                              "Years": top_districts['Years'].to_numpy()}, name="top_districts")
+                if cursor.total > shown:
+                    answer.gap().note(f"Showing {shown} of {cursor.total:,} ranked districts; "
+                                      f"the full ranking can be paged or exported.")
             
-            answer_parts.append(f"\n*Source: Ministry of Agriculture & Farmers Welfare via data.gov.in*")
-            answer = "\n".join(answer_parts)
+            answer.gap().source("Source: Ministry of Agriculture & Farmers Welfare via data.gov.in")
             
             return {
                 "answer": answer,
                 "data": {
+                    "metric": rank_col.lower(),
                     "highest_district": max_row.to_dict(),
-                    "top_districts": top_districts.to_dict('records')
+                    "top_districts": top_districts.to_dict('records'),
+                    "cursor": cursor.describe()
                 },
                 "sources": ["data.gov.in - Crop Production Statistics"]
             }
         
         # Handle two-state comparison
         elif len(states) >= 2 and crops:
-            crop_name = crops[0].title()
-            state1, state2 = states[0].title(), states[1].title()
+            crop_name = crops[0]
+            state1, state2 = states[0], states[1]
             
-            filtered_df = df[df['Crop'].str.contains(crop_name, case=False, na=False)]
-            df1 = filtered_df[filtered_df['State'].str.contains(state1, case=False, na=False)]
-            df2 = filtered_df[filtered_df['State'].str.contains(state2, case=False, na=False)]
+            crop_filter = predicate('Crop', 'isin', self._filter_values('Crop', crop_name))
+            df1 = self.subresults.slice('crop_production', df,
+                                        [crop_filter, predicate('State', 'isin', self._filter_values('State', state1))])
+            df2 = self.subresults.slice('crop_production', df,
+                                        [crop_filter, predicate('State', 'isin', self._filter_values('State', state2))])
             
             if df1.empty or df2.empty:
                 return {
@@ -472,19 +1009,14 @@ Return ONLY the JSON, no other text."""
             max_district1 = df1.loc[df1['Production'].idxmax()]
             min_district2 = df2.loc[df2['Production'].idxmin()]
             
-            answer = f"""
-**{crop_name} Production Analysis:**
-
-{state1} - Highest Production:
-- District: {max_district1['District']}
-- Production: {max_district1['Production']:.0f} tonnes ({max_district1['Year']})
-
-{state2} - Lowest Production:
-- District: {min_district2['District']}
-- Production: {min_district2['Production']:.0f} tonnes ({min_district2['Year']})
-
-*Source: Ministry of Agriculture & Farmers Welfare via data.gov.in*
-"""
+            answer = Answer(f"{crop_name} Production Analysis:").gap()
+            answer.line(f"{state1} - Highest Production:")
+            answer.fields([("District", max_district1['District']),
+                           ("Production", f"{max_district1['Production']:.0f} tonnes ({max_district1['Year']})")])
+            answer.gap().line(f"{state2} - Lowest Production:")
+            answer.fields([("District", min_district2['District']),
+                           ("Production", f"{min_district2['Production']:.0f} tonnes ({min_district2['Year']})")])
+            answer.gap().source("Source: Ministry of Agriculture & Farmers Welfare via data.gov.in")
             
             return {
                 "answer": answer,
@@ -501,70 +1033,113 @@ Return ONLY the JSON, no other text."""
             "sources": []
         }
     
+    @traced("handler.trend")
     def _handle_trend_query(self, parsed_query: Dict) -> Dict:
-        """Handle trend analysis queries"""
-        crop_df = self.data['crop_production']
-        rain_df = self.data['rainfall']
-        
+        """Handle trend analysis queries from the precomputed trend index"""
         crops = parsed_query.get('crops', [])
         states = parsed_query.get('states', [])
+        districts = parsed_query.get('districts') or []
+        n_years = self._period_years(str(parsed_query).lower())
         
-        if crops and states:
-            crop_name = crops[0].title()
-            state = states[0].title()
-            
-            # Filter crop data
-            crop_trend = crop_df[
-                (crop_df['Crop'].str.contains(crop_name, case=False, na=False)) &
-                (crop_df['State'].str.contains(state, case=False, na=False))
-            ].groupby('Year')['Production'].sum()
-            
-            # Filter rainfall data
-            rain_trend = rain_df[
-                rain_df['State'].str.contains(state, case=False, na=False)
-            ].groupby('Year')['Annual_Rainfall_mm'].mean()
+        if crops and (states or districts):
+            crop_name = crops[0]
+            if districts:
+                # Districts resolve through the crosswalk to a canonical id
+                level, region = 'district', self._resolve_district(districts[0], states, crop_name)
+                region_name = districts[0]
+            else:
+                level, region = 'state', states[0]
+                region_name = region
+            metric = METRICS[self._query_metric(parsed_query)]
+            unit, label, decimals = metric['unit'], metric['label'], metric['decimals']
+            index = self.trend_index_for(self._query_metric(parsed_query))
             
-            if crop_trend.empty or rain_trend.empty:
+            key = None if region is None else index.find(level, region, crop_name)
+            if key is None:
                 return {
-                    "answer": f"❌ No trend data found for {crop_name} in {state}",
+                    "answer": f"❌ No trend data found for {crop_name} in {region_name}",
                     "data": {},
                     "sources": []
                 }
+            current_span().set_attribute("trend_level", level)
             
-            # Calculate correlation
-            merged = pd.DataFrame({
-                'production': crop_trend,
-                'rainfall': rain_trend
-            }).dropna()
+            trend = index.lookup(level, key, n_years)
+            stats = trend['stats']
+            crop_trend = trend['series']
+            rolling = trend['rolling']
             
-            if len(merged) > 1:
-                correlation = merged['production'].corr(merged['rainfall'])
-                
-                answer = f"""
-**Trend Analysis: {crop_name} in {state}**
-
-Production Trend (Last {len(crop_trend)} years):
-{chr(10).join([f'  {year}: {prod:.0f} tonnes' for year, prod in crop_trend.items()])}
-
-Rainfall Trend (Same Period):
-{chr(10).join([f'  {year}: {rain:.0f} mm' for year, rain in rain_trend.items()])}
-
-**Correlation Analysis:**
-Correlation coefficient: {correlation:.3f}
-{self._interpret_correlation(correlation)}
-
-*Sources: Agriculture Production Data & IMD Rainfall Data (data.gov.in)*
-"""
-                
-                return {
-                    "answer": answer,
-                    "data": {
-                        "crop_trend": crop_trend.to_dict(),
-                        "rainfall_trend": rain_trend.to_dict(),
-                        "correlation": correlation
-                    },
-                    "sources": ["data.gov.in - Agriculture & IMD"]
-                }
+            rain_trend = pd.Series(dtype=float)
+            district_correlations = {}
+            facts = self.district_facts if level == 'district' else None
+            if facts is not None and 'Annual_Rainfall_mm' in facts.rain_columns:
+                # District rainfall comes pre-joined from the fact table
+                rain_trend = facts.series(key[0], key[1])['Annual_Rainfall_mm'].dropna()
+                correlations = facts.correlations()
+                if key in correlations.index:
+                    district_correlations = correlations.loc[key].dropna().to_dict()
+            else:
+                rain_matrix = index.rainfall_matrix(level)
+                if rain_matrix is not None and rain_matrix.position(key[0]) is not None:
+                    rain_trend = rain_matrix.series(key[0])
+            rain_trend = rain_trend[rain_trend.index.isin(crop_trend.index)]
+            
+            region, crop_name = key
+            if level == 'district':
+                region = self.crosswalk.name(region)
+            slope, mean = stats['slope_per_year'], stats['mean']
+            if pd.isna(slope) or abs(slope) < 0.01 * abs(mean):
+                direction = "stable"
+            else:
+                direction = "increasing" if slope > 0 else "decreasing"
+            
+            answer = Answer(f"Trend Analysis: {crop_name} in {region}").gap()
+            answer.line(f"{label} Trend ({crop_trend.index.min()}-{crop_trend.index.max()}, {len(crop_trend)} years):")
+            answer.table(f"  {{year}}: {{value:.{decimals}f}} {unit} ({index.rolling_window}-yr avg {{rolling:.{decimals}f}})",
+                         {"year": crop_trend.index.to_numpy(), "value": crop_trend.to_numpy(),
+                          "rolling": rolling.reindex(crop_trend.index).fillna(crop_trend).to_numpy()},
+                         name="crop_trend")
+            if not rain_trend.empty:
+                answer.gap().line("Rainfall Trend (Same Period):")
+                answer.table("  {year}: {rain:.0f} mm", {"year": rain_trend.index.to_numpy(),
+                                                         "rain": rain_trend.to_numpy()}, name="rainfall_trend")
+            
+            answer.gap().heading("Trend Statistics:")
+            statistics = [("Direction", f"{direction} ({slope:+,.{decimals}f} {unit} per year, least-squares)")]
+            if pd.notna(stats['cagr']):
+                statistics.append(("Compound annual growth", f"{stats['cagr']:+.2%}"))
+            if pd.notna(stats['volatility']):
+                statistics.append(("Volatility (std of yearly growth)", f"{stats['volatility']:.1%}"))
+            if pd.notna(stats['latest_zscore']):
+                flag = " ⚠️ anomalous" if abs(stats['latest_zscore']) >= 2 else ""
+                statistics.append((f"Latest year ({stats['latest_year']:.0f})",
+                                   f"{stats['latest']:,.{decimals}f} {unit}, "
+                                   f"z-score {stats['latest_zscore']:+.2f} vs period mean{flag}"))
+            answer.fields(statistics)
+            
+            correlation = stats.get('rainfall_correlation', np.nan)
+            if pd.notna(correlation):
+                answer.gap().heading("Correlation Analysis:")
+                answer.line(f"Correlation coefficient: {correlation:.3f}")
+                answer.line(self._interpret_correlation(correlation))
+            
+            answer.gap().source("Sources: Agriculture Production Data & IMD Rainfall Data (data.gov.in)")
+            
+            data = {
+                "metric": label.lower(),
+                "crop_trend": crop_trend.to_dict(),
+                "rainfall_trend": rain_trend.to_dict(),
+                "rolling_mean": rolling.to_dict(),
+                "trend_stats": {k: float(v) for k, v in stats.items() if pd.notna(v)}
+            }
+            if pd.notna(correlation):
+                data["correlation"] = float(correlation)
+            data.update({k: float(v) for k, v in district_correlations.items()})
+            
+            return {
+                "answer": answer,
+                "data": data,
+                "sources": ["data.gov.in - Agriculture & IMD"]
+            }
         
         return {
             "answer": "⚠️ Please specify crop and region.", 
@@ -572,6 +1147,68 @@ Correlation coefficient: {correlation:.3f}
             "sources": []
         }
     
+    @traced("handler.recommendation")
+    def _handle_recommendation_query(self, parsed_query: Dict) -> Dict:
+        """Recommend drought-resilient crops from the precomputed resilience index"""
+        states = self._expand_regions(parsed_query.get('states', []), str(parsed_query).lower())
+        districts = parsed_query.get('districts') or []
+        crops = list(parsed_query.get('crops', []))
+        window = self._period_years(str(parsed_query).lower()) or DEFAULT_WINDOW
+        
+        index = self.resilience_index(window)
+        if index is None:
+            return {
+                "answer": "⚠️ Drought recommendations need crop production (with area) and rainfall data.",
+                "data": {},
+                "sources": []
+            }
+        
+        district = districts[0] if districts else None
+        # Comparing named crops ("promote A over B") ranks just those
+        summary = index.summary(states, district, crops if len(crops) >= 2 else None)
+        resilient, sensitive = summary['resilient'], summary['sensitive']
+        region = district or (", ".join(states) if states else "India")
+        current_span().set_attribute("candidates", len(index.scores))
+        
+        if resilient.empty:
+            return {
+                "answer": f"❌ Not enough rainfall and yield history to score crops in {region}",
+                "data": {},
+                "sources": []
+            }
+        
+        def describe(scores):
+            # The deficit-year phrase is dropped for crops with no observed deficit years
+            return {"crop": scores.index.to_numpy(), "resilience": scores['resilience'].to_numpy(),
+                    "sensitivity": scores['sensitivity'].to_numpy(),
+                    "retention": format_values(scores['deficit_retention'].to_numpy(),
+                                               ", {:.0%} of normal yield in deficit years", na_rep="")}
+        row = "  {crop}: resilience {resilience:.2f}, yield sensitivity {sensitivity:+.2f}{retention}"
+        
+        answer = Answer()
+        answer.labelled(f"Drought-Resilient Crops in {region}", f"(last {window} years)").gap()
+        answer.heading("Most Resilient:")
+        answer.table(row, describe(resilient), name="recommendations")
+        if len(crops) < 2 and not sensitive.empty:
+            answer.gap().heading("Most Drought-Sensitive:")
+            answer.table(row, describe(sensitive), name="drought_sensitive")
+        
+        answer.gap().line(f"Resilience is the share of normal yield expected in a year with "
+                          f"{index.deficit_threshold:.0%} below-normal rainfall, from each crop's yield "
+                          f"response to rainfall anomalies (and observed deficit years where available).")
+        answer.gap().source("Sources: Agriculture Production Data & IMD Rainfall Data (data.gov.in)")
+        
+        return {
+            "answer": answer,
+            "data": {
+                "recommendations": resilient.reset_index().to_dict('records'),
+                "drought_sensitive": sensitive.reset_index().to_dict('records'),
+                "window_years": window
+            },
+            "sources": ["data.gov.in - Agriculture & IMD"]
+        }
+    
+    @traced("handler.general")
     def _handle_general_query(self, parsed_query: Dict) -> Dict:
         """Handle general queries using LLM"""
         
@@ -589,7 +1226,7 @@ Question: {parsed_query}
 Provide a data-driven answer with specific numbers and cite sources."""
 
         try:
-            response = self.model.generate_content(prompt)
+            response = self._generate(prompt, "general")
             return {
                 "answer": response.text,
                 "data": {},
@@ -615,20 +1252,106 @@ Provide a data-driven answer with specific numbers and cite sources."""
         else:
             return "⚠️ Strong negative correlation: Significant inverse relationship."
     
-    def answer_question(self, question: str) -> Dict[str, Any]:
+    # Phrases asking for a whole ranking rather than the top few
+    FULL_RANKING_KEYWORDS = ('all districts', 'every district', 'each district', 'full ranking',
+                             'complete ranking', 'rank all', 'list all')
+    
+    def _wants_full_ranking(self, parsed_query: Dict) -> bool:
+        return 'rank_all' in (parsed_query.get('operations') or [])
+    
+    def fetch_page(self, cursor_id: str, page: int = 1, page_size: Optional[int] = None) -> Dict[str, Any]:
+        """One page of a stored result (raises CursorExpiredError once evicted)"""
+        return self.results.get(cursor_id).page(page, page_size)
+    
+    def export_result(self, cursor_id: str, fmt: str = 'csv'):
+        """Iterator of file chunks for a stored result, in 'csv' or 'parquet'"""
+        cursor = self.results.get(cursor_id)
+        if fmt == 'parquet':
+            return cursor.iter_parquet()
+        return cursor.iter_csv()
+    
+    def enable_process_pool(self, workers: Optional[int] = None):
+        """Run handlers in worker processes over a memory-mapped copy of this engine
+        
+        The engine is warmed first (a catalog-backed one loads every
+        partition, since workers cannot load more later), so workers
+        restore finished data and indexes rather than each building their own.
+        """
+        from process_pool import HandlerPool
+        if self.pool is None:
+            self.warm_up()
+            self.pool = HandlerPool(self, workers)
+        return self.pool
+    
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool = None
+    
+    def _execute(self, parsed: Dict[str, Any], cancel=None) -> Dict[str, Any]:
+        """Execute in the process pool when enabled, else on this thread"""
+        if self.pool is None:
+            return self.execute_query(parsed, render=False)
+        from process_pool import PoolTimeoutError, PoolUnavailableError, TaskCancelledError, WorkerError
+        with self.tracer.span("pool.execute"):
+            try:
+                result = self.pool.run(parsed, cancel=cancel)
+                # Cursors created in the worker move into this process's store
+                cursor = result.pop('_cursor', None)
+                if cursor is not None:
+                    self.results.add(cursor)
+                return result
+            except TaskCancelledError:
+                return {"answer": "⚠️ Query cancelled.", "data": {}, "sources": []}
+            except PoolTimeoutError:
+                metrics.QUERY_ERRORS.inc()
+                return {"answer": "⚠️ Query timed out.", "data": {}, "sources": []}
+            except WorkerError as e:
+                metrics.QUERY_ERRORS.inc()
+                return {"answer": f"Error executing query: {e}", "data": {}, "sources": []}
+            except PoolUnavailableError as e:
+                # No worker could start: the data is loaded here too, so run it on this thread
+                print(f"⚠️ {e}; running the handler in-process")
+                return self.execute_query(parsed, render=False)
+    
+    @traced("answer_question")
+    def answer_question(self, question: str, cancel=None, fmt: Optional[str] = None,
+                        locale: Optional[str] = None) -> Dict[str, Any]:
         """Main entry point: parse and execute query"""
+        current_span().set_attribute("question_chars", len(question))
         print(f"\n{'='*60}")
         print(f"🔍 Processing: {question}")
         print(f"{'='*60}")
         
         # Parse query
+        start = time.perf_counter()
         parsed = self.parse_query(question)
+        parsed_at = time.perf_counter()
+        metrics.STAGE_LATENCY.observe(parsed_at - start, {"stage": "parse"})
         print(f"📋 Parsed intent: {parsed.get('intent', 'unknown')}")
         print(f"📍 States: {parsed.get('states', [])}")
         print(f"🌾 Crops: {parsed.get('crops', [])}")
         
-        # Execute query
-        result = self.execute_query(parsed)
+        # Execute query (cancel is a threading.Event set when the caller gives up)
+        result = self._execute(parsed, cancel)
+        executed = time.perf_counter()
+        metrics.STAGE_LATENCY.observe(executed - parsed_at, {"stage": "execute"})
+        
+        # Render the structured answer, then chart-ready columnar payloads
+        # so the UI never rebuilds frames from data
+        with self.tracer.span("format"):
+            render_result(result, fmt or self.answer_format, locale or self.locale)
+            attach_charts(question, result)
+        finished = time.perf_counter()
+        metrics.STAGE_LATENCY.observe(finished - executed, {"stage": "format"})
+        metrics.ANSWER_LATENCY.observe(finished - start)
+        result['timings_ms'] = {
+            'parse': round((parsed_at - start) * 1000.0, 3),
+            'execute': round((executed - parsed_at) * 1000.0, 3),
+            'format': round((finished - executed) * 1000.0, 3),
+            'total': round((finished - start) * 1000.0, 3),
+        }
+        result.setdefault('intent', parsed.get('intent'))
         
         print(f"\n✅ Query completed!")
         print(f"{'='*60}\n")
@@ -637,6 +1360,7 @@ Provide a data-driven answer with specific numbers and cite sources."""
 
 
 if __name__ == "__main__":
+    load_env()
     print("🌾 Project Samarth - Query Engine Test\n")
     
     # Check for API key
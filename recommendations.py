@@ -0,0 +1,155 @@
+"""
+Recommendations Module for Project Samarth
+Drought-resilience index per (State, District, Crop): how yield responds
+to rainfall deficits over a long climate window, scored for every series
+at once so recommendation questions are answered by ranking lookups
+"""
+
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# A year is a deficit year when rainfall falls this far below the window mean
+# (IMD calls a season "deficient" at 20% below normal)
+DEFICIT_THRESHOLD = 0.20
+DEFAULT_WINDOW = 10
+MIN_YEARS = 5
+
+
+def row_regression_slopes(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """Least-squares slope of y on x for matching rows, ignoring NaN pairs"""
+    mask = ~(np.isnan(x) | np.isnan(y))
+    n = mask.sum(axis=1)
+    x_mean = np.where(mask, x, 0.0).sum(axis=1) / np.maximum(n, 1)
+    y_mean = np.where(mask, y, 0.0).sum(axis=1) / np.maximum(n, 1)
+    dx = np.where(mask, x - x_mean[:, None], 0.0)
+    dy = np.where(mask, y - y_mean[:, None], 0.0)
+    denom = (dx * dx).sum(axis=1)
+    return np.divide((dx * dy).sum(axis=1), denom, out=np.full(len(n), np.nan), where=(denom > 0) & (n > 2))
+
+
+def _relative_anomaly(values: np.ndarray) -> np.ndarray:
+    """Each cell as a fraction above/below its row's mean"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = np.nanmean(values, axis=1, keepdims=True)
+        return np.where(mean > 0, values / mean - 1.0, np.nan)
+
+
+class ResilienceIndex:
+    """Drought-resilience scores for every (State, District, Crop) series
+
+    For each series over the last `window` years:
+    - sensitivity: slope of the yield anomaly on the rainfall anomaly
+      (0.5 means a 10% rainfall shortfall costs about 5% of yield)
+    - deficit_retention: mean yield in deficit years / mean yield otherwise
+    - resilience: expected yield retained in a 20% deficit year, from the
+      sensitivity, averaged with the observed retention where deficit
+      years exist. Higher is more drought resilient.
+    """
+
+    def __init__(self, district_table: pd.DataFrame, rain_df: pd.DataFrame,
+                 value: str = 'Yield', window: int = DEFAULT_WINDOW,
+                 deficit_threshold: float = DEFICIT_THRESHOLD):
+        self.value = value
+        self.window = window
+        self.deficit_threshold = deficit_threshold
+        self.scores = self._score(district_table, rain_df)
+
+    def _rain_matrix(self, rain_df: pd.DataFrame, index: pd.MultiIndex, years: np.ndarray) -> np.ndarray:
+        """Rainfall aligned to each series row: its district if reported, else its state"""
+        state_rain = rain_df.groupby(['State', 'Year'], observed=True)['Annual_Rainfall_mm'].mean().unstack('Year')
+        state_rain = state_rain.reindex(columns=years)
+        states = index.get_level_values('State')
+        aligned = state_rain.reindex(states).to_numpy(dtype=float)
+
+        if 'District' in rain_df.columns:
+            district_rain = rain_df.groupby(['State', 'District', 'Year'], observed=True)['Annual_Rainfall_mm'] \
+                .mean().unstack('Year').reindex(columns=years)
+            pairs = pd.MultiIndex.from_arrays([states, index.get_level_values('District')])
+            by_district = district_rain.reindex(pairs).to_numpy(dtype=float)
+            aligned = np.where(np.isnan(by_district), aligned, by_district)
+        return aligned
+
+    def _score(self, table: pd.DataFrame, rain_df: pd.DataFrame) -> pd.DataFrame:
+        keys = ['State', 'District', 'Crop']
+        wide = table.pivot_table(index=keys, columns='Year', values=self.value, observed=True).sort_index(axis=1)
+        area = table.pivot_table(index=keys, columns='Year', values='Area', observed=True).reindex_like(wide)
+        wide, area = wide.iloc[:, -self.window:], area.iloc[:, -self.window:]
+        years = wide.columns.to_numpy()
+
+        values = wide.to_numpy(dtype=float)
+        rain = self._rain_matrix(rain_df, wide.index, years)
+        rain[np.isnan(values)] = np.nan
+
+        rain_anomaly = _relative_anomaly(rain)
+        yield_anomaly = _relative_anomaly(values)
+        sensitivity = row_regression_slopes(rain_anomaly, yield_anomaly)
+
+        deficit = rain_anomaly <= -self.deficit_threshold
+        normal = rain_anomaly > -self.deficit_threshold
+        deficit_years = deficit.sum(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            deficit_mean = np.where(deficit, values, 0.0).sum(axis=1) / deficit_years
+            normal_mean = np.where(normal, values, 0.0).sum(axis=1) / normal.sum(axis=1)
+            retention = np.where((deficit_years > 0) & (normal_mean > 0), deficit_mean / normal_mean, np.nan)
+
+        expected = 1.0 - self.deficit_threshold * sensitivity
+        resilience = np.where(np.isnan(retention), expected, (expected + retention) / 2.0)
+
+        scores = pd.DataFrame({
+            'sensitivity': sensitivity,
+            'deficit_retention': retention,
+            'deficit_years': deficit_years,
+            'resilience': resilience,
+            f'mean_{self.value.lower()}': np.nanmean(values, axis=1),
+            'mean_area': np.nanmean(area.to_numpy(dtype=float), axis=1),
+            'years_observed': (~np.isnan(values)).sum(axis=1),
+        }, index=wide.index)
+        scores = scores[(scores['years_observed'] >= MIN_YEARS) & scores['resilience'].notna()]
+        return scores.reset_index()
+
+    def rank(self, states: Optional[List[str]] = None, district: Optional[str] = None,
+             crops: Optional[List[str]] = None, top_n: int = 5, ascending: bool = False) -> pd.DataFrame:
+        """Crops ranked by resilience for a district, a set of states, or India
+
+        Above district level, district scores are combined per crop,
+        weighted by each district's mean cropped area.
+        """
+        scores = self.scores
+        if district:
+            scores = scores[scores['District'].str.lower() == district.lower()]
+        elif states:
+            scores = scores[scores['State'].str.lower().isin([s.lower() for s in states])]
+        if crops:
+            scores = scores[scores['Crop'].str.lower().isin([c.lower() for c in crops])]
+        if scores.empty:
+            return scores
+
+        if district:
+            ranked = scores.set_index('Crop')
+        else:
+            weights = scores['mean_area'].fillna(0).clip(lower=1.0)
+            columns = ['resilience', 'sensitivity', 'deficit_retention']
+            weighted = scores[columns].mul(weights, axis=0)
+            weighted['Crop'] = scores['Crop']
+            weighted['_weight'] = weights
+            weighted['_retention_weight'] = weights.where(scores['deficit_retention'].notna(), 0.0)
+            weighted['deficit_retention'] = weighted['deficit_retention'].fillna(0.0)
+            sums = weighted.groupby('Crop', observed=True).sum()
+            ranked = sums[['resilience', 'sensitivity']].div(sums['_weight'], axis=0)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                ranked['deficit_retention'] = (sums['deficit_retention'] / sums['_retention_weight']) \
+                    .where(sums['_retention_weight'] > 0)
+            counts = scores.groupby('Crop', observed=True).agg(
+                districts=('District', 'size'), deficit_years=('deficit_years', 'sum'))
+            ranked = ranked.join(counts)
+        return ranked.sort_values('resilience', ascending=ascending).head(top_n)
+
+    def summary(self, states: Optional[List[str]] = None, district: Optional[str] = None,
+                crops: Optional[List[str]] = None, top_n: int = 5) -> Dict[str, pd.DataFrame]:
+        """Most resilient and most drought-sensitive crops for a region"""
+        return {
+            'resilient': self.rank(states, district, crops, top_n),
+            'sensitive': self.rank(states, district, crops, min(top_n, 3), ascending=True),
+        }
@@ -0,0 +1,144 @@
+"""
+Result Cursor Module for Project Samarth
+Keeps full tabular results (e.g. every district ranked by production) on
+the server behind a cursor id, so answers carry only the first page and
+the UI pages through or exports the rest on demand
+"""
+
+import io
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, Optional
+
+import pandas as pd
+
+from json_types import to_jsonable
+
+DEFAULT_PAGE_SIZE = 20
+# Rows per chunk when streaming an export
+EXPORT_CHUNK_ROWS = 5000
+
+
+class CursorExpiredError(KeyError):
+    """Raised when a cursor id is unknown or was evicted from the store"""
+
+
+class ResultCursor:
+    """Read-only, paged view of one result table"""
+
+    def __init__(self, cursor_id: str, frame: pd.DataFrame, title: str = "",
+                 page_size: int = DEFAULT_PAGE_SIZE):
+        self.id = cursor_id
+        self.frame = frame.reset_index(drop=True)
+        self.title = title
+        self.page_size = page_size
+        self.created = time.time()
+
+    @property
+    def total(self) -> int:
+        return len(self.frame)
+
+    def pages(self, page_size: Optional[int] = None) -> int:
+        size = page_size or self.page_size
+        return max(1, -(-self.total // size))
+
+    def describe(self) -> Dict[str, Any]:
+        """JSON-ready handle stored in the result data instead of the rows"""
+        return {'id': self.id, 'title': self.title, 'total': self.total,
+                'columns': [str(c) for c in self.frame.columns], 'page_size': self.page_size}
+
+    def page(self, number: int, page_size: Optional[int] = None) -> Dict[str, Any]:
+        """Rows of 1-based page `number` as JSON records"""
+        size = page_size or self.page_size
+        number = min(max(1, number), self.pages(size))
+        rows = self.frame.iloc[(number - 1) * size:number * size]
+        return {'cursor': self.id, 'page': number, 'pages': self.pages(size), 'page_size': size,
+                'total': self.total, 'rows': to_jsonable(rows.to_dict('records'))}
+
+    def iter_csv(self, chunk_rows: int = EXPORT_CHUNK_ROWS) -> Iterator[bytes]:
+        """CSV bytes in chunks of rows; the header comes with the first chunk"""
+        for start in range(0, max(self.total, 1), chunk_rows):
+            buffer = io.StringIO()
+            self.frame.iloc[start:start + chunk_rows].to_csv(buffer, index=False, header=start == 0)
+            yield buffer.getvalue().encode()
+
+    def iter_parquet(self, chunk_rows: int = EXPORT_CHUNK_ROWS) -> Iterator[bytes]:
+        """Parquet file bytes, written one row group per chunk (needs pyarrow)"""
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet export needs pyarrow: pip install pyarrow")
+        sink = _DrainableBuffer()
+        schema = pa.Schema.from_pandas(self.frame, preserve_index=False)
+        with pq.ParquetWriter(sink, schema) as writer:
+            for start in range(0, self.total, chunk_rows):
+                chunk = self.frame.iloc[start:start + chunk_rows]
+                writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+                yield sink.drain()
+        yield sink.drain()
+
+
+class _DrainableBuffer(io.RawIOBase):
+    """Write-only sink whose contents can be taken out as they are produced"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data, self._chunks = b''.join(self._chunks), []
+        return data
+
+
+class ResultStore:
+    """Bounded LRU of cursors shared by all sessions of one engine
+
+    Ids are random so cursors made in pool workers can be moved into the
+    parent's store without clashing.
+    """
+
+    def __init__(self, max_cursors: int = 64):
+        self.max_cursors = max_cursors
+        self._cursors: "OrderedDict[str, ResultCursor]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._cursors)
+
+    def create(self, frame: pd.DataFrame, title: str = "", page_size: int = DEFAULT_PAGE_SIZE) -> ResultCursor:
+        cursor_id = uuid.uuid4().hex[:16]
+        cursor = ResultCursor(cursor_id, frame, title, page_size)
+        self.add(cursor)
+        return cursor
+
+    def add(self, cursor: ResultCursor):
+        with self._lock:
+            self._cursors[cursor.id] = cursor
+            self._cursors.move_to_end(cursor.id)
+            while len(self._cursors) > self.max_cursors:
+                self._cursors.popitem(last=False)
+
+    def get(self, cursor_id: str) -> ResultCursor:
+        with self._lock:
+            if cursor_id not in self._cursors:
+                raise CursorExpiredError(cursor_id)
+            self._cursors.move_to_end(cursor_id)
+            return self._cursors[cursor_id]
+
+    def pop(self, cursor_id: str) -> Optional[ResultCursor]:
+        with self._lock:
+            return self._cursors.pop(cursor_id, None)
@@ -0,0 +1,353 @@
+"""
+Query Service Module for Project Samarth
+Standalone ASGI app serving QueryEngine.answer_question over HTTP with a
+bounded worker pool and request queue, so the Streamlit UI can run as a
+thin client and the backend can be scaled on its own
+
+Run with:  python service.py --port 8000
+      or:  uvicorn service:app --workers 4   (one engine per process)
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+from urllib.parse import parse_qs
+
+import metrics
+from json_types import to_jsonable
+from settings import load_env
+
+# The service is an entry point: settings kept in .env apply to the defaults below
+load_env()
+
+SERVICE_PENDING = metrics.REGISTRY.gauge("samarth_service_pending", "Questions running or queued in the service")
+SERVICE_REJECTED = metrics.REGISTRY.counter("samarth_service_rejected_total",
+                                            "Questions refused because the service queue was full")
+SERVICE_TIMEOUTS = metrics.REGISTRY.counter("samarth_service_timeouts_total",
+                                            "Questions that exceeded the service deadline")
+
+DEFAULT_WORKERS = int(os.getenv("SAMARTH_SERVICE_WORKERS", "4"))
+DEFAULT_QUEUE = int(os.getenv("SAMARTH_SERVICE_QUEUE", "32"))
+DEFAULT_DEADLINE = float(os.getenv("SAMARTH_SERVICE_DEADLINE", "120"))
+MAX_BODY_BYTES = 64 * 1024
+
+
+class QueueFullError(RuntimeError):
+    """Raised when every worker is busy and the wait queue is full"""
+
+
+class QueryService:
+    """Runs answer_question on a bounded thread pool
+
+    At most `workers` questions execute at once and at most `queue_size`
+    more wait for a worker; beyond that requests are refused at once so
+    clients back off instead of piling up behind a slow backend. The
+    workers share one engine, which loads partitions and builds its lazy
+    indexes under its own lock.
+    """
+
+    def __init__(self, engine, workers: int = DEFAULT_WORKERS, queue_size: int = DEFAULT_QUEUE,
+                 deadline: float = DEFAULT_DEADLINE):
+        self.engine = engine
+        self.workers = workers
+        self.queue_size = queue_size
+        self.deadline = deadline
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="samarth-query")
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def _track(self, delta: int):
+        with self._lock:
+            self._pending += delta
+            SERVICE_PENDING.set(self._pending)
+
+    def _run(self, question: str, cancel: threading.Event, options: Dict) -> Dict:
+        # The slot is released when the work finishes, not when the caller
+        # gives up, so timed-out questions still count against capacity
+        try:
+            if getattr(self.engine, 'pool', None) is not None:
+                options = dict(options, cancel=cancel)
+            return self.engine.answer_question(question, **options)
+        finally:
+            self._track(-1)
+            self._slots.release()
+
+    async def answer(self, question: str, **options) -> Dict:
+        """Answer on the pool; options (fmt, locale) are passed to answer_question"""
+        if not self._slots.acquire(blocking=False):
+            SERVICE_REJECTED.inc()
+            raise QueueFullError(f"{self.workers} workers busy and {self.queue_size} questions queued")
+        self._track(1)
+        loop = asyncio.get_running_loop()
+        cancel = threading.Event()
+        future = loop.run_in_executor(self._executor, self._run, question, cancel, options)
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout=self.deadline)
+        except asyncio.TimeoutError:
+            SERVICE_TIMEOUTS.inc()
+            raise
+        finally:
+            # With a process pool, a timed-out or disconnected question stops its handler
+            if not future.done():
+                cancel.set()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+        if hasattr(self.engine, 'close'):
+            self.engine.close()
+
+
+def engine_from_env():
+    """QueryEngine over the dataset catalog, keyed by GEMINI_API_KEY
+
+    With SAMARTH_SNAPSHOT_DIR set, a replica restores the prepared engine
+    from a snapshot of the same data instead of rebuilding it.
+    """
+    from data_collector import DataCollector
+    from dataset_catalog import DatasetCatalog
+    from engine_snapshot import warm_start
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        raise RuntimeError("GEMINI_API_KEY is not set")
+    engine = warm_start(api_key, DatasetCatalog(DataCollector()))
+    pool_workers = os.getenv("SAMARTH_POOL_WORKERS")
+    if pool_workers:
+        engine.enable_process_pool(int(pool_workers))
+    return engine
+
+
+class ServiceApp:
+    """ASGI application: POST /answer, GET /stats, /healthz, /metrics and /results/<cursor>
+
+    The engine is built on lifespan startup (or the first request), so
+    importing this module stays cheap.
+    """
+
+    def __init__(self, engine_factory: Callable = engine_from_env, workers: int = DEFAULT_WORKERS,
+                 queue_size: int = DEFAULT_QUEUE, deadline: float = DEFAULT_DEADLINE):
+        self.engine_factory = engine_factory
+        self.workers = workers
+        self.queue_size = queue_size
+        self.deadline = deadline
+        self.service: Optional[QueryService] = None
+        self._startup_lock = threading.Lock()
+
+    def _ensure_service(self) -> QueryService:
+        with self._startup_lock:
+            if self.service is None:
+                engine = self.engine_factory()
+                self.service = QueryService(engine, self.workers, self.queue_size, self.deadline)
+                print(f"✅ Query service ready ({self.workers} workers, queue {self.queue_size})")
+        return self.service
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self._http(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                try:
+                    await asyncio.get_running_loop().run_in_executor(None, self._ensure_service)
+                    await send({'type': 'lifespan.startup.complete'})
+                except Exception as e:
+                    await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+            elif message['type'] == 'lifespan.shutdown':
+                if self.service is not None:
+                    self.service.shutdown()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _http(self, scope, receive, send):
+        method, path = scope['method'], scope['path'].rstrip('/') or '/'
+        try:
+            if path == '/healthz' and method == 'GET':
+                service = self.service
+                health = {
+                    "status": "ok" if service else "starting",
+                    "workers": self.workers,
+                    "pending": service.pending if service else 0,
+                }
+                subresults = getattr(service.engine, 'subresults', None) if service else None
+                if subresults is not None:
+                    health["subresult_cache"] = subresults.stats()
+                await _send_json(send, 200, health)
+            elif path == '/metrics' and method == 'GET':
+                await _send(send, 200, metrics.REGISTRY.render_prometheus().encode(),
+                            "text/plain; version=0.0.4; charset=utf-8")
+            elif path == '/stats' and method == 'GET':
+                service = await asyncio.get_running_loop().run_in_executor(None, self._ensure_service)
+                await _send_json(send, 200, _dataset_stats(service.engine))
+            elif path == '/answer' and method == 'POST':
+                await self._answer(receive, send)
+            elif path.startswith('/results/') and method == 'GET':
+                await self._results(scope, path, send)
+            elif path in ('/healthz', '/metrics', '/stats', '/answer'):
+                await _send_json(send, 405, {"error": f"{method} not allowed on {path}"})
+            else:
+                await _send_json(send, 404, {"error": f"No route for {path}"})
+        except Exception as e:
+            print(f"❌ Service error on {method} {path}: {e}")
+            await _send_json(send, 500, {"error": str(e)})
+
+    async def _answer(self, receive, send):
+        body = await _read_body(receive)
+        if body is None:
+            await _send_json(send, 413, {"error": f"Request body over {MAX_BODY_BYTES} bytes"})
+            return
+        try:
+            request = json.loads(body or b'{}')
+            question = request.get('question', '').strip()
+        except (ValueError, AttributeError):
+            request, question = {}, ''
+        if not question:
+            await _send_json(send, 400, {"error": 'Expected JSON body {"question": "..."}'})
+            return
+        # Optional answer rendering: "format" (markdown, text, json) and "locale" (en, en-IN)
+        from answer_templates import FORMATS, LOCALES
+        options = {}
+        if request.get('format'):
+            if request['format'] not in FORMATS:
+                await _send_json(send, 400, {"error": f"format must be one of {', '.join(FORMATS)}"})
+                return
+            options['fmt'] = request['format']
+        if request.get('locale'):
+            if request['locale'] not in LOCALES:
+                await _send_json(send, 400, {"error": f"locale must be one of {', '.join(LOCALES)}"})
+                return
+            options['locale'] = request['locale']
+
+        service = await asyncio.get_running_loop().run_in_executor(None, self._ensure_service)
+        try:
+            result = await service.answer(question, **options)
+        except QueueFullError as e:
+            await _send_json(send, 503, {"error": str(e)}, headers=[(b'retry-after', b'1')])
+            return
+        except asyncio.TimeoutError:
+            await _send_json(send, 504, {"error": f"Question exceeded the {service.deadline:.0f}s deadline"})
+            return
+        await _send_json(send, 200, result)
+
+
+    async def _results(self, scope, path, send):
+        """GET /results/<id>?page=&size= for one page, /results/<id>/export?format=csv|parquet streamed"""
+        from result_cursor import CursorExpiredError
+        parts = path.split('/')[2:]
+        query = {k: v[-1] for k, v in parse_qs(scope.get('query_string', b'').decode()).items()}
+        service = await asyncio.get_running_loop().run_in_executor(None, self._ensure_service)
+        loop = asyncio.get_running_loop()
+        try:
+            if len(parts) == 1:
+                page = await loop.run_in_executor(None, service.engine.fetch_page, parts[0],
+                                                  int(query.get('page', 1)), int(query.get('size', 0)) or None)
+                await _send_json(send, 200, page)
+            elif len(parts) == 2 and parts[1] == 'export':
+                fmt = query.get('format', 'csv')
+                if fmt not in EXPORT_TYPES:
+                    await _send_json(send, 400, {"error": f"Unknown export format {fmt}"})
+                    return
+                chunks = service.engine.export_result(parts[0], fmt)
+                await _stream(send, chunks, EXPORT_TYPES[fmt], f"{parts[0]}.{fmt}")
+            else:
+                await _send_json(send, 404, {"error": f"No route for {path}"})
+        except CursorExpiredError:
+            await _send_json(send, 410, {"error": "Result expired; ask the question again"})
+        except ValueError as e:
+            await _send_json(send, 400, {"error": str(e)})
+
+
+EXPORT_TYPES = {'csv': 'text/csv; charset=utf-8', 'parquet': 'application/vnd.apache.parquet'}
+
+
+def _dataset_stats(engine) -> Dict:
+    """Sidebar statistics from catalog metadata, or computed from in-memory frames"""
+    catalog = getattr(engine, 'catalog', None)
+    if catalog is not None:
+        return {name: {k: v for k, v in catalog.stats(name).items() if k not in ('values', 'district_pairs')}
+                for name in catalog.names()}
+    stats = {}
+    for name, df in engine.data.items():
+        stats[name] = {
+            'rows': len(df),
+            'columns': df.columns.tolist(),
+            'distinct': {col: int(df[col].nunique()) for col in ('State', 'District', 'Crop') if col in df.columns},
+        }
+        if 'Year' in df.columns and len(df):
+            stats[name]['years'] = [int(df['Year'].min()), int(df['Year'].max())]
+    return stats
+
+
+async def _read_body(receive) -> Optional[bytes]:
+    chunks, size = [], 0
+    while True:
+        message = await receive()
+        chunk = message.get('body', b'')
+        size += len(chunk)
+        if size > MAX_BODY_BYTES:
+            return None
+        chunks.append(chunk)
+        if not message.get('more_body'):
+            return b''.join(chunks)
+
+
+async def _send(send, status: int, payload: bytes, content_type: str, headers=None):
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', content_type.encode()),
+                    (b'content-length', str(len(payload)).encode())] + (headers or []),
+    })
+    await send({'type': 'http.response.body', 'body': payload})
+
+
+async def _stream(send, chunks, content_type: str, filename: str):
+    """Chunked response body, producing each chunk off the event loop"""
+    loop = asyncio.get_running_loop()
+    first = await loop.run_in_executor(None, next, chunks, None)
+    await send({
+        'type': 'http.response.start',
+        'status': 200,
+        'headers': [(b'content-type', content_type.encode()),
+                    (b'content-disposition', f'attachment; filename="{filename}"'.encode())],
+    })
+    chunk = first
+    while chunk is not None:
+        await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+        chunk = await loop.run_in_executor(None, next, chunks, None)
+    await send({'type': 'http.response.body', 'body': b''})
+
+
+async def _send_json(send, status: int, body: Any, headers=None):
+    payload = json.dumps(to_jsonable(body)).encode()
+    await _send(send, status, payload, 'application/json', headers)
+
+
+app = ServiceApp()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the Project Samarth query service")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="questions answered concurrently")
+    parser.add_argument("--queue", type=int, default=DEFAULT_QUEUE, help="questions allowed to wait")
+    args = parser.parse_args()
+
+    try:
+        import uvicorn
+    except ImportError:
+        raise SystemExit("❌ The query service needs an ASGI server: pip install uvicorn")
+
+    uvicorn.run(ServiceApp(workers=args.workers, queue_size=args.queue), host=args.host, port=args.port)
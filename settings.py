@@ -0,0 +1,32 @@
+"""
+Settings Module for Project Samarth
+Reads .env into the environment once, on first use, and environment
+settings through it. Has no dependencies, so entry points can load .env
+before anything else reads a setting, and library modules can read
+theirs when they are first needed rather than at import
+"""
+
+import os
+import threading
+from typing import Optional
+
+_env_loaded = False
+_env_lock = threading.Lock()
+
+
+def load_env():
+    """Read .env into the environment (existing variables win); later calls do nothing"""
+    global _env_loaded
+    if _env_loaded:
+        return
+    with _env_lock:
+        if not _env_loaded:
+            from dotenv import load_dotenv
+            load_dotenv()
+            _env_loaded = True
+
+
+def env(name: str, default: Optional[str] = None) -> Optional[str]:
+    """os.getenv after .env has been read"""
+    load_env()
+    return os.getenv(name, default)
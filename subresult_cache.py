@@ -0,0 +1,162 @@
+"""
+Subresult Cache Module for Project Samarth
+Caches filtered slices of the datasets (and aggregates over them) keyed on
+canonical filter predicates. A narrower filter is derived from the
+smallest cached slice whose predicates it contains, so "wheat in Punjab"
+followed by "wheat in Punjab in Rabi 2020" scans the full frame only once
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, FrozenSet, Iterable, Tuple
+
+import numpy as np
+import pandas as pd
+
+import metrics
+
+SUBRESULT_LOOKUPS = metrics.REGISTRY.counter("samarth_subresult_lookups_total",
+                                             "Filtered-slice cache lookups, by outcome (hit/derived/miss)")
+SUBRESULT_BYTES = metrics.REGISTRY.gauge("samarth_subresult_bytes", "Memory held by cached filtered slices")
+
+DEFAULT_MAX_BYTES = int(float(os.getenv("SAMARTH_SUBRESULT_MB", "256")) * 1024 * 1024)
+
+# One condition: (column, operator, normalized value)
+Predicate = Tuple[str, str, object]
+
+
+def predicate(column: str, op: str, value) -> Predicate:
+    """Canonical predicate; ops are 'contains' (case-insensitive substring), 'eq' and 'isin'"""
+    if op == 'contains':
+        value = str(value).lower()
+    elif op == 'isin':
+        value = tuple(sorted(value, key=str))
+    elif op != 'eq':
+        raise ValueError(f"Unknown filter operator {op!r}")
+    return (column, op, value)
+
+
+def apply_predicates(df: pd.DataFrame, predicates: Iterable[Predicate]) -> pd.DataFrame:
+    """Rows of df matching every predicate"""
+    mask = np.ones(len(df), dtype=bool)
+    for column, op, value in predicates:
+        series = df[column]
+        if op == 'contains':
+            # Match on distinct values, then broadcast, instead of scanning every string
+            uniques = pd.Series(series.dropna().unique())
+            matched = uniques[uniques.astype(str).str.lower().str.contains(value, regex=False)]
+            mask &= series.isin(matched).to_numpy()
+        elif op == 'eq':
+            mask &= (series == value).to_numpy()
+        else:
+            mask &= series.isin(value).to_numpy()
+    return df[mask]
+
+
+class SubresultCache:
+    """Memory-bounded LRU of filtered slices and aggregates over them
+
+    Entries are keyed by (dataset, frozenset of predicates); a lookup
+    that misses reuses the smallest cached slice whose predicates are a
+    subset of the request and applies only the remaining ones. Slices
+    are shared, not copied, so callers must not modify them in place.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        # Values are (DataFrame or Series, bytes)
+        self._entries: "OrderedDict[Tuple, Tuple[object, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.counts = {'hit': 0, 'derived': 0, 'miss': 0}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _record(self, outcome: str):
+        self.counts[outcome] += 1
+        SUBRESULT_LOOKUPS.inc(labels={"outcome": outcome})
+
+    def _get(self, key: Tuple):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def _put(self, key: Tuple, frame):
+        size = int(np.sum(frame.memory_usage(index=True, deep=True)))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (frame, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+            SUBRESULT_BYTES.set(self._bytes)
+
+    def _widest_base(self, dataset: str, wanted: FrozenSet[Predicate]):
+        """Smallest cached slice of `dataset` whose predicates are all in `wanted`"""
+        best = None
+        with self._lock:
+            for (name, kind, predicates), (frame, _) in self._entries.items():
+                if name == dataset and kind == 'slice' and predicates < wanted:
+                    if best is None or len(frame) < len(best[1]):
+                        best = (predicates, frame)
+        return best
+
+    def slice(self, dataset: str, df: pd.DataFrame, predicates: Iterable[Predicate]) -> pd.DataFrame:
+        """Rows of `df` (the full `dataset` frame) matching all predicates"""
+        wanted = frozenset(predicates)
+        key = (dataset, 'slice', wanted)
+        cached = self._get(key)
+        if cached is not None:
+            self._record('hit')
+            return cached
+
+        base = self._widest_base(dataset, wanted)
+        if base is not None:
+            self._record('derived')
+            result = apply_predicates(base[1], wanted - base[0])
+        else:
+            self._record('miss')
+            result = apply_predicates(df, wanted)
+        self._put(key, result)
+        return result
+
+    def aggregate(self, dataset: str, df: pd.DataFrame, predicates: Iterable[Predicate], name: str,
+                  build: Callable[[pd.DataFrame], pd.DataFrame]) -> pd.DataFrame:
+        """build(slice) over the cached slice, itself cached under `name`
+
+        Callers sharing a name must build the same thing from a slice.
+        """
+        wanted = frozenset(predicates)
+        key = (dataset, ('agg', name), wanted)
+        cached = self._get(key)
+        if cached is not None:
+            self._record('hit')
+            return cached
+        result = build(self.slice(dataset, df, wanted))
+        self._put(key, result)
+        return result
+
+    def clear(self):
+        """Drop everything (the datasets changed)"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            SUBRESULT_BYTES.set(0)
+
+    def stats(self) -> Dict[str, float]:
+        lookups = sum(self.counts.values())
+        return {
+            **self.counts,
+            'hit_rate': (self.counts['hit'] + self.counts['derived']) / lookups if lookups else 0.0,
+            'entries': len(self._entries),
+            'bytes': self._bytes,
+        }
@@ -0,0 +1,101 @@
+"""
+Answer Template Tests for Project Samarth
+Row templates over column arrays, and the same answer rendered as
+Markdown, plain text and JSON in the en and en-IN locales
+
+Run with:  python -m pytest test_answer_templates.py
+"""
+
+import json
+import pickle
+
+import numpy as np
+import pytest
+
+from answer_templates import Answer, compile_template, localize, render_result
+
+
+def district_answer() -> Answer:
+    return (Answer("Wheat Production in Punjab")
+            .labelled("Period:", "1995-2004")
+            .fields([("District", "Ludhiana"), ("Production", "12,345,678 tonnes")])
+            .table("  {District}: {Production:,.0f} tonnes ({Years:.0f} yr)",
+                   {'District': ['Ludhiana', 'Sangrur'], 'Production': [1234567.4, np.nan],
+                    'Years': [3, 2]}, na_rep='')
+            .note("Ranked districts")
+            .source("Sources: data.gov.in"))
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("1,234", "1,234"),
+    ("12,345", "12,345"),
+    ("123,456", "1,23,456"),
+    ("12,345,678 tonnes", "1,23,45,678 tonnes"),
+    ("1,234,567,890.5", "1,23,45,67,890.5"),
+    ("1995-2004, 0.943", "1995-2004, 0.943"),
+])
+def test_indian_grouping(value, expected):
+    assert localize(value, 'en-IN') == expected
+    assert localize(value, 'en') == value
+
+
+def test_row_template_formats_columns():
+    template = compile_template("{District}: {Yield:.2f} t/ha ({Year})")
+    assert template.fields == ['District', 'Yield', 'Year']
+    assert template.render({'District': ['A', 'B'], 'Yield': [1.234, None], 'Year': [2001, 2002]}) == \
+        ["A: 1.23 t/ha (2001)", "B: n/a t/ha (2002)"]
+    assert compile_template("{District}: {Yield:.2f} t/ha ({Year})") is template
+
+
+def test_markdown_en():
+    assert district_answer().render() == "\n".join([
+        "**Wheat Production in Punjab**",
+        "**Period:** 1995-2004",
+        "- District: Ludhiana",
+        "- Production: 12,345,678 tonnes",
+        "  Ludhiana: 1,234,567 tonnes (3 yr)",
+        "  Sangrur:  tonnes (2 yr)",
+        "_Ranked districts_",
+        "*Sources: data.gov.in*",
+    ])
+
+
+def test_text_en_in():
+    assert district_answer().render('text', 'en-IN') == "\n".join([
+        "Wheat Production in Punjab",
+        "Period: 1995-2004",
+        "- District: Ludhiana",
+        "- Production: 1,23,45,678 tonnes",
+        "  Ludhiana: 12,34,567 tonnes (3 yr)",
+        "  Sangrur:  tonnes (2 yr)",
+        "Ranked districts",
+        "Sources: data.gov.in",
+    ])
+
+
+def test_json_keeps_columns_and_localized_rows():
+    document = json.loads(district_answer().render('json', 'en-IN'))
+    assert document['locale'] == 'en-IN'
+    table = next(block for block in document['blocks'] if block['type'] == 'table')
+    assert table['rows'] == ["  Ludhiana: 12,34,567 tonnes (3 yr)", "  Sangrur:  tonnes (2 yr)"]
+    assert table['columns']['District'] == ['Ludhiana', 'Sangrur']
+    assert table['columns']['Production'][1] is None
+
+
+def test_unknown_format_is_rejected():
+    with pytest.raises(ValueError):
+        district_answer().render('html')
+
+
+def test_renderings_are_not_pickled():
+    answer = district_answer()
+    answer.render()
+    restored = pickle.loads(pickle.dumps(answer))
+    assert restored._rendered == {}
+    assert restored.render() == answer.render()
+
+
+def test_render_result_keeps_structure():
+    result = render_result({'answer': district_answer(), 'data': {}}, fmt='text', locale='en-IN')
+    assert result['answer'].startswith("Wheat Production in Punjab\nPeriod:")
+    assert "1,23,45,678" in result['answer']
@@ -0,0 +1,76 @@
+"""
+Concurrency Tests for Project Samarth
+Cold-start questions sent at once through the query service and the batch
+CLI must load each catalog partition exactly once
+
+Run with:  python -m pytest test_concurrency.py
+"""
+
+import asyncio
+import contextlib
+import io
+
+import pytest
+
+from cli import run_batch
+from data_collector import DataCollector
+from data_generator import SyntheticDataGenerator
+from dataset_catalog import DatasetCatalog
+from query_engine import QueryEngine
+from service import QueryService
+
+QUESTIONS = [
+    "Which district has highest wheat production in Punjab?",
+    "Which district has highest rice production in Punjab?",
+    "Compare rainfall in Punjab and Haryana over last 5 years",
+    "Analyze wheat production trend in Haryana",
+    "Which crops are recommended for drought in Punjab?",
+] * 4
+
+
+@pytest.fixture
+def catalog_engine(tmp_path):
+    """(offline engine over a fresh catalog, the crop table it was written from)"""
+    generator = SyntheticDataGenerator(seed=7, n_crops=10, n_years=12)
+    crops = generator.crop_production_table()
+    crops.to_csv(tmp_path / "crop_production.csv", index=False)
+    generator.rainfall_table().to_csv(tmp_path / "rainfall.csv", index=False)
+    with contextlib.redirect_stdout(io.StringIO()):
+        engine = QueryEngine(None, DatasetCatalog(DataCollector(str(tmp_path))), offline=True)
+    return engine, crops
+
+
+def assert_loaded_once(engine, crops):
+    loaded = engine.data['crop_production']
+    expected = crops['State'].value_counts()
+    counts = loaded['State'].value_counts()
+    for state in counts.index:
+        assert counts[state] == expected[state], f"{state}: {counts[state]} rows, expected {expected[state]}"
+    assert len(loaded) == sum(expected[state] for state in counts.index)
+
+
+def test_service_cold_start(catalog_engine):
+    engine, crops = catalog_engine
+    service = QueryService(engine, workers=4, queue_size=len(QUESTIONS))
+
+    async def ask_all():
+        return await asyncio.gather(*(service.answer(q) for q in QUESTIONS))
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = asyncio.run(ask_all())
+    service.shutdown()
+
+    assert not any(str(r['answer']).startswith("Error") for r in results)
+    assert_loaded_once(engine, crops)
+    assert {'Punjab', 'Haryana'} <= set(engine.data['crop_production']['State'])
+
+
+def test_batch_cold_start(catalog_engine):
+    engine, crops = catalog_engine
+    # Distinct wording so every line reaches the engine rather than the duplicate check
+    questions = [(i, f"{q} (#{i})") for i, q in enumerate(QUESTIONS)]
+    with contextlib.redirect_stdout(io.StringIO()):
+        summary = run_batch(engine, questions, io.StringIO(), workers=4)
+
+    assert summary['engine'] == len(QUESTIONS)
+    assert_loaded_once(engine, crops)
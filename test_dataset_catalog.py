@@ -0,0 +1,46 @@
+"""
+Dataset Catalog Tests for Project Samarth
+State partitions are matched on resolved names, so a question loads the
+partitions of the states it names and no others
+
+Run with:  python -m pytest test_dataset_catalog.py
+"""
+
+import contextlib
+import io
+
+import pytest
+
+from data_collector import DataCollector
+from data_generator import SyntheticDataGenerator
+from dataset_catalog import DatasetCatalog
+from query_engine import QueryEngine
+
+
+@pytest.fixture(scope="module")
+def catalog(tmp_path_factory):
+    cache_dir = tmp_path_factory.mktemp("catalog")
+    generator = SyntheticDataGenerator(seed=11, n_crops=8, n_years=8)
+    generator.crop_production_table().to_csv(cache_dir / "crop_production.csv", index=False)
+    generator.rainfall_table().to_csv(cache_dir / "rainfall.csv", index=False)
+    with contextlib.redirect_stdout(io.StringIO()):
+        return DatasetCatalog(DataCollector(str(cache_dir)))
+
+
+def states_of(partitions):
+    return {state for _, state in partitions}
+
+
+def test_partitions_match_whole_names(catalog):
+    assert states_of(catalog.partitions_for(['Uttar Pradesh'])) == {'Uttar Pradesh'}
+    assert states_of(catalog.partitions_for(['uttar  pradesh', 'PUNJAB'])) == {'Uttar Pradesh', 'Punjab'}
+    # A fragment of several state names is not a state
+    assert catalog.partitions_for(['Pradesh']) == set()
+
+
+def test_engine_loads_the_resolved_state_only(catalog):
+    with contextlib.redirect_stdout(io.StringIO()):
+        engine = QueryEngine(None, catalog, offline=True)
+        engine.execute_query({'intent': 'identify_district', 'states': ['UP'], 'crops': ['Wheat'],
+                              'metrics': ['production']})
+    assert states_of(engine._loaded_partitions) == {'Uttar Pradesh'}
@@ -0,0 +1,86 @@
+"""
+Entity Resolver Tests for Project Samarth
+Exact, alias, word and trigram/edit-distance lookups of parsed names, and
+scanning question text for the names the rule parser needs
+
+Run with:  python -m pytest test_entity_resolver.py
+"""
+
+import pytest
+
+from entity_resolver import EntityResolver, _trigrams, edit_distance, entity_key
+
+STATES = ['Punjab', 'Haryana', 'Uttar Pradesh', 'Madhya Pradesh', 'Tamil Nadu', 'West Bengal',
+          'Jammu And Kashmir', 'Odisha', 'Kerala']
+CROPS = ['Rice', 'Wheat', 'Moth', 'Gram', 'Horse-Gram', 'Small Millets', 'Dry Chillies',
+         'Rapeseed & Mustard', 'Soyabean', 'Cotton']
+
+
+@pytest.fixture(scope="module")
+def resolver():
+    return EntityResolver([('State', STATES), ('Crop', CROPS), ('Season', ['Kharif     ', 'Kharif', 'Rabi'])])
+
+
+def test_edit_distance():
+    assert edit_distance('punjab', 'punjab', 2) == 0
+    assert edit_distance('panjab', 'punjab', 2) == 1
+    assert edit_distance('hariyana', 'haryana', 2) == 1
+    assert edit_distance('kerala', 'karnataka', 2) == 3
+    # Stops early once the limit is exceeded
+    assert edit_distance('a', 'abcdef', 2) == 3
+
+
+def test_trigrams_are_padded():
+    assert _trigrams('rice') == {'  r', ' ri', 'ric', 'ice', 'ce '}
+    assert entity_key('Tamil  Nadu') == entity_key('tamilnadu') == 'tamilnadu'
+
+
+@pytest.mark.parametrize("name, expected", [
+    ("PUNJAB", "Punjab"),
+    ("tamilnadu", "Tamil Nadu"),
+    ("UP", "Uttar Pradesh"),
+    ("orissa", "Odisha"),
+    ("bengal", "West Bengal"),
+    ("Panjab", "Punjab"),
+    ("Hariyana", "Haryana"),
+    ("Jammu & Kashmir", "Jammu And Kashmir"),
+])
+def test_resolve_state(resolver, name, expected):
+    assert resolver.resolve('State', name) == expected
+
+
+@pytest.mark.parametrize("name, expected", [
+    ("paddy", "Rice"),
+    ("soybean", "Soyabean"),
+    ("mustard", "Rapeseed & Mustard"),
+    ("wheet", "Wheat"),
+    ("gram", "Gram"),
+])
+def test_resolve_crop(resolver, name, expected):
+    assert resolver.resolve('Crop', name) == expected
+
+
+def test_unknown_and_short_names_do_not_resolve(resolver):
+    assert resolver.resolve('State', 'Atlantis') is None
+    # Below MIN_FUZZY_LENGTH only exact or alias matches count
+    assert resolver.resolve('Crop', 'ric') is None
+    assert resolver.resolve('District', 'Ludhiana') is None
+
+
+def test_variants_cover_every_spelling(resolver):
+    assert set(resolver.variants('Season', 'kharif')) == {'Kharif     ', 'Kharif'}
+    assert resolver.variants('Crop', 'Gram') == ('Gram',)
+    assert resolver.variants('State', 'Atlantis') == ('Atlantis',)
+
+
+@pytest.mark.parametrize("question, states, crops", [
+    ("Which district has highest wheat production in Panjab?", ['Punjab'], ['Wheat']),
+    ("Compare rainfall in UP and Tamilnadu", ['Uttar Pradesh', 'Tamil Nadu'], []),
+    ("Rapeseed and mustard production in West Bengal and Orissa", ['West Bengal', 'Odisha'], ['Rapeseed & Mustard']),
+    ("What is the price of paddy in J&K", ['Jammu And Kashmir'], ['Rice']),
+    ("Sum up the most grown crops and small totals in Kerala", ['Kerala'], []),
+    ("Horse gram and gram in MP", ['Madhya Pradesh'], ['Horse-Gram', 'Gram']),
+])
+def test_mentions(resolver, question, states, crops):
+    assert resolver.mentions('State', question) == states
+    assert resolver.mentions('Crop', question) == crops
@@ -0,0 +1,158 @@
+"""
+LLM Client Tests for Project Samarth
+Circuit breaker state machine and client-side rate limiting, with a fake
+model so no API key or network is needed
+
+Run with:  python -m pytest test_llm_client.py
+"""
+
+import threading
+import time
+
+import pytest
+
+from llm_client import (CircuitBreaker, CircuitOpenError, LLMClient, LLMTimeoutError, RateLimiter,
+                        RateLimitedError)
+
+
+class FakeModel:
+    model_name = "fake-model"
+
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.calls = 0
+
+    def generate_content(self, prompt):
+        self.calls += 1
+        if self.fail:
+            raise ConnectionError("API unavailable")
+        return f"response to {prompt}"
+
+
+class HangingModel(FakeModel):
+    """First call blocks until released; later calls answer at once"""
+
+    def __init__(self):
+        super().__init__()
+        self.released = threading.Event()
+
+    def generate_content(self, prompt):
+        self.calls += 1
+        if self.calls == 1:
+            self.released.wait(5)
+        return f"response to {prompt}"
+
+
+def half_open_breaker() -> CircuitBreaker:
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.0)
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    return breaker
+
+
+def exhausted_limiter() -> RateLimiter:
+    limiter = RateLimiter(requests_per_minute=1)
+    assert limiter.acquire(1, timeout=0.0)
+    return limiter
+
+
+def test_breaker_opens_after_threshold():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60.0)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+
+def test_half_open_admits_one_trial():
+    breaker = half_open_breaker()
+    assert breaker.allow() == CircuitBreaker.TRIAL
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow() and breaker.allow()
+
+
+def test_failed_trial_reopens():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60.0)
+    breaker.record_failure()
+    breaker.opened_at -= 60.0
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+
+def test_rate_limited_trial_is_released():
+    """half-open -> rate-limited trial -> the next call is still let through"""
+    breaker = half_open_breaker()
+    model = FakeModel()
+    client = LLMClient(model, timeout=0.2, breaker=breaker, limiter=exhausted_limiter())
+
+    with pytest.raises(RateLimitedError):
+        client.generate("first")
+    assert model.calls == 0
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+    client.limiter = RateLimiter()
+    assert client.generate("second") == "response to second"
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_rate_limited_call_keeps_anothers_trial():
+    breaker = half_open_breaker()
+    assert breaker.allow() == CircuitBreaker.TRIAL
+    # A call let through while closed is throttled after the circuit went half-open
+    client = LLMClient(FakeModel(), timeout=0.2, breaker=breaker, limiter=exhausted_limiter())
+    with pytest.raises(RateLimitedError):
+        client.submit("late", permit=True).result(timeout=1.0)
+    assert not breaker.allow()
+
+
+def test_trial_does_not_join_a_hung_request():
+    """hung leader -> circuit opens -> the trial makes its own call and closes it"""
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.0)
+    model = HangingModel()
+    client = LLMClient(model, timeout=0.2, breaker=breaker, limiter=RateLimiter())
+    try:
+        with pytest.raises(LLMTimeoutError):
+            client.generate("same prompt")
+        assert breaker.state == CircuitBreaker.OPEN
+
+        assert client.generate("same prompt") == "response to same prompt"
+        assert model.calls == 2
+        assert breaker.state == CircuitBreaker.CLOSED
+        assert client.available()
+    finally:
+        model.released.set()
+
+
+def test_open_circuit_skips_the_model():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60.0)
+    model = FakeModel(fail=True)
+    client = LLMClient(model, timeout=1.0, breaker=breaker, limiter=RateLimiter())
+    with pytest.raises(ConnectionError):
+        client.generate("boom")
+    with pytest.raises(CircuitOpenError):
+        client.generate("boom again")
+    assert model.calls == 1
+
+
+def test_limiter_waits_for_refill():
+    limiter = RateLimiter(requests_per_minute=600)
+    for _ in range(600):
+        assert limiter.acquire(1, timeout=0.0)
+    assert not limiter.acquire(1, timeout=0.0)
+    start = time.monotonic()
+    assert limiter.acquire(1, timeout=1.0)
+    # One request refills every 0.1 s at 600 per minute
+    assert time.monotonic() - start < 0.5
+
+
+def test_limiter_counts_tokens():
+    limiter = RateLimiter(requests_per_minute=1000, tokens_per_minute=100)
+    assert limiter.acquire(80, timeout=0.0)
+    assert not limiter.acquire(80, timeout=0.0)
+    assert limiter.acquire(10, timeout=0.0)
@@ -0,0 +1,183 @@
+"""
+Process Pool Tests for Project Samarth
+Shared columns are memory-mapped rather than copied, workers restore the
+prepared engine without cleaning or deriving anything again, and a pool
+whose workers cannot start or do not answer in time does not leave the
+question waiting
+
+Run with:  python -m pytest test_process_pool.py
+"""
+
+import contextlib
+import io
+import mmap
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import engine_snapshot
+import process_pool
+from data_generator import SyntheticDataGenerator
+from district_index import clean_district_names
+from process_pool import HandlerPool, PoolTimeoutError, PoolUnavailableError, export_shared, open_shared
+from query_engine import QueryEngine
+
+PARSED = {'intent': 'identify_district', 'states': ['Punjab'], 'crops': ['Wheat'], 'metrics': ['production']}
+
+
+@pytest.fixture(scope="module")
+def data():
+    generator = SyntheticDataGenerator(seed=3, n_crops=6, n_years=6)
+    return {'crop_production': generator.crop_production_table(), 'rainfall': generator.rainfall_table()}
+
+
+def is_mapped(array) -> bool:
+    while array is not None:
+        if isinstance(array, (np.memmap, mmap.mmap)):
+            return True
+        array = getattr(array, 'base', None)
+    return False
+
+
+def test_shared_columns_are_mapped(data, tmp_path):
+    export_shared(data, str(tmp_path))
+    shared = open_shared(str(tmp_path))['crop_production']
+    original = data['crop_production']
+
+    for column in shared.columns:
+        values = shared[column].array
+        assert is_mapped(values.codes if hasattr(values, 'codes') else shared[column].to_numpy()), column
+    # Text comes back as categoricals that compare and sort like the strings
+    assert list(shared['State'].astype(str)) == list(original['State'])
+    assert list(shared.sort_values(['District', 'Year'])['Production']) == \
+        list(original.sort_values(['District', 'Year'])['Production'])
+
+
+def test_shared_data_gives_the_same_answers(data, tmp_path):
+    export_shared(data, str(tmp_path))
+    with contextlib.redirect_stdout(io.StringIO()):
+        local = QueryEngine(None, data, offline=True)
+        shared = QueryEngine(None, open_shared(str(tmp_path)), offline=True)
+        for parsed in (PARSED, {'intent': 'compare_rainfall', 'states': ['Punjab', 'Haryana']},
+                       {'intent': 'analyze_trend', 'states': ['Punjab'], 'crops': ['Rice']}):
+            assert shared.execute_query(parsed)['answer'] == local.execute_query(parsed)['answer']
+
+
+def test_workers_restore_the_prepared_engine(data, tmp_path):
+    with contextlib.redirect_stdout(io.StringIO()):
+        engine = QueryEngine(None, data, offline=True)
+        engine.warm_up()
+        engine_snapshot.write_state(engine, str(tmp_path))
+        # What _worker_main does with a prepared pool
+        restored = QueryEngine.from_snapshot(None, str(tmp_path), offline=True)
+        districts = restored.data['crop_production']['District']
+        # Cleaned once in the parent: still a categorical over the mapped codes
+        assert isinstance(districts.dtype, pd.CategoricalDtype) and is_mapped(districts.array.codes)
+        assert 'District_ID' in restored.data['crop_production'].columns
+        assert restored.execute_query(PARSED)['answer'] == engine.execute_query(PARSED)['answer']
+
+
+def test_cleaning_keeps_categoricals():
+    names = pd.Series(pd.Categorical([' mritsar', 'Ludhiana', None, 'patila!', 'Amritsar']))
+    cleaned = clean_district_names(names)
+    assert isinstance(cleaned.dtype, pd.CategoricalDtype)
+    assert list(cleaned.cat.categories) == ['Amritsar', 'Ludhiana', 'Patiala']
+    assert list(cleaned.astype(object).fillna('-')) == ['Amritsar', 'Ludhiana', '-', 'Patiala', 'Amritsar']
+
+
+def failing_load_snapshot(path):
+    raise OSError("cannot map shared data")
+
+
+def test_startup_failure_falls_back_in_process(data, monkeypatch):
+    # Forked workers inherit the patched loader, so none of them can start
+    monkeypatch.setattr(engine_snapshot, 'load_snapshot', failing_load_snapshot)
+    monkeypatch.setenv("SAMARTH_POOL_START", "fork")
+    with contextlib.redirect_stdout(io.StringIO()):
+        engine = QueryEngine(None, data, offline=True)
+        expected = str(engine.execute_query(PARSED, render=False)['answer'])
+        pool = engine.enable_process_pool(2)
+        try:
+            start = time.monotonic()
+            with pytest.raises(PoolUnavailableError):
+                pool.run(PARSED, timeout=30)
+            assert time.monotonic() - start < 10
+            assert str(engine._execute(PARSED)['answer']) == expected
+        finally:
+            engine.close()
+
+
+def slow_execute(self, parsed_query, render=True):
+    time.sleep(30)
+
+
+def test_deadline_stops_the_task(data, monkeypatch):
+    monkeypatch.setattr(QueryEngine, 'execute_query', slow_execute)
+    with contextlib.redirect_stdout(io.StringIO()):
+        pool = HandlerPool(data, workers=1, start_method="fork", task_timeout=0.5)
+        try:
+            stuck = pool._pool[0].process.pid
+            with pytest.raises(PoolTimeoutError):
+                pool.run(PARSED)
+            # The stuck worker is replaced rather than left running the handler
+            assert pool._pool[0].process.pid != stuck
+        finally:
+            pool.close()
+
+
+def test_timed_out_query_is_not_rerun_in_process(data, monkeypatch):
+    monkeypatch.setenv("SAMARTH_POOL_START", "fork")
+    monkeypatch.setenv("SAMARTH_POOL_TIMEOUT", "0.5")
+    with contextlib.redirect_stdout(io.StringIO()):
+        engine = QueryEngine(None, data, offline=True)
+        monkeypatch.setattr(QueryEngine, 'execute_query', slow_execute)
+        engine.enable_process_pool(1)
+        try:
+            start = time.monotonic()
+            assert engine._execute(PARSED)['answer'] == "⚠️ Query timed out."
+            # A rerun on this thread would sleep as long as the worker did
+            assert time.monotonic() - start < 10
+        finally:
+            engine.close()
+
+
+original_execute = QueryEngine.execute_query
+
+
+def execute_unless_slow(self, parsed_query, render=True):
+    if parsed_query.get('slow'):
+        time.sleep(30)
+    return original_execute(self, parsed_query, render)
+
+
+def test_replacing_a_worker_does_not_block_the_pool(data, monkeypatch):
+    monkeypatch.setattr(QueryEngine, 'execute_query', execute_unless_slow)
+    stop = process_pool._Worker.stop
+
+    def slow_stop(worker, kill=False):
+        time.sleep(2)
+        stop(worker, kill)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        pool = HandlerPool(data, workers=2, start_method="fork")
+        try:
+            pool.run(PARSED)
+            stuck = pool.submit({**PARSED, 'slow': True})
+            while stuck.state != 'running':
+                time.sleep(0.01)
+            monkeypatch.setattr(process_pool._Worker, 'stop', slow_stop)
+            canceller = threading.Thread(target=stuck.cancel)
+            canceller.start()
+            time.sleep(0.2)
+            # The other worker answers while the cancelled one is still being stopped
+            start = time.monotonic()
+            assert pool.run(PARSED, timeout=30)['answer']
+            assert time.monotonic() - start < 1.5
+            canceller.join()
+            monkeypatch.setattr(process_pool._Worker, 'stop', stop)
+            assert stuck.state == 'cancelled' and len(pool._pool) == 2
+        finally:
+            pool.close()
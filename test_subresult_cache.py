@@ -0,0 +1,124 @@
+"""
+Subresult Cache Tests for Project Samarth
+Filtered slices are reused when a request contains a cached predicate set,
+rebuilt when it does not, and dropped when a catalog partition is loaded
+
+Run with:  python -m pytest test_subresult_cache.py
+"""
+
+import contextlib
+import io
+
+import pandas as pd
+import pytest
+
+from data_collector import DataCollector
+from data_generator import SyntheticDataGenerator
+from dataset_catalog import DatasetCatalog
+from query_engine import QueryEngine
+from subresult_cache import SubresultCache, apply_predicates, predicate
+
+
+@pytest.fixture(scope="module")
+def crops():
+    return SyntheticDataGenerator(seed=11, n_crops=8, n_years=8).crop_production_table()
+
+
+WHEAT = predicate('Crop', 'isin', ['Wheat'])
+PUNJAB = predicate('State', 'isin', ['Punjab'])
+HARYANA = predicate('State', 'isin', ['Haryana'])
+
+
+def first_year(crops) -> int:
+    return int(crops['Year'].min())
+
+
+def test_repeat_is_a_hit(crops):
+    cache = SubresultCache()
+    first = cache.slice('crop_production', crops, [WHEAT, PUNJAB])
+    again = cache.slice('crop_production', crops, [PUNJAB, WHEAT])
+    assert again is first
+    assert cache.counts == {'hit': 1, 'derived': 0, 'miss': 1}
+
+
+def test_narrower_request_is_derived(crops):
+    cache = SubresultCache()
+    year = predicate('Year', 'eq', first_year(crops))
+    cache.slice('crop_production', crops, [WHEAT])
+    cache.slice('crop_production', crops, [WHEAT, PUNJAB])
+    narrow = cache.slice('crop_production', crops, [WHEAT, PUNJAB, year])
+
+    assert cache.counts == {'hit': 0, 'derived': 2, 'miss': 1}
+    pd.testing.assert_frame_equal(narrow, apply_predicates(crops, [WHEAT, PUNJAB, year]))
+    assert len(narrow) > 0
+
+
+def test_derived_from_the_smallest_base(crops):
+    cache = SubresultCache()
+    wheat = cache.slice('crop_production', crops, [WHEAT])
+    wheat_punjab = cache.slice('crop_production', crops, [WHEAT, PUNJAB])
+    predicates, base = cache._widest_base('crop_production', frozenset([WHEAT, PUNJAB, predicate('Season', 'eq', 'Rabi')]))
+    assert base is wheat_punjab and len(base) < len(wheat)
+    assert predicates == frozenset([WHEAT, PUNJAB])
+
+
+def test_unrelated_predicates_miss(crops):
+    cache = SubresultCache()
+    cache.slice('crop_production', crops, [WHEAT, PUNJAB])
+    # Haryana is not contained in the cached Punjab slice, nor is the other dataset
+    haryana = cache.slice('crop_production', crops, [WHEAT, HARYANA])
+    cache.slice('rainfall', crops, [WHEAT, PUNJAB])
+    assert cache.counts == {'hit': 0, 'derived': 0, 'miss': 3}
+    assert set(haryana['State']) == {'Haryana'}
+
+
+def state_totals(rows):
+    return rows.groupby('State')['Production'].sum()
+
+
+def test_aggregate_is_cached(crops):
+    cache = SubresultCache()
+    totals = cache.aggregate('crop_production', crops, [WHEAT], 'state_totals', state_totals)
+    assert cache.aggregate('crop_production', crops, [WHEAT], 'state_totals', state_totals) is totals
+    expected = crops[crops['Crop'] == 'Wheat'].groupby('State')['Production'].sum()
+    pd.testing.assert_series_equal(totals, expected)
+    # The slice it was built from is cached too, and reused by a narrower request
+    cache.slice('crop_production', crops, [WHEAT, PUNJAB])
+    assert cache.counts == {'hit': 1, 'derived': 1, 'miss': 1}
+
+
+def test_repeated_ranking_is_served_from_the_cache(crops):
+    parsed = {'intent': 'identify_district', 'states': ['Punjab'], 'crops': ['Wheat'], 'metrics': ['yield']}
+    with contextlib.redirect_stdout(io.StringIO()):
+        engine = QueryEngine(None, {'crop_production': crops.copy()}, offline=True)
+        first = engine.execute_query(parsed)['answer']
+        assert "Top 5 Districts by Yield" in first
+        hits = engine.subresults.counts['hit']
+        assert engine.execute_query(parsed)['answer'] == first
+    # The slice and the district ranking built from it
+    assert engine.subresults.counts['hit'] == hits + 2
+
+
+def test_eviction_keeps_within_budget(crops):
+    one_slice = apply_predicates(crops, [WHEAT, PUNJAB]).memory_usage(index=True, deep=True).sum()
+    cache = SubresultCache(max_bytes=int(one_slice * 1.5))
+    cache.slice('crop_production', crops, [WHEAT, PUNJAB])
+    cache.slice('crop_production', crops, [WHEAT, HARYANA])
+    assert len(cache) == 1
+    assert cache.stats()['bytes'] <= cache.max_bytes
+
+
+def test_partition_load_clears_the_cache(crops, tmp_path):
+    crops.to_csv(tmp_path / "crop_production.csv", index=False)
+    SyntheticDataGenerator(seed=11, n_crops=8, n_years=8).rainfall_table().to_csv(tmp_path / "rainfall.csv", index=False)
+    parsed = {'intent': 'identify_district', 'states': ['Punjab'], 'crops': ['Wheat'], 'metrics': ['production']}
+    with contextlib.redirect_stdout(io.StringIO()):
+        engine = QueryEngine(None, DatasetCatalog(DataCollector(str(tmp_path))), offline=True)
+        first = engine.execute_query(parsed)['answer']
+        assert len(engine.subresults) > 0
+
+        # Loading Haryana replaces the frames, so slices of the old ones must go
+        engine.execute_query({**parsed, 'states': ['Haryana']})
+        misses = engine.subresults.counts['miss']
+        assert engine.execute_query(parsed)['answer'] == first
+    assert engine.subresults.counts['miss'] == misses + 1
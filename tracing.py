@@ -0,0 +1,225 @@
+"""
+Tracing Module for Project Samarth
+Lightweight spans around query parsing, routing, handlers and LLM calls,
+exported through pluggable sinks (logs, OpenTelemetry, in-memory)
+"""
+
+import contextvars
+import functools
+import itertools
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+_current_span = contextvars.ContextVar("samarth_current_span", default=None)
+_ids = itertools.count(1)
+
+
+class Span:
+    """One timed operation with attributes and an optional parent"""
+
+    __slots__ = ("name", "span_id", "parent_id", "trace_id", "attributes",
+                 "start_time", "end_time", "_start", "_end", "status", "_token", "_tracer")
+
+    def __init__(self, tracer, name: str, parent: Optional["Span"], attributes: Dict[str, Any]):
+        self._tracer = tracer
+        self.name = name
+        self.span_id = next(_ids)
+        self.parent_id = parent.span_id if parent else None
+        self.trace_id = parent.trace_id if parent else self.span_id
+        self.attributes = attributes
+        self.status = "ok"
+        self.start_time = time.time()
+        self._start = time.perf_counter()
+        self.end_time = None
+        self._end = None
+        self._token = None
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def add(self, key: str, amount: float = 1):
+        """Increment a numeric attribute (e.g. rows scanned across several filters)"""
+        self.attributes[key] = self.attributes.get(key, 0) + amount
+
+    @property
+    def duration_ms(self) -> float:
+        end = self._end if self._end is not None else time.perf_counter()
+        return (end - self._start) * 1000.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_time": self.start_time,
+            "duration_ms": round(self.duration_ms, 3),
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+    def __enter__(self):
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._end = time.perf_counter()
+        self.end_time = time.time()
+        if exc_type is not None:
+            self.status = "error"
+            self.attributes["error"] = f"{exc_type.__name__}: {exc}"
+        _current_span.reset(self._token)
+        self._tracer.sink.export(self)
+        return False
+
+
+class _NoopSpan:
+    """Shared do-nothing span returned while tracing is disabled"""
+
+    name = None
+    attributes = {}
+
+    def set_attribute(self, key, value):
+        pass
+
+    def add(self, key, amount=1):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class InMemorySink:
+    """Keeps finished spans in a list, for tests and the benchmark"""
+
+    def __init__(self):
+        self.spans: List[Span] = []
+
+    def export(self, span: Span):
+        self.spans.append(span)
+
+    def by_name(self, name: str) -> List[Span]:
+        return [s for s in self.spans if s.name == name]
+
+    def clear(self):
+        self.spans.clear()
+
+
+class LoggingSink:
+    """Writes one JSON line per finished span to the 'samarth.trace' logger"""
+
+    def __init__(self, logger: Optional[logging.Logger] = None, level: int = logging.INFO):
+        self.logger = logger or logging.getLogger("samarth.trace")
+        self.level = level
+
+    def export(self, span: Span):
+        if self.logger.isEnabledFor(self.level):
+            self.logger.log(self.level, json.dumps(span.to_dict(), default=str))
+
+
+class OpenTelemetrySink:
+    """Re-emits finished spans through the OpenTelemetry API, if installed
+
+    Spans are exported after they finish, so our trace/span/parent ids are
+    attached as attributes for backends to stitch the tree back together.
+    """
+
+    def __init__(self, tracer_name: str = "project-samarth"):
+        from opentelemetry import trace
+        self._trace = trace
+        self._tracer = trace.get_tracer(tracer_name)
+
+    def export(self, span: Span):
+        attributes = {k: v if isinstance(v, (str, int, float, bool)) else str(v)
+                      for k, v in span.attributes.items()}
+        attributes.update({
+            "samarth.trace_id": span.trace_id,
+            "samarth.span_id": span.span_id,
+            "samarth.parent_id": span.parent_id or 0,
+        })
+        otel_span = self._tracer.start_span(span.name, start_time=int(span.start_time * 1e9),
+                                            attributes=attributes)
+        if span.status == "error":
+            otel_span.set_status(self._trace.Status(self._trace.StatusCode.ERROR))
+        otel_span.end(end_time=int(span.end_time * 1e9))
+
+
+class MultiSink:
+    """Fans spans out to several sinks"""
+
+    def __init__(self, *sinks):
+        self.sinks = list(sinks)
+
+    def export(self, span: Span):
+        for sink in self.sinks:
+            sink.export(span)
+
+
+class Tracer:
+    def __init__(self, sink=None, enabled: bool = True):
+        self.sink = sink or InMemorySink()
+        self.enabled = enabled
+
+    def span(self, name: str, **attributes):
+        """Context manager timing one operation; a no-op when disabled"""
+        if not self.enabled:
+            return NOOP_SPAN
+        return Span(self, name, _current_span.get(), attributes)
+
+
+def current_span():
+    """The innermost active span, or a no-op span outside any trace"""
+    return _current_span.get() or NOOP_SPAN
+
+
+def traced(name: str):
+    """Decorator for QueryEngine methods: wrap the call in a span on self.tracer"""
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(self, *args, **kwargs):
+            tracer = self.tracer
+            if not tracer.enabled:
+                return fn(self, *args, **kwargs)
+            with tracer.span(name):
+                return fn(self, *args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+def _tracer_from_env() -> Tracer:
+    """SAMARTH_TRACE=log|memory|otel turns tracing on for the whole process"""
+    mode = os.getenv("SAMARTH_TRACE", "").lower()
+    if mode == "log":
+        return Tracer(LoggingSink())
+    if mode == "memory":
+        return Tracer(InMemorySink())
+    if mode == "otel":
+        try:
+            return Tracer(OpenTelemetrySink())
+        except ImportError:
+            print("⚠️ SAMARTH_TRACE=otel but opentelemetry is not installed; tracing disabled")
+    return Tracer(enabled=False)
+
+
+_default_tracer = _tracer_from_env()
+
+
+def get_tracer() -> Tracer:
+    return _default_tracer
+
+
+def set_tracer(tracer: Tracer):
+    """Replace the process-wide default tracer used by new QueryEngines"""
+    global _default_tracer
+    _default_tracer = tracer
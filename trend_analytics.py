@@ -0,0 +1,242 @@
+"""
+Trend Analytics Module for Project Samarth
+Vectorized trend statistics (least-squares slope, CAGR, rolling means,
+volatility, anomaly z-scores) computed in batch over every
+(State, Crop) and (District, Crop) series at once
+"""
+
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+def least_squares_slopes(values: np.ndarray, years: np.ndarray) -> np.ndarray:
+    """Slope per row of a (series x year) matrix, ignoring NaN gaps"""
+    mask = ~np.isnan(values)
+    n = mask.sum(axis=1)
+    x = np.broadcast_to(years.astype(float), values.shape)
+    x_mean = np.where(mask, x, 0).sum(axis=1) / np.maximum(n, 1)
+    y_mean = np.where(mask, values, 0).sum(axis=1) / np.maximum(n, 1)
+    dx = np.where(mask, x - x_mean[:, None], 0)
+    dy = np.where(mask, values - y_mean[:, None], 0)
+    denom = (dx * dx).sum(axis=1)
+    return np.divide((dx * dy).sum(axis=1), denom, out=np.full(len(n), np.nan), where=denom > 0)
+
+
+def _first_last(values: np.ndarray, years: np.ndarray) -> Tuple[np.ndarray, ...]:
+    """First/last observed value and year of each row"""
+    mask = ~np.isnan(values)
+    has = mask.any(axis=1)
+    first_idx = np.where(has, mask.argmax(axis=1), 0)
+    last_idx = np.where(has, values.shape[1] - 1 - mask[:, ::-1].argmax(axis=1), 0)
+    rows = np.arange(values.shape[0])
+    first = np.where(has, values[rows, first_idx], np.nan)
+    last = np.where(has, values[rows, last_idx], np.nan)
+    return first, last, years[first_idx].astype(float), years[last_idx].astype(float)
+
+
+def compound_growth(values: np.ndarray, years: np.ndarray) -> np.ndarray:
+    """CAGR between the first and last observed year of each row"""
+    first, last, y0, y1 = _first_last(values, years)
+    span = y1 - y0
+    valid = (first > 0) & (last > 0) & (span > 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(valid, (last / first) ** (1.0 / np.where(span > 0, span, 1)) - 1.0, np.nan)
+
+
+def rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """Trailing rolling mean along the year axis (NaN-aware, min 1 point)"""
+    filled = np.where(np.isnan(values), 0.0, values)
+    counts = (~np.isnan(values)).astype(float)
+    csum = np.cumsum(filled, axis=1)
+    ccount = np.cumsum(counts, axis=1)
+    csum[:, window:] = csum[:, window:] - csum[:, :-window]
+    ccount[:, window:] = ccount[:, window:] - ccount[:, :-window]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(ccount > 0, csum / ccount, np.nan)
+
+
+def volatility(values: np.ndarray) -> np.ndarray:
+    """Standard deviation of year-over-year growth rates per row"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        growth = values[:, 1:] / values[:, :-1] - 1.0
+    growth[~np.isfinite(growth)] = np.nan
+    valid = (~np.isnan(growth)).sum(axis=1) >= 2
+    out = np.full(values.shape[0], np.nan)
+    if valid.any():
+        out[valid] = np.nanstd(growth[valid], axis=1, ddof=1)
+    return out
+
+
+def anomaly_zscores(values: np.ndarray) -> np.ndarray:
+    """Z-score of every cell against its row's mean and standard deviation"""
+    counts = (~np.isnan(values)).sum(axis=1)
+    out = np.full(values.shape, np.nan)
+    valid = counts >= 2
+    if valid.any():
+        mean = np.nanmean(values[valid], axis=1, keepdims=True)
+        std = np.nanstd(values[valid], axis=1, ddof=1, keepdims=True)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            out[valid] = np.where(std > 0, (values[valid] - mean) / std, 0.0)
+    return out
+
+
+def row_correlation(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Pearson correlation of matching rows of two (series x year) matrices"""
+    mask = ~(np.isnan(a) | np.isnan(b))
+    n = mask.sum(axis=1)
+    a0 = np.where(mask, a, 0.0)
+    b0 = np.where(mask, b, 0.0)
+    a_mean = a0.sum(axis=1) / np.maximum(n, 1)
+    b_mean = b0.sum(axis=1) / np.maximum(n, 1)
+    da = np.where(mask, a - a_mean[:, None], 0.0)
+    db = np.where(mask, b - b_mean[:, None], 0.0)
+    denom = np.sqrt((da * da).sum(axis=1) * (db * db).sum(axis=1))
+    return np.divide((da * db).sum(axis=1), denom, out=np.full(len(n), np.nan), where=(denom > 0) & (n > 1))
+
+
+class SeriesMatrix:
+    """Wide (series x year) matrix of one measure, keyed by a tuple of columns"""
+
+    def __init__(self, df: pd.DataFrame, keys: Tuple[str, ...], value: str, agg: str = 'sum'):
+        grouped = df.groupby(list(keys) + ['Year'], observed=True, sort=True)[value].agg(agg)
+        wide = grouped.unstack('Year').sort_index(axis=1)
+        self.keys = keys
+        self.index = wide.index
+        self.years = wide.columns.to_numpy()
+        self.values = wide.to_numpy(dtype=float)
+        self._positions = {key: i for i, key in enumerate(self.index)}
+
+    def window(self, last_n: Optional[int]) -> Tuple[np.ndarray, np.ndarray]:
+        """Values/years restricted to the last N years of data"""
+        if not last_n or last_n >= len(self.years):
+            return self.values, self.years
+        return self.values[:, -last_n:], self.years[-last_n:]
+
+    def position(self, key) -> Optional[int]:
+        return self._positions.get(key)
+
+    def series(self, key, last_n: Optional[int] = None) -> pd.Series:
+        values, years = self.window(last_n)
+        row = values[self._positions[key]]
+        return pd.Series(row, index=years).dropna()
+
+
+class TrendIndex:
+    """Batch trend statistics for every production series
+
+    Statistics are computed for all series in one vectorized pass per
+    (level, window) and cached, so a trend question is a dictionary lookup.
+    """
+
+    LEVELS = {
+        'state': ('State', 'Crop'),
+        'district': ('District', 'Crop'),
+    }
+
+    def __init__(self, crop_df: pd.DataFrame, rain_df: Optional[pd.DataFrame] = None,
+                 value: str = 'Production', rolling_window: int = 3,
+                 level_tables: Optional[Dict[str, pd.DataFrame]] = None, agg: str = 'sum',
+                 levels: Optional[Dict[str, Tuple[str, str]]] = None):
+        self.crop_df = crop_df
+        # (region column, crop column) per level; districts may be keyed by District_ID
+        self.levels = levels or self.LEVELS
+        self.rain_df = rain_df
+        self.value = value
+        # Ratio metrics (yield) come pre-aggregated per level and must not be summed
+        self.level_tables = level_tables or {}
+        self.agg = agg
+        self.rolling_window = rolling_window
+        self._matrices = {}
+        self._rain = {}
+        self._stats = {}
+
+    def matrix(self, level: str) -> SeriesMatrix:
+        if level not in self._matrices:
+            source = self.level_tables.get(level, self.crop_df)
+            self._matrices[level] = SeriesMatrix(source, self.levels[level], self.value, self.agg)
+        return self._matrices[level]
+
+    def rainfall_matrix(self, level: str) -> Optional[SeriesMatrix]:
+        """Mean annual rainfall per State (or District) and year"""
+        key_col = self.levels[level][0]
+        if self.rain_df is None or key_col not in self.rain_df.columns:
+            return None
+        if level not in self._rain:
+            self._rain[level] = SeriesMatrix(self.rain_df, (key_col,), 'Annual_Rainfall_mm', 'mean')
+        return self._rain[level]
+
+    def stats(self, level: str = 'state', last_n: Optional[int] = None) -> pd.DataFrame:
+        """Slope, CAGR, volatility, latest rolling mean / z-score and rainfall
+        correlation for every series at this level"""
+        cache_key = (level, last_n)
+        if cache_key in self._stats:
+            return self._stats[cache_key]
+
+        matrix = self.matrix(level)
+        values, years = matrix.window(last_n)
+        rolled = rolling_mean(values, self.rolling_window)
+        zscores = anomaly_zscores(values)
+        _, last, _, last_year = _first_last(values, years)
+        _, last_rolled, _, _ = _first_last(rolled, years)
+        _, last_z, _, _ = _first_last(zscores, years)
+
+        stats = pd.DataFrame({
+            'slope_per_year': least_squares_slopes(values, years),
+            'cagr': compound_growth(values, years),
+            'volatility': volatility(values),
+            'mean': np.nanmean(np.where(np.isnan(values).all(axis=1, keepdims=True), 0, values), axis=1),
+            'latest': last,
+            'latest_year': last_year,
+            'rolling_mean': last_rolled,
+            'latest_zscore': last_z,
+            'years_observed': (~np.isnan(values)).sum(axis=1),
+        }, index=matrix.index)
+
+        rain = self.rainfall_matrix(level)
+        if rain is not None:
+            # Align each series with its region's rainfall row, then correlate row-wise
+            region_rows = np.array([rain.position(key[0]) if rain.position(key[0]) is not None else -1
+                                    for key in matrix.index])
+            rain_values = np.full(values.shape, np.nan)
+            year_pos = {y: i for i, y in enumerate(rain.years)}
+            cols = np.array([year_pos.get(y, -1) for y in years])
+            have_row, have_col = region_rows >= 0, cols >= 0
+            if have_row.any() and have_col.any():
+                rain_values[np.ix_(have_row, have_col)] = rain.values[np.ix_(region_rows[have_row], cols[have_col])]
+            stats['rainfall_correlation'] = row_correlation(values, rain_values)
+
+        self._stats[cache_key] = stats
+        return stats
+
+    def find(self, level: str, region, crop: str):
+        """Series key matching region (name or id) and crop name (case-insensitive), or None"""
+        matrix = self.matrix(level)
+        crop_l = crop.lower()
+        if not isinstance(region, str):
+            exact = (region, crop.title())
+            if matrix.position(exact) is not None:
+                return exact
+            return next((key for key in matrix.index if key[0] == region and crop_l in str(key[1]).lower()), None)
+        region_l = region.lower()
+        # Names resolved to the data's spelling match as given
+        for exact in ((region, crop), (region.title(), crop.title())):
+            if matrix.position(exact) is not None:
+                return exact
+        for key in matrix.index:
+            if region_l in str(key[0]).lower() and crop_l in str(key[1]).lower():
+                return key
+        return None
+
+    def lookup(self, level: str, key, last_n: Optional[int] = None) -> Dict:
+        """Statistics and yearly series for one (region, crop) key"""
+        matrix = self.matrix(level)
+        values, years = matrix.window(last_n)
+        row = matrix.position(key)
+        return {
+            'stats': self.stats(level, last_n).iloc[row].to_dict(),
+            'series': pd.Series(values[row], index=years).dropna(),
+            'rolling': pd.Series(rolling_mean(values[row:row + 1], self.rolling_window)[0], index=years).dropna(),
+            'zscores': pd.Series(anomaly_zscores(values[row:row + 1])[0], index=years).dropna(),
+        }